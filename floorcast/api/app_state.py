@@ -7,8 +7,12 @@ from starlette.datastructures import State
 from floorcast.domain.events import FCEvent
 
 if TYPE_CHECKING:
+    from floorcast.api.response_cache import ResponseCache
     from floorcast.domain.ports import EventPublisher, EventStore
+    from floorcast.infrastructure.metrics import ProcessMetrics
+    from floorcast.services.backup import BackupService
     from floorcast.services.registry import RegistryService
+    from floorcast.services.rollup import RollupService
     from floorcast.services.state import StateService
     from floorcast.services.websocket import WebsocketService
 
@@ -21,6 +25,11 @@ class AppState(State):
         event_repo: EventStore,
         state_service: StateService,
         websocket_service: WebsocketService,
+        rollup_service: RollupService,
+        response_cache: ResponseCache,
+        backup_service: BackupService,
+        metrics: ProcessMetrics,
+        admin_token: str | None = None,
     ) -> None:
         super().__init__()
         self.event_repo = event_repo
@@ -28,3 +37,8 @@ class AppState(State):
         self.registry_service = registry_service
         self.state_service = state_service
         self.websocket_service = websocket_service
+        self.rollup_service = rollup_service
+        self.response_cache = response_cache
+        self.backup_service = backup_service
+        self.metrics = metrics
+        self.admin_token = admin_token
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import secrets
 from typing import TYPE_CHECKING
 
-from fastapi import Request, WebSocket
+from fastapi import HTTPException, Request, WebSocket
+from starlette import status
 
 if TYPE_CHECKING:
+    from floorcast.api.response_cache import ResponseCache
     from floorcast.domain.events import FCEvent
     from floorcast.domain.ports import EventPublisher, EventStore
+    from floorcast.infrastructure.metrics import ProcessMetrics
+    from floorcast.services.backup import BackupService
+    from floorcast.services.registry import RegistryService
+    from floorcast.services.rollup import RollupService
     from floorcast.services.state import StateService
     from floorcast.services.websocket import WebsocketService
 
@@ -19,6 +26,42 @@ def get_state_service(request: Request) -> StateService:
     return request.app.state.state_service  # type: ignore
 
 
+def get_registry_service(request: Request) -> RegistryService:
+    return request.app.state.registry_service  # type: ignore
+
+
+def get_response_cache(request: Request) -> ResponseCache:
+    return request.app.state.response_cache  # type: ignore
+
+
+def get_rollup_service(request: Request) -> RollupService:
+    return request.app.state.rollup_service  # type: ignore
+
+
+def get_websocket_service(request: Request) -> WebsocketService:
+    return request.app.state.websocket_service  # type: ignore
+
+
+def get_backup_service(request: Request) -> BackupService:
+    return request.app.state.backup_service  # type: ignore
+
+
+def get_metrics(request: Request) -> ProcessMetrics:
+    return request.app.state.metrics  # type: ignore
+
+
+def require_admin(request: Request) -> None:
+    """Lets through requests bearing the admin token; without one configured, none."""
+    token: str | None = request.app.state.admin_token
+    if token is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    scheme, _, given = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(given.encode(), token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
 def get_state_service_ws(websocket: WebSocket) -> StateService:
     return websocket.app.state.state_service  # type: ignore
 
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from typing import Any
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is an optional extra
+    msgpack = None
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.floorcast.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.floorcast.columnar+msgpack"
+
+
+# Websocket subprotocols; a client that offers none gets JSON text frames
+WS_JSON = "floorcast.json"
+WS_MSGPACK = "floorcast.msgpack"
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def negotiate_timeline_format(accept: str | None) -> str:
+    """Picks the first supported media type the client lists in its Accept header.
+
+    Falls back to row-oriented JSON, which every client understands.
+    """
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";", 1)[0].strip().lower()
+        if media_type == COLUMNAR_JSON:
+            return COLUMNAR_JSON
+        if media_type == COLUMNAR_MSGPACK and msgpack_available():
+            return COLUMNAR_MSGPACK
+    return JSON
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """Whether the Accept-Encoding header allows a gzipped body.
+
+    gzip's own q-value wins over a "*" entry; a q-value of 0 rules the coding out.
+    """
+    wildcard = False
+    for coding_range in (accept_encoding or "").split(","):
+        coding, *params = (part.strip().lower() for part in coding_range.split(";"))
+        accepted = True
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    accepted = float(value) > 0
+                except ValueError:
+                    pass
+        if coding in ("gzip", "x-gzip"):
+            return accepted
+        if coding == "*":
+            wildcard = accepted
+    return wildcard
+
+
+def negotiate_ws_subprotocol(offered: list[str]) -> str | None:
+    """Picks the first subprotocol the client offers that the server supports."""
+    for subprotocol in offered:
+        if subprotocol == WS_JSON:
+            return WS_JSON
+        if subprotocol == WS_MSGPACK and msgpack_available():
+            return WS_MSGPACK
+    return None
+
+
+def pack(data: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed; install floorcast[msgpack]")
+    return msgpack.packb(data)  # type: ignore[no-any-return]
+
+
+def unpack(data: bytes) -> Any:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed; install floorcast[msgpack]")
+    return msgpack.unpackb(data)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Hashable
+
+import structlog
+from fastapi.responses import Response
+
+from floorcast.api.encoding import accepts_gzip
+
+logger = structlog.get_logger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@dataclass(kw_only=True, frozen=True, slots=True)
+class CachedResponse:
+    """A rendered response body, stored gzipped, for a window that can no longer change."""
+
+    etag: str
+    media_type: str
+    gzipped: bytes
+    cache_control: str = IMMUTABLE_CACHE_CONTROL
+    # time.monotonic() past which the entry is rendered again; None keeps it for good
+    expires_at: float | None = None
+
+    @property
+    def gzip_etag(self) -> str:
+        # gzip and identity are different representations, so they need different strong ETags
+        return f'{self.etag[:-1]}-gzip"'
+
+    def expired(self) -> bool:
+        return self.expires_at is not None and self.expires_at <= time.monotonic()
+
+    def matches(self, if_none_match: str | None) -> bool:
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+    def respond(self, accept_encoding: str | None, if_none_match: str | None) -> Response:
+        use_gzip = accepts_gzip(accept_encoding)
+        headers = {
+            "ETag": self.gzip_etag if use_gzip else self.etag,
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept, Accept-Encoding",
+        }
+        if self.matches(if_none_match):
+            return Response(status_code=304, headers=headers)
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzipped, media_type=self.media_type, headers=headers)
+        return Response(gzip.decompress(self.gzipped), media_type=self.media_type, headers=headers)
+
+
+class ResponseCache:
+    """LRU cache of precompressed response bodies, bounded by total compressed size.
+
+    Concurrent misses for the same key share a single render, which runs to completion even if
+    the caller that started it goes away.
+
+    With max_age set, a past window isn't final after all (retention may drop or rewrite its
+    events later), so entries are rendered again after max_age seconds and clients are told to
+    revalidate after as long, rather than to keep the response for good.
+    """
+
+    def __init__(self, max_bytes: int, compress_level: int = 6, max_age: int | None = None) -> None:
+        self._max_bytes = max_bytes
+        self._compress_level = compress_level
+        self._max_age = max_age
+        self._entries: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._in_flight: dict[Hashable, asyncio.Task[CachedResponse]] = {}
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_create(
+        self, key: Hashable, render: Callable[[], Awaitable[Response]]
+    ) -> CachedResponse:
+        entry = self._entries.get(key)
+        if (
+            entry is not None
+            and entry.expires_at is not None
+            and entry.expires_at <= time.monotonic()
+        ):
+            self._evict(key)
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        task = self._in_flight.get(key)
+        if task is None:
+            # A task of its own, so a caller that goes away doesn't cancel it for the others
+            task = asyncio.create_task(self._render(key, render))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    async def _render(
+        self, key: Hashable, render: Callable[[], Awaitable[Response]]
+    ) -> CachedResponse:
+        response = await render()
+        entry = await asyncio.to_thread(self._compress, response)
+        self._store(key, entry)
+        return entry
+
+    def _finish(self, key: Hashable, task: asyncio.Task[CachedResponse]) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Every waiter may have gone away; don't warn about an unretrieved exception
+        if not task.cancelled():
+            task.exception()
+
+    def _compress(self, response: Response) -> CachedResponse:
+        body = bytes(response.body)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        media_type = response.media_type or "application/octet-stream"
+        gzipped = gzip.compress(body, compresslevel=self._compress_level)
+        if self._max_age is None:
+            return CachedResponse(etag=etag, media_type=media_type, gzipped=gzipped)
+        return CachedResponse(
+            etag=etag,
+            media_type=media_type,
+            gzipped=gzipped,
+            cache_control=f"public, max-age={self._max_age}",
+            expires_at=time.monotonic() + self._max_age,
+        )
+
+    def _store(self, key: Hashable, entry: CachedResponse) -> None:
+        size = len(entry.gzipped)
+        if size > self._max_bytes:
+            logger.debug("response too large to cache", size=size, max_bytes=self._max_bytes)
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = entry
+        self._size += size
+        while self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.gzipped)
+
+    def _evict(self, key: Hashable) -> None:
+        self._size -= len(self._entries.pop(key).gzipped)
@@ -1,23 +1,63 @@
 from __future__ import annotations
 
 import asyncio
+import json
 from dataclasses import asdict
-from datetime import datetime, timezone
-from typing import TYPE_CHECKING, Any
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, AsyncIterator
 
 import structlog
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette import status
 from starlette.websockets import WebSocket, WebSocketDisconnect
 
 from floorcast.api.dependencies import (
+    get_backup_service,
     get_event_repo,
+    get_metrics,
+    get_registry_service,
+    get_response_cache,
+    get_rollup_service,
     get_state_service,
+    get_websocket_service,
     get_websocket_service_ws,
+    require_admin,
+)
+from floorcast.api.encoding import (
+    COLUMNAR_MSGPACK,
+    JSON,
+    WS_MSGPACK,
+    negotiate_timeline_format,
+    negotiate_ws_subprotocol,
+    pack,
+    unpack,
+)
+from floorcast.common.metrics import Histogram, exponential_buckets
+from floorcast.domain.columnar import encode_columnar
+from floorcast.domain.event_filtering import TimelineFilter
+from floorcast.domain.models import TimelineCursor
+from floorcast.domain.rollups import choose_resolution
+from floorcast.domain.tiles import TILE_WIDTHS, tile_bounds
+from floorcast.domain.websocket import (
+    DISCONNECT,
+    RESYNC,
+    WSConnection,
+    WSEncoding,
+    WSFrame,
+    WSMessage,
+    serialize,
 )
-from floorcast.domain.websocket import WSConnection, WSMessage
 
 if TYPE_CHECKING:
+    from floorcast.api.response_cache import ResponseCache
+    from floorcast.domain.models import BackupProgress, CompactEvent
     from floorcast.domain.ports import EventStore
+    from floorcast.infrastructure.metrics import ProcessMetrics
+    from floorcast.services.backup import BackupService
+    from floorcast.services.registry import RegistryService
+    from floorcast.services.rollup import RollupService
     from floorcast.services.state import StateService
     from floorcast.services.websocket import WebsocketService
 
@@ -25,51 +65,348 @@ logger = structlog.get_logger(__name__)
 
 ws_router = APIRouter()
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+TIMELINE_STREAM_CHUNK_SIZE = 1000
+TIMELINE_STREAM_MAX_ROWS = 500_000
 
-@ws_router.get("/timeline")
+# Responses served again from the cache aren't observed again
+TIMELINE_ROWS = Histogram(
+    "floorcast_timeline_rows",
+    "Events or rollup buckets in each timeline response rendered",
+    ["response"],
+    buckets=exponential_buckets(10, 4, 9),
+)
+TIMELINE_BYTES = Histogram(
+    "floorcast_timeline_bytes",
+    "Body size of each timeline response rendered, before compression",
+    ["response"],
+    buckets=exponential_buckets(1024, 4, 9),
+)
+
+
+@ws_router.get("/timeline", response_model=None)
 async def events(
     start_time: datetime,
     end_time: datetime | None = None,
+    pixels: int | None = None,
+    entity_ids: list[str] = Query(default=[]),
+    domains: list[str] = Query(default=[]),
+    area_ids: list[str] = Query(default=[]),
+    floor_ids: list[str] = Query(default=[]),
+    accept: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+    if_none_match: str | None = Header(default=None),
     state_service: StateService = Depends(get_state_service),
     events_repo: EventStore = Depends(get_event_repo),
-) -> dict[str, Any]:
-    snapshot = await state_service.get_state_at(start_time)
+    rollup_service: RollupService = Depends(get_rollup_service),
+    registry_service: RegistryService = Depends(get_registry_service),
+    response_cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
+    media_type = negotiate_timeline_format(accept)
+    timeline_filter = TimelineFilter.resolve(
+        registry_service.get_registry(),
+        entity_ids=entity_ids,
+        domains=domains,
+        area_ids=area_ids,
+        floor_ids=floor_ids,
+    )
+
+    async def render() -> Response:
+        return await _render_timeline(
+            start_time,
+            end_time or datetime.now(tz=timezone.utc),
+            pixels,
+            media_type,
+            timeline_filter,
+            state_service,
+            events_repo,
+            rollup_service,
+        )
+
+    if end_time is None or not await _is_immutable(end_time, pixels, start_time, events_repo):
+        return await render()
+
+    key = (
+        _epoch_ms(start_time),
+        _epoch_ms(end_time),
+        pixels or 0,
+        media_type,
+        timeline_filter.cache_key() if timeline_filter else None,
+    )
+    cached = await response_cache.get_or_create(key, render)
+    return cached.respond(accept_encoding, if_none_match)
+
+
+async def _render_timeline(
+    start_time: datetime,
+    end_time: datetime,
+    pixels: int | None,
+    media_type: str,
+    timeline_filter: TimelineFilter | None,
+    state_service: StateService,
+    events_repo: EventStore,
+    rollup_service: RollupService,
+) -> Response:
+    snapshot = asdict(await state_service.get_state_at(start_time))
+    if timeline_filter is not None:
+        snapshot["state"] = {
+            entity_id: value
+            for entity_id, value in snapshot["state"].items()
+            if timeline_filter.matches(entity_id)
+        }
+    if pixels:
+        rollups = await rollup_service.get_rollups_between(
+            start_time, end_time, pixels, timeline_filter
+        )
+        if rollups is not None:
+            resolution, buckets = rollups
+            content = {
+                "snapshot": snapshot,
+                "resolution": resolution,
+                "rollups": [bucket.to_dict() for bucket in buckets],
+            }
+            response: Response = JSONResponse(jsonable_encoder(content), headers={"Vary": "Accept"})
+            return _observed("rollups", len(buckets), response)
     timeline_events = await events_repo.get_timeline_between(
-        start_time, end_time or datetime.now(tz=timezone.utc)
+        start_time, end_time, timeline_filter=timeline_filter
     )
-    return {"snapshot": asdict(snapshot), "events": [asdict(event) for event in timeline_events]}
-
-
-def serialize(message: WSMessage) -> dict[str, Any]:
-    if message.type == "registry":
-        return {"type": message.type, "registry": message.data}
-    if message.type == "snapshot":
-        return {"type": message.type, "state": message.data}
-    if message.type == "entity.state_change":
-        assert isinstance(message.data, dict)
-        data = message.data
-        return {
-            "type": "event",
-            "entity_id": data["entity_id"],
-            "state": data["state"],
-            "unit": data["unit"],
-            "timestamp": data["timestamp"],
-            "id": data["id"],
+    response = _events_response({"snapshot": snapshot}, timeline_events, media_type)
+    return _observed("events", len(timeline_events), response)
+
+
+def _events_response(
+    content: dict[str, Any], timeline_events: list[CompactEvent], media_type: str
+) -> Response:
+    headers = {"Vary": "Accept"}
+    if media_type == JSON:
+        content = {**content, "events": [asdict(event) for event in timeline_events]}
+        return JSONResponse(jsonable_encoder(content), headers=headers)
+    body = {**jsonable_encoder(content), "events": encode_columnar(timeline_events)}
+    if media_type == COLUMNAR_MSGPACK:
+        return Response(pack(body), media_type=media_type, headers=headers)
+    return JSONResponse(body, media_type=media_type, headers=headers)
+
+
+def _observed(kind: str, rows: int, response: Response) -> Response:
+    TIMELINE_ROWS.labels(kind).observe(rows)
+    TIMELINE_BYTES.labels(kind).observe(len(response.body))
+    return response
+
+
+async def _is_immutable(
+    end_time: datetime, pixels: int | None, start_time: datetime, events_repo: EventStore
+) -> bool:
+    """A window is final once a persisted event lies beyond its last bucket."""
+    horizon = end_time = _as_utc(end_time)
+    resolution = choose_resolution(_as_utc(start_time), end_time, pixels) if pixels else None
+    if resolution is not None:
+        width = timedelta(seconds=resolution)
+        horizon = _EPOCH + -(-(end_time - _EPOCH) // width) * width
+    latest = await events_repo.get_latest_timestamp()
+    return latest is not None and horizon < latest
+
+
+def _as_utc(timestamp: datetime) -> datetime:
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+def _epoch_ms(timestamp: datetime) -> int:
+    return int(_as_utc(timestamp).timestamp() * 1000)
+
+
+@ws_router.get("/timeline/tiles/{resolution}/{index}", response_model=None)
+async def timeline_tile(
+    resolution: int,
+    index: int,
+    accept: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+    if_none_match: str | None = Header(default=None),
+    events_repo: EventStore = Depends(get_event_repo),
+    response_cache: ResponseCache = Depends(get_response_cache),
+) -> Response:
+    """Serves the events in one fixed, epoch-aligned tile of `resolution` seconds.
+
+    Tiles that a later persisted event has closed are cached and served as immutable; the tile
+    still receiving live events is always rendered fresh.
+    """
+    if resolution not in TILE_WIDTHS:
+        raise HTTPException(status_code=404, detail=f"Unknown tile resolution: {resolution}")
+    start_time, end_time = tile_bounds(resolution, index)
+    media_type = negotiate_timeline_format(accept)
+    latest = await events_repo.get_latest_timestamp()
+    complete = latest is not None and latest >= end_time
+
+    async def render() -> Response:
+        tile_events = await events_repo.get_timeline_between(
+            start_time, end_time, include_start=True
+        )
+        content = {
+            "resolution": resolution,
+            "index": index,
+            "start": _epoch_ms(start_time),
+            "end": _epoch_ms(end_time),
+            "complete": complete,
         }
-    if message.type == "pong":
-        return {"type": message.type}
-    raise ValueError(f"Unknown message type: {message.type}")
+        response = _events_response(content, tile_events, media_type)
+        return _observed("tile", len(tile_events), response)
+
+    if not complete:
+        response = await render()
+        response.headers["Cache-Control"] = "no-cache"
+        return response
 
+    cached = await response_cache.get_or_create(("tile", resolution, index, media_type), render)
+    return cached.respond(accept_encoding, if_none_match)
 
-async def sender(conn: WSConnection, ws: WebSocket) -> None:
+
+@ws_router.get("/timeline/stream")
+async def stream_events(
+    start_time: datetime,
+    end_time: datetime | None = None,
+    cursor: str | None = None,
+    max_rows: int = TIMELINE_STREAM_MAX_ROWS,
+    state_service: StateService = Depends(get_state_service),
+    events_repo: EventStore = Depends(get_event_repo),
+) -> StreamingResponse:
+    """Streams the timeline as NDJSON: a snapshot line, event chunk lines, then an end line.
+
+    The end line carries a cursor; passing it back resumes right after the last event sent and
+    skips the snapshot. `complete` is false when the response stopped at max_rows.
+    """
+    try:
+        after = TimelineCursor.decode(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    end_time = end_time or datetime.now(tz=timezone.utc)
+    max_rows = max(0, min(max_rows, TIMELINE_STREAM_MAX_ROWS))
+
+    async def lines() -> AsyncIterator[str]:
+        size = 0
+        if after is None:
+            snapshot = await state_service.get_state_at(start_time)
+            line = _ndjson({"type": "snapshot", "snapshot": jsonable_encoder(asdict(snapshot))})
+            size += len(line)
+            yield line
+        count = 0
+        last_cursor = after
+        async for chunk, next_cursor in events_repo.iter_timeline_between(
+            start_time,
+            end_time,
+            after=after,
+            chunk_size=TIMELINE_STREAM_CHUNK_SIZE,
+            limit=max_rows,
+        ):
+            count += len(chunk)
+            last_cursor = next_cursor
+            line = _ndjson({"type": "events", "events": [asdict(event) for event in chunk]})
+            size += len(line)
+            yield line
+        line = _ndjson(
+            {
+                "type": "end",
+                "count": count,
+                "cursor": last_cursor.encode() if last_cursor else None,
+                "complete": count < max_rows,
+            }
+        )
+        TIMELINE_ROWS.labels("stream").observe(count)
+        TIMELINE_BYTES.labels("stream").observe(size + len(line))
+        yield line
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def _ndjson(line: dict[str, Any]) -> str:
+    return json.dumps(line, separators=(",", ":")) + "\n"
+
+
+@ws_router.get("/connections")
+async def connections(
+    websocket_service: WebsocketService = Depends(get_websocket_service),
+) -> list[dict[str, Any]]:
+    """Send queue depth and drop counts for each connected websocket client."""
+    return websocket_service.connection_stats()
+
+
+@ws_router.post(
+    "/admin/backup", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_admin)]
+)
+async def start_backup(
+    backup_service: BackupService = Depends(get_backup_service),
+) -> dict[str, Any]:
+    """Start an online backup, unless one is already running, and report its progress."""
+    return _backup_status(backup_service.start())
+
+
+@ws_router.get("/admin/backup", dependencies=[Depends(require_admin)])
+async def backup_status(
+    backup_service: BackupService = Depends(get_backup_service),
+) -> dict[str, Any]:
+    """Report the progress of the running backup, or the outcome of the last one."""
+    if backup_service.latest is None:
+        raise HTTPException(status_code=404, detail="No backup taken since startup")
+    return _backup_status(backup_service.latest)
+
+
+def _backup_status(progress: BackupProgress) -> dict[str, Any]:
+    return {
+        **jsonable_encoder(asdict(progress)),
+        "running": progress.running,
+        "duration_seconds": round(progress.duration_seconds, 3),
+    }
+
+
+@ws_router.get("/metrics")
+async def prometheus_metrics(
+    process_metrics: ProcessMetrics = Depends(get_metrics),
+) -> Response:
+    """Metrics of every floorcast process, in the Prometheus text format."""
+    return Response(process_metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+async def sender(conn: WSConnection, ws: WebSocket, service: WebsocketService) -> None:
+    binary = conn.encoding is WSEncoding.MSGPACK
     while True:
         message = await conn.queue.get()
-        serialized = serialize(message)
-        await ws.send_json(serialized)
+        if isinstance(message, WSFrame):
+            if binary:
+                await ws.send_bytes(_msgpack_frame(message))
+            else:
+                await ws.send_text(message.text)
+        elif message is DISCONNECT:
+            logger.warning("disconnecting slow subscriber", connection=str(conn.id))
+            await ws.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            raise WebSocketDisconnect(code=status.WS_1013_TRY_AGAIN_LATER)
+        else:
+            if binary:
+                await ws.send_bytes(pack(serialize(message)))
+            else:
+                await ws.send_json(serialize(message))
+            if message is RESYNC:
+                # The client missed updates; the snapshot is taken after the drop, so it covers them
+                await service.request_snapshot(conn)
+
+
+def _msgpack_frame(frame: WSFrame) -> bytes:
+    # Shared frames are re-encoded once, then reused for every other msgpack connection
+    data = frame.encodings.get(WSEncoding.MSGPACK)
+    if data is None:
+        data = frame.encodings[WSEncoding.MSGPACK] = pack(json.loads(frame.text))
+    return data
 
 
 async def receiver(conn: WSConnection, ws: WebSocket, service: WebsocketService) -> None:
-    async for message in ws.iter_json():
+    while True:
+        received = await ws.receive()
+        if received["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(code=received.get("code", status.WS_1000_NORMAL_CLOSURE))
+        if received.get("text") is not None:
+            message = json.loads(received["text"])
+        else:
+            message = unpack(received["bytes"])
         service.send_message(conn, WSMessage(type=message["type"], data=message.get("data")))
 
 
@@ -77,15 +414,31 @@ async def receiver(conn: WSConnection, ws: WebSocket, service: WebsocketService)
 async def websocket_endpoint(
     websocket: WebSocket,
     websocket_service: WebsocketService = Depends(get_websocket_service_ws),
+    last_event_id: int | None = None,
+    registry_version: str | None = None,
 ) -> None:
-    await websocket.accept()
-    ws_conn = websocket_service.connect()
-    logger.info("subscriber connected", connection=str(ws_conn.id))
-    await websocket_service.request_registry(ws_conn)
-    await websocket_service.request_snapshot(ws_conn)
+    """Live updates and requests over one socket.
+
+    Clients pick the encoding by offering the floorcast.msgpack or floorcast.json subprotocol
+    (JSON if none); permessage-deflate is used whenever the client offers it. A reconnecting
+    client passes the last event id it saw and its registry version to resume where it left off.
+    """
+    subprotocol = negotiate_ws_subprotocol(websocket.scope.get("subprotocols", []))
+    await websocket.accept(subprotocol=subprotocol)
+    ws_conn = websocket_service.connect(
+        encoding=WSEncoding.MSGPACK if subprotocol == WS_MSGPACK else WSEncoding.JSON,
+        compressed="permessage-deflate" in websocket.headers.get("sec-websocket-extensions", ""),
+    )
+    logger.info(
+        "subscriber connected",
+        connection=str(ws_conn.id),
+        encoding=ws_conn.encoding.value,
+        compressed=ws_conn.compressed,
+    )
+    await websocket_service.resume(ws_conn, last_event_id, registry_version)
     try:
         async with asyncio.TaskGroup() as tg:
-            tg.create_task(sender(ws_conn, websocket))
+            tg.create_task(sender(ws_conn, websocket, websocket_service))
             tg.create_task(receiver(ws_conn, websocket, websocket_service))
     except* WebSocketDisconnect:
         pass
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Any, Coroutine, TypeVar
+from typing import Any, Coroutine, Protocol, TypeVar
 
 import structlog
 
@@ -30,4 +30,24 @@ def create_logged_task(
     return asyncio.create_task(wrapper(), name=task_name)
 
 
-__all__ = ["create_logged_task"]
+class Drainable(Protocol):
+    """A queue that sets `drained` whenever items leave it."""
+
+    drained: asyncio.Event
+
+    def qsize(self) -> int: ...
+
+
+async def wait_for_capacity(queue: Drainable, max_pending: int) -> None:
+    """Waits until fewer than `max_pending` items are queued.
+
+    Lets producers of large, non-urgent streams yield to the consumer instead of growing an
+    unbounded queue. The consumer wakes them as it takes items off, so a stalled producer costs
+    nothing while it waits.
+    """
+    while queue.qsize() >= max_pending:
+        queue.drained.clear()
+        await queue.drained.wait()
+
+
+__all__ = ["Drainable", "create_logged_task", "wait_for_capacity"]
@@ -0,0 +1,280 @@
+"""Prometheus metrics without the client library.
+
+Counters, gauges and histograms register with a Registry (REGISTRY unless given another), which
+renders them in the Prometheus text format. Recording is a few attribute updates, cheap enough for
+every event; gauges that mirror existing state read it through a function when rendered instead.
+
+A registry can also be exported as a plain dict and merged with others, so several processes can
+be served as one: samples with the same name and labels are added up.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import time
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from typing import Any
+
+type Labels = tuple[str, ...]
+# A metric's samples: a value per label set, a histogram's as [*bucket counts, sum]
+type Samples = dict[Labels, Any]
+
+# Seconds, from the sub-millisecond statements and stages of ingestion up
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def exponential_buckets(start: float, factor: float, count: int) -> tuple[float, ...]:
+    return tuple(start * factor**i for i in range(count))
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def export(self) -> dict[str, Any]:
+        """Every metric's samples, as something json.dumps accepts."""
+        return {
+            name: {
+                "kind": metric.kind,
+                "documentation": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "samples": [[list(labels), value] for labels, value in metric.collect().items()],
+            }
+            for name, metric in self._metrics.items()
+        }
+
+    def render(self, others: Sequence[Mapping[str, Any]] = ()) -> str:
+        """The text exposition format, with the samples of `others` exports added in."""
+        families = self.export()
+        for other in others:
+            for name, family in other.items():
+                mine = families.setdefault(name, {**family, "samples": []})
+                if mine["kind"] == family["kind"] and mine["buckets"] == family["buckets"]:
+                    mine["samples"] = _merge(mine["samples"], family["samples"])
+        lines: list[str] = []
+        for name, family in sorted(families.items()):
+            lines.append(f"# HELP {name} {_escape_help(family['documentation'])}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for labels, value in family["samples"]:
+                pairs = list(zip(family["labelnames"], labels))
+                if family["kind"] == "histogram":
+                    lines.extend(_histogram_lines(name, pairs, family["buckets"], value))
+                else:
+                    lines.append(f"{name}{_label_text(pairs)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    kind: str
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Registry | None = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        (registry or REGISTRY).register(self)
+
+    def collect(self) -> Samples:
+        raise NotImplementedError
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(Metric):
+    """A total that only goes up; name it `..._total`."""
+
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Registry | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self._children: dict[Labels, _CounterValue] = {}
+
+    def labels(self, *values: str) -> _CounterValue:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _CounterValue()
+        return child
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def collect(self) -> Samples:
+        return {labels: child.value for labels, child in self._children.items()}
+
+
+class Gauge(Metric):
+    """A value that goes up and down, either set directly or read from `function` when rendered.
+
+    The function returns the value, or for a labelled gauge a mapping of label values to values.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Registry | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self._values: dict[Labels, float] = {}
+        self._function: Callable[[], float | Mapping[Labels, float]] | None = None
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def set_function(self, function: Callable[[], float | Mapping[Labels, float]]) -> None:
+        self._function = function
+
+    def collect(self) -> Samples:
+        if self._function is None:
+            return dict(self._values)
+        value = self._function()
+        return dict(value) if isinstance(value, Mapping) else {(): value}
+
+
+class _HistogramValue:
+    __slots__ = ("_upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: Sequence[float]) -> None:
+        self._upper_bounds = upper_bounds
+        # Not cumulative; the last count is for values above every bucket
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self._upper_bounds, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Registry | None = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._children: dict[Labels, _HistogramValue] = {}
+
+    def labels(self, *values: str) -> _HistogramValue:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _HistogramValue(self.buckets)
+        return child
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> Any:
+        return self.labels().time()
+
+    def collect(self) -> Samples:
+        return {labels: [*child.counts, child.sum] for labels, child in self._children.items()}
+
+
+def _merge(ours: list[list[Any]], theirs: list[list[Any]]) -> list[list[Any]]:
+    merged: dict[Labels, Any] = {tuple(labels): value for labels, value in ours}
+    for labels, value in theirs:
+        key = tuple(labels)
+        if key not in merged:
+            merged[key] = value
+        elif isinstance(value, list):
+            merged[key] = [a + b for a, b in zip(merged[key], value)]
+        else:
+            merged[key] += value
+    return [[list(labels), value] for labels, value in merged.items()]
+
+
+def _histogram_lines(
+    name: str, pairs: list[tuple[str, str]], buckets: Sequence[float], value: list[Any]
+) -> Iterator[str]:
+    *counts, total = value
+    cumulative = 0
+    for upper_bound, count in zip([*buckets, math.inf], counts):
+        cumulative += count
+        le = "+Inf" if upper_bound == math.inf else _number(upper_bound)
+        yield f"{name}_bucket{_label_text([*pairs, ('le', le)])} {cumulative}"
+    yield f"{name}_sum{_label_text(pairs)} {_number(total)}"
+    yield f"{name}_count{_label_text(pairs)} {cumulative}"
+
+
+def _label_text(pairs: Sequence[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = (
+        f'{name}="{value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")}"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", r"\\").replace("\n", r"\n")
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
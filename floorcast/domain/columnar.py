@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import Any, Sequence
+
+from floorcast.domain.models import CompactEvent
+
+
+def encode_columnar(events: Sequence[CompactEvent]) -> dict[str, Any]:
+    """Encodes events as parallel columns instead of one object per event.
+
+    entity_id, state and unit strings are dictionary-encoded and referenced by index; ids and
+    timestamps are delta-encoded against the previous event, so they stay small ints.
+    """
+    entities: dict[str, int] = {}
+    states: dict[str | None, int] = {}
+    units: dict[str | None, int] = {}
+    ids: list[int] = []
+    timestamps: list[int] = []
+    entity_column: list[int] = []
+    state_column: list[int] = []
+    unit_column: list[int] = []
+    previous_id = 0
+    previous_timestamp = 0
+    for event in events:
+        ids.append(event.id - previous_id)
+        timestamps.append(event.timestamp - previous_timestamp)
+        previous_id = event.id
+        previous_timestamp = event.timestamp
+        entity_column.append(entities.setdefault(event.entity_id, len(entities)))
+        state_column.append(states.setdefault(event.state, len(states)))
+        unit_column.append(units.setdefault(event.unit, len(units)))
+    return {
+        "count": len(ids),
+        "entities": list(entities),
+        "states": list(states),
+        "units": list(units),
+        "id": ids,
+        "timestamp": timestamps,
+        "entity": entity_column,
+        "state": state_column,
+        "unit": unit_column,
+    }
+
+
+def decode_columnar(data: dict[str, Any]) -> list[CompactEvent]:
+    entities, states, units = data["entities"], data["states"], data["units"]
+    events = []
+    event_id = 0
+    timestamp = 0
+    for i in range(data["count"]):
+        event_id += data["id"][i]
+        timestamp += data["timestamp"][i]
+        events.append(
+            CompactEvent(
+                id=event_id,
+                entity_id=entities[data["entity"][i]],
+                timestamp=timestamp,
+                state=states[data["state"][i]],
+                unit=units[data["unit"][i]],
+            )
+        )
+    return events
@@ -1,10 +1,21 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from fnmatch import fnmatch
-from typing import TYPE_CHECKING, AsyncIterator
+from itertools import chain
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Collection,
+    Generic,
+    Hashable,
+    Iterable,
+    TypeVar,
+)
 
 if TYPE_CHECKING:
-    from floorcast.domain.models import Event
+    from floorcast.domain.models import Event, Registry
 
 
 class EntityBlockList:
@@ -28,3 +39,168 @@ class FilteredEventStream:
             event = await self._source.__anext__()
             if not self._block_list.should_block(event):
                 return event
+
+
+@dataclass(kw_only=True, frozen=True)
+class TimelineFilter:
+    """Restricts timeline queries to a set of entities and/or domains; None means unrestricted."""
+
+    entity_ids: frozenset[str] | None = None
+    domains: frozenset[str] | None = None
+
+    @classmethod
+    def resolve(
+        cls,
+        registry: Registry,
+        *,
+        entity_ids: Collection[str] = (),
+        domains: Collection[str] = (),
+        area_ids: Collection[str] = (),
+        floor_ids: Collection[str] = (),
+    ) -> TimelineFilter | None:
+        """Resolves area and floor selections through the registry into explicit entity ids.
+
+        Entity, area and floor selections are unioned; domains then narrow the result.
+        """
+        if not (entity_ids or area_ids or floor_ids):
+            return cls(domains=frozenset(domains)) if domains else None
+
+        area_set = set(area_ids) | {
+            area.id for area in registry.areas.values() if area.floor_id in floor_ids
+        }
+        selected = set(entity_ids) | {
+            entity.id
+            for entity in registry.entities.values()
+            if registry.area_of(entity) in area_set
+        }
+        if domains:
+            selected = {entity_id for entity_id in selected if entity_id.split(".")[0] in domains}
+        return cls(entity_ids=frozenset(selected))
+
+    def matches(self, entity_id: str) -> bool:
+        if self.entity_ids is not None and entity_id not in self.entity_ids:
+            return False
+        return self.domains is None or entity_id.split(".")[0] in self.domains
+
+    def cache_key(self) -> tuple[tuple[str, ...] | None, tuple[str, ...] | None]:
+        return (
+            tuple(sorted(self.entity_ids)) if self.entity_ids is not None else None,
+            tuple(sorted(self.domains)) if self.domains is not None else None,
+        )
+
+
+@dataclass(kw_only=True, frozen=True)
+class EntitySelector:
+    """The live entity updates a subscriber wants; an empty selector means every entity.
+
+    Like TimelineFilter, entity, glob, area and floor selections are unioned and domains narrow
+    the result, but globs and domains also match entities the registry doesn't know yet.
+    """
+
+    entity_ids: frozenset[str] = frozenset()
+    globs: tuple[str, ...] = ()
+    domains: frozenset[str] = frozenset()
+    area_ids: frozenset[str] = frozenset()
+    floor_ids: frozenset[str] = frozenset()
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> EntitySelector:
+        return cls(
+            entity_ids=frozenset(data.get("entity_ids") or ()),
+            globs=tuple(data.get("globs") or ()),
+            domains=frozenset(data.get("domains") or ()),
+            area_ids=frozenset(data.get("area_ids") or ()),
+            floor_ids=frozenset(data.get("floor_ids") or ()),
+        )
+
+    @property
+    def selects_everything(self) -> bool:
+        return not (
+            self.entity_ids or self.globs or self.domains or self.area_ids or self.floor_ids
+        )
+
+    def matches(self, entity_id: str, registry: Registry) -> bool:
+        if self.entity_ids or self.globs or self.area_ids or self.floor_ids:
+            selected = (
+                entity_id in self.entity_ids
+                or any(fnmatch(entity_id, glob) for glob in self.globs)
+                or self._in_selected_area(entity_id, registry)
+            )
+            if not selected:
+                return False
+        return not self.domains or entity_id.split(".")[0] in self.domains
+
+    def _in_selected_area(self, entity_id: str, registry: Registry) -> bool:
+        if not (self.area_ids or self.floor_ids):
+            return False
+        entity = registry.entities.get(entity_id)
+        area_id = registry.area_of(entity) if entity else None
+        if area_id is None:
+            return False
+        if area_id in self.area_ids:
+            return True
+        area = registry.areas.get(area_id)
+        return area is not None and area.floor_id in self.floor_ids
+
+
+S = TypeVar("S", bound=Hashable)
+
+
+class SubscriptionIndex(Generic[S]):
+    """Inverted index from entity_id to the subscribers whose selector matches it.
+
+    Entries are filled in the first time an entity is looked up, kept current as subscribers
+    come and go, and dropped when the registry changes (areas may have moved). Looking up an
+    indexed entity costs O(matching subscribers), not O(all subscribers).
+    """
+
+    def __init__(self, registry: Registry) -> None:
+        self.registry = registry
+        self._selectors: dict[S, EntitySelector] = {}
+        self._everything: set[S] = set()
+        self._index: dict[str, set[S]] = {}
+        # Which index entries each scoped subscriber appears in, so removal doesn't scan the index
+        self._indexed: dict[S, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._selectors)
+
+    def __contains__(self, subscriber: S) -> bool:
+        return subscriber in self._selectors
+
+    def subscribe(self, subscriber: S, selector: EntitySelector) -> None:
+        self.unsubscribe(subscriber)
+        self._selectors[subscriber] = selector
+        if selector.selects_everything:
+            self._everything.add(subscriber)
+            return
+        indexed = self._indexed[subscriber] = set()
+        for entity_id, subscribers in self._index.items():
+            if selector.matches(entity_id, self.registry):
+                subscribers.add(subscriber)
+                indexed.add(entity_id)
+
+    def unsubscribe(self, subscriber: S) -> None:
+        if self._selectors.pop(subscriber, None) is None:
+            return
+        self._everything.discard(subscriber)
+        for entity_id in self._indexed.pop(subscriber, ()):
+            self._index[entity_id].discard(subscriber)
+
+    def set_registry(self, registry: Registry) -> None:
+        self.registry = registry
+        self._index.clear()
+        for indexed in self._indexed.values():
+            indexed.clear()
+
+    def subscribers(self, entity_id: str) -> Iterable[S]:
+        scoped = self._index.get(entity_id)
+        if scoped is None:
+            scoped = self._index[entity_id] = set()
+            for subscriber, indexed in self._indexed.items():
+                if self._selectors[subscriber].matches(entity_id, self.registry):
+                    scoped.add(subscriber)
+                    indexed.add(entity_id)
+        if not scoped:
+            return self._everything
+        return chain(self._everything, scoped)
@@ -1,10 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import TYPE_CHECKING
 
-if TYPE_CHECKING:
-    from floorcast.domain.models import Event, Registry
+from floorcast.domain.models import Event, Registry
 
 
 class FCEvent:
@@ -17,11 +15,20 @@ class StateReconstructed(FCEvent):
     last_event_id: int
 
 
+@dataclass(kw_only=True, frozen=True)
+class ReplayObserved(FCEvent):
+    """How long a state reconstruction took, for the cost model of the process taking snapshots."""
+
+    events: int
+    load_seconds: float
+    replay_seconds: float
+
+
 @dataclass(kw_only=True, frozen=True)
 class EntityStateChanged(FCEvent):
     entity_id: str
     state: str | None
-    event: "Event"
+    event: Event
 
 
 @dataclass(kw_only=True, frozen=True)
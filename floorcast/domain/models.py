@@ -1,9 +1,13 @@
 import json
 import uuid
+import zlib
 from dataclasses import asdict, dataclass, field
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from itertools import islice
 from typing import Any, cast
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
 
 def _parse_datetime(value: str) -> datetime:
     return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
@@ -17,6 +21,39 @@ class CompactEvent:
     state: str | None
     unit: str | None
 
+    @classmethod
+    def from_event(cls, event: "Event") -> "CompactEvent":
+        return cls(
+            id=event.id,
+            entity_id=event.entity_id,
+            timestamp=int(event.timestamp.timestamp() * 1000),
+            state=event.state,
+            unit=event.unit,
+        )
+
+
+@dataclass(kw_only=True, frozen=True, slots=True)
+class TimelineCursor:
+    """Keyset position in the (timestamp, id) ordering of the events table.
+
+    Encoded with microsecond precision so resuming never skips or repeats rows that share a
+    millisecond.
+    """
+
+    timestamp: datetime
+    id: int
+
+    def encode(self) -> str:
+        micros = (self.timestamp - _EPOCH) // timedelta(microseconds=1)
+        return f"{micros}.{self.id}"
+
+    @classmethod
+    def decode(cls, token: str) -> "TimelineCursor":
+        micros, _, event_id = token.partition(".")
+        if not micros.lstrip("-").isdigit() or not event_id.isdigit():
+            raise ValueError(f"Invalid timeline cursor: {token!r}")
+        return cls(timestamp=_EPOCH + timedelta(microseconds=int(micros)), id=int(event_id))
+
 
 @dataclass(kw_only=True)
 class Event:
@@ -61,11 +98,73 @@ class Snapshot:
         return cls(
             id=int(data["id"]),
             last_event_id=int(data["last_event_id"]),
-            state=json.loads(data["state"]),
+            state=decode_snapshot_state(data["state"]),
             created_at=_parse_datetime(data["created_at"]),
         )
 
 
+@dataclass(kw_only=True, frozen=True, slots=True)
+class SnapshotInfo:
+    """A stored snapshot without its state, for deciding which snapshots to keep."""
+
+    id: int
+    last_event_id: int
+    created_at: datetime
+
+
+@dataclass(kw_only=True, slots=True)
+class BackupProgress:
+    """How far a backup has got; updated in place while it runs."""
+
+    name: str
+    started_at: datetime
+    finished_at: datetime | None = None
+    # Pages of the database files started so far
+    pages_total: int = 0
+    pages_copied: int = 0
+    bytes: int = 0
+    error: str | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    @property
+    def duration_seconds(self) -> float:
+        end = self.finished_at or datetime.now(tz=timezone.utc)
+        return (end - self.started_at).total_seconds()
+
+
+# Entities per json.dumps call when encoding a snapshot's state
+_STATE_ENCODE_SLICE = 1000
+
+
+def encode_snapshot_state(state: dict[str, Any]) -> bytes:
+    """Stored form of a snapshot's state: compact JSON, zlib-compressed.
+
+    Encoded a slice at a time: one json.dumps of a large state holds the GIL until it is done,
+    which stalls the event loop even when called from another thread.
+    """
+    items = iter(state.items())
+    compressor = zlib.compressobj()
+    parts = [compressor.compress(b"{")]
+    separator = ""
+    while entities := dict(islice(items, _STATE_ENCODE_SLICE)):
+        encoded = json.dumps(entities, separators=(",", ":"))
+        parts.append(compressor.compress((separator + encoded[1:-1]).encode()))
+        separator = ","
+    parts.append(compressor.compress(b"}"))
+    parts.append(compressor.flush())
+    return b"".join(parts)
+
+
+def decode_snapshot_state(stored: str | bytes) -> dict[str, Any]:
+    # Snapshots written before compression are plain JSON text
+    if isinstance(stored, bytes):
+        stored = zlib.decompress(stored)
+    return cast(dict[str, Any], json.loads(stored))
+
+
 @dataclass(kw_only=True)
 class Area:
     id: str
@@ -140,6 +239,13 @@ class Registry:
     areas: dict[str, Area]
     floors: dict[str, Floor]
 
+    def area_of(self, entity: Entity) -> str | None:
+        """An entity's own area, falling back to the area of its device."""
+        if entity.area_id:
+            return entity.area_id
+        device = self.devices.get(entity.device_id) if entity.device_id else None
+        return device.area_id if device else None
+
     def to_dict(self) -> dict[str, Any]:
         return {
             "entities": {e.id: asdict(e) for e in self.entities.values()},
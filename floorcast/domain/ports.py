@@ -1,10 +1,19 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import TYPE_CHECKING, Any, Callable, Coroutine, Protocol
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Coroutine, Protocol, Sequence
 
 if TYPE_CHECKING:
-    from floorcast.domain.models import CompactEvent, Event, Snapshot
+    from floorcast.domain.event_filtering import TimelineFilter
+    from floorcast.domain.models import (
+        BackupProgress,
+        CompactEvent,
+        Event,
+        Snapshot,
+        SnapshotInfo,
+        TimelineCursor,
+    )
+    from floorcast.domain.rollups import RollupBucket
 
 
 class SnapshotStore(Protocol):
@@ -12,6 +21,8 @@ class SnapshotStore(Protocol):
     async def get_latest(self) -> Snapshot | None: ...
     async def get_before_timestamp(self, timestamp: datetime) -> Snapshot | None: ...
     async def get_by_id(self, snapshot_id: int) -> Snapshot | None: ...
+    async def get_infos(self) -> list[SnapshotInfo]: ...
+    async def delete_many(self, snapshot_ids: Sequence[int]) -> None: ...
 
 
 class EventStore(Protocol):
@@ -21,13 +32,80 @@ class EventStore(Protocol):
         self, start_time: datetime, end_time: datetime
     ) -> list[Event]: ...
     async def get_timeline_between(
-        self, start_time: datetime, end_time: datetime
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        include_start: bool = False,
+        timeline_filter: TimelineFilter | None = None,
     ) -> list[CompactEvent]: ...
+    async def get_timeline_after_id(self, after_id: int, limit: int) -> list[CompactEvent]: ...
+    async def get_timeline_page(
+        self, start_time: datetime, end_time: datetime, after: TimelineCursor | None, limit: int
+    ) -> list[tuple[TimelineCursor, CompactEvent]]: ...
+    async def get_latest_timestamp(self) -> datetime | None: ...
+    async def get_earliest_timestamp(self) -> datetime | None: ...
+    async def get_events_page(
+        self, start_time: datetime, end_time: datetime, after: TimelineCursor | None, limit: int
+    ) -> list[Event]: ...
+    async def delete_between(self, start_time: datetime, end_time: datetime, limit: int) -> int: ...
+    async def get_ids_before(self, timestamp: datetime) -> range: ...
+    async def strip_payloads(self, after_id: int, through_id: int) -> int: ...
+    async def delete_before_id(self, event_id: int, limit: int) -> int: ...
+    def iter_timeline_between(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        after: TimelineCursor | None = None,
+        chunk_size: int = 1000,
+        limit: int | None = None,
+    ) -> AsyncIterator[tuple[list[CompactEvent], TimelineCursor]]: ...
+
+
+class RollupStore(Protocol):
+    async def merge(self, buckets: list[RollupBucket]) -> None: ...
+    async def get_between(
+        self,
+        resolution: int,
+        start_time: datetime,
+        end_time: datetime,
+        timeline_filter: TimelineFilter | None = None,
+    ) -> list[RollupBucket]: ...
+    async def get_last_event_id(self) -> int: ...
+
+
+class EventArchive(Protocol):
+    async def archived_until(self) -> datetime | None: ...
+    async def archive(self, start_time: datetime, end_time: datetime) -> int: ...
+    async def purge_archived(self, limit: int) -> int: ...
+
+
+class BackupStore(Protocol):
+    async def create(self, name: str, progress: BackupProgress) -> bool: ...
+    async def names(self) -> list[str]: ...
+    async def delete(self, name: str) -> None: ...
+
+
+class StorageMaintenance(Protocol):
+    async def reclaim_space(self, max_pages: int) -> int: ...
+    async def used_bytes(self) -> int: ...
 
 
 class EventPublisher[T](Protocol):
     def subscribe[E](
-        self, event_type: type[E], callback: Callable[[E], Coroutine[Any, Any, None]]
+        self,
+        event_type: type[E],
+        callback: Callable[[E], Coroutine[Any, Any, None]],
+        *,
+        ordered: bool = False,
+        max_pending: int | None = None,
+    ) -> Callable[[], None]: ...
+    def subscribe_batches[E](
+        self,
+        event_type: type[E],
+        callback: Callable[[list[E]], Coroutine[Any, Any, None]],
+        *,
+        max_batch: int = 500,
+        max_pending: int | None = None,
     ) -> Callable[[], None]: ...
     def publish(self, event: T) -> None: ...
     async def wait_all(self) -> None: ...
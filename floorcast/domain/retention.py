@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Sequence
+
+if TYPE_CHECKING:
+    from floorcast.domain.models import SnapshotInfo
+
+
+@dataclass(kw_only=True, frozen=True, slots=True)
+class RetentionTier:
+    """Past `after` of age, history is kept at one entry per `every`."""
+
+    after: timedelta
+    every: timedelta
+
+
+@dataclass(kw_only=True, frozen=True, slots=True)
+class EventRetention:
+    """How long events are kept, and in how much detail. None keeps them for good."""
+
+    # Past this age only an event's state, unit and timestamp are kept, not its raw payload
+    payload_for: timedelta | None = None
+    # Past this age events are dropped
+    keep_for: timedelta | None = None
+    # While the database is larger than this, the oldest events are dropped
+    max_bytes: int | None = None
+    # Whole months older than this move out of the database into the event archive
+    archive_after: timedelta | None = None
+
+    @property
+    def rewrites_history(self) -> bool:
+        """Whether past events can later change or disappear, so old windows aren't final."""
+        return any(
+            limit is not None
+            for limit in (self.payload_for, self.keep_for, self.max_bytes, self.archive_after)
+        )
+
+
+# Every snapshot for a week, then hourly, then daily after 90 days
+SNAPSHOT_RETENTION_TIERS = (
+    RetentionTier(after=timedelta(days=7), every=timedelta(hours=1)),
+    RetentionTier(after=timedelta(days=90), every=timedelta(days=1)),
+)
+
+
+def _bucket(
+    created_at: datetime, now: datetime, tiers: Sequence[RetentionTier]
+) -> tuple[timedelta, float] | None:
+    """The tier bucket a snapshot falls in, or None while it's young enough to keep regardless."""
+    age = now - created_at
+    every = None
+    for tier in tiers:
+        if age >= tier.after:
+            every = tier.every
+    if every is None:
+        return None
+    return every, created_at.timestamp() // every.total_seconds()
+
+
+def snapshots_to_thin(
+    snapshots: Sequence[SnapshotInfo],
+    now: datetime,
+    tiers: Sequence[RetentionTier],
+    max_replay_events: int,
+) -> list[int]:
+    """Ids of the snapshots that can be deleted, given every snapshot in creation order.
+
+    The first snapshot of each tier bucket is kept, as is the newest snapshot overall. So is any
+    snapshot whose deletion would leave more than `max_replay_events` events between two kept
+    snapshots: get_state_at for any time after the first snapshot never replays more than that,
+    unless the snapshots were already further apart when they were taken.
+
+    Snapshots hold the full state, so none depends on another and any of them can go.
+    """
+    doomed: list[int] = []
+    last_kept: SnapshotInfo | None = None
+    previous_bucket = None
+    for i, snapshot in enumerate(snapshots):
+        bucket = _bucket(snapshot.created_at, now, tiers)
+        newer = snapshots[i + 1] if i + 1 < len(snapshots) else None
+        keep = (
+            bucket is None
+            or bucket != previous_bucket
+            or newer is None
+            or last_kept is None
+            or newer.last_event_id - last_kept.last_event_id > max_replay_events
+        )
+        previous_bucket = bucket
+        if keep:
+            last_kept = snapshot
+        else:
+            doomed.append(snapshot.id)
+    return doomed
+
+
+def month_start(timestamp: datetime) -> datetime:
+    return datetime(timestamp.year, timestamp.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(timestamp: datetime) -> datetime:
+    start = month_start(timestamp)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def months_to_archive(
+    archived_until: datetime | None, earliest: datetime | None, cutoff: datetime
+) -> list[tuple[datetime, datetime]]:
+    """The [start, end) month ranges, oldest first, that are over before `cutoff` and unarchived.
+
+    Archiving carries on from `archived_until`, or from the month of the `earliest` event when
+    nothing is archived yet, so the archive always covers one unbroken stretch of time.
+    """
+    if archived_until is not None:
+        start = archived_until
+    elif earliest is not None:
+        start = month_start(earliest)
+    else:
+        return []
+    months = []
+    while (end := next_month(start)) <= cutoff:
+        months.append((start, end))
+        start = end
+    return months
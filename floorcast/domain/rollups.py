@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterable
+
+if TYPE_CHECKING:
+    from floorcast.domain.models import CompactEvent
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# Bucket widths in seconds, finest first
+ROLLUP_RESOLUTIONS = (MINUTE, HOUR, DAY)
+
+
+@dataclass(kw_only=True, slots=True)
+class RollupBucket:
+    """Aggregate of a single entity's events within one fixed-width time bucket.
+
+    Numeric states feed min/max/sum; every event, numeric or not, counts as a transition.
+    """
+
+    resolution: int  # bucket width in seconds
+    bucket_start: int  # Unix timestamp in milliseconds
+    entity_id: str
+    count: int = 0
+    numeric_count: int = 0
+    min_value: float | None = None
+    max_value: float | None = None
+    sum_value: float = 0.0
+    last_state: str | None = None
+    last_unit: str | None = None
+    last_timestamp: int = 0
+    last_event_id: int = 0  # highest event id folded in, not necessarily the last state's
+    # Id of the event last_state came from; breaks ties between events with equal timestamps
+    last_state_event_id: int = 0
+
+    @property
+    def mean(self) -> float | None:
+        return self.sum_value / self.numeric_count if self.numeric_count else None
+
+    def add(self, event: CompactEvent) -> None:
+        self.count += 1
+        value = parse_numeric(event.state)
+        if value is not None:
+            self.numeric_count += 1
+            self.sum_value += value
+            self.min_value = value if self.min_value is None else min(self.min_value, value)
+            self.max_value = value if self.max_value is None else max(self.max_value, value)
+        if (event.timestamp, event.id) >= (self.last_timestamp, self.last_state_event_id):
+            self.last_state = event.state
+            self.last_unit = event.unit
+            self.last_timestamp = event.timestamp
+            self.last_state_event_id = event.id
+        self.last_event_id = max(self.last_event_id, event.id)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "entity_id": self.entity_id,
+            "bucket_start": self.bucket_start,
+            "count": self.count,
+            "min": self.min_value,
+            "max": self.max_value,
+            "mean": self.mean,
+            "last": self.last_state,
+            "unit": self.last_unit,
+        }
+
+
+def parse_numeric(state: str | None) -> float | None:
+    if state is None:
+        return None
+    try:
+        value = float(state)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def bucket_start(timestamp_ms: int, resolution: int) -> int:
+    width = resolution * 1000
+    return timestamp_ms - timestamp_ms % width
+
+
+def rollup_events(events: Iterable[CompactEvent]) -> list[RollupBucket]:
+    """Folds events into buckets at every resolution in ROLLUP_RESOLUTIONS."""
+    buckets: dict[tuple[int, int, str], RollupBucket] = {}
+    for event in events:
+        for resolution in ROLLUP_RESOLUTIONS:
+            start = bucket_start(event.timestamp, resolution)
+            key = (resolution, start, event.entity_id)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = RollupBucket(
+                    resolution=resolution, bucket_start=start, entity_id=event.entity_id
+                )
+            bucket.add(event)
+    return list(buckets.values())
+
+
+def choose_resolution(start_time: datetime, end_time: datetime, max_buckets: int) -> int | None:
+    """Returns the coarsest resolution that still yields at least max_buckets buckets.
+
+    None means the window is narrow enough that raw events should be served instead.
+    """
+    if max_buckets <= 0:
+        return None
+    target = (end_time - start_time).total_seconds() / max_buckets
+    candidates = [resolution for resolution in ROLLUP_RESOLUTIONS if resolution <= target]
+    return max(candidates) if candidates else None
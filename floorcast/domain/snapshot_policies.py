@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from datetime import datetime, timedelta, timezone
+from typing import Any
 
 
 class SnapshotPolicy(ABC):
@@ -7,6 +8,13 @@ class SnapshotPolicy(ABC):
     def should_snapshot(self, events_since_snapshot: int, last_snapshot_time: datetime) -> bool:
         """Returns True if a snapshot should be taken, False otherwise."""
 
+    def describe(self, events_since_snapshot: int) -> dict[str, Any]:
+        """What the decision was based on, for logging."""
+        return {}
+
+    def snapshot_taken(self, write_seconds: float) -> None:
+        """Called after each snapshot is written, with how long the write took."""
+
 
 class ElapsedTimePolicy(SnapshotPolicy):
     """Approves snapshots when a certain amount of time has elapsed since the last snapshot."""
@@ -41,3 +49,76 @@ class HybridSnapshotPolicy(SnapshotPolicy):
         return self._event_count_policy.should_snapshot(
             events_since_snapshot, last_snapshot_time
         ) or self._elapsed_time_policy.should_snapshot(events_since_snapshot, last_snapshot_time)
+
+
+class ReplayCostModel:
+    """Running estimates of what reconstructing state costs, learned from observed timings.
+
+    Each estimate is an exponentially weighted moving average. Until there's a measurement,
+    replaying an event is assumed to cost `per_event_seconds`.
+    """
+
+    # Replays shorter than this are mostly fixed overhead and say little about per-event cost
+    MIN_EVENTS_OBSERVED = 100
+
+    def __init__(self, per_event_seconds: float = 20e-6, smoothing: float = 0.2) -> None:
+        self.per_event_seconds = per_event_seconds
+        self.snapshot_load_seconds = 0.0
+        self.snapshot_write_seconds = 0.0
+        self._smoothing = smoothing
+        self._per_event_measured = False
+
+    def predict(self, events: int) -> float:
+        """Expected get_state_at latency when `events` have to be replayed onto a snapshot."""
+        return self.snapshot_load_seconds + events * self.per_event_seconds
+
+    def observe_replay(self, events: int, load_seconds: float, replay_seconds: float) -> None:
+        self.snapshot_load_seconds = self._average(self.snapshot_load_seconds, load_seconds)
+        if events >= self.MIN_EVENTS_OBSERVED:
+            sample = replay_seconds / events
+            if self._per_event_measured:
+                sample = self._average(self.per_event_seconds, sample)
+            self.per_event_seconds = sample
+            self._per_event_measured = True
+
+    def observe_write(self, seconds: float) -> None:
+        self.snapshot_write_seconds = self._average(self.snapshot_write_seconds, seconds)
+
+    def _average(self, current: float, sample: float) -> float:
+        if not current:
+            return sample
+        return current + self._smoothing * (sample - current)
+
+
+class ReplayCostPolicy(SnapshotPolicy):
+    """Approves snapshots once replaying the events since the last one would exceed a budget.
+
+    The budget covers the whole reconstruction, so the time spent loading a snapshot, which grows
+    with its size, leaves less for replay. Snapshots are never taken more often than the replay
+    they save is worth their write cost.
+    """
+
+    def __init__(self, latency_budget_seconds: float, cost_model: ReplayCostModel) -> None:
+        self._budget = latency_budget_seconds
+        self._cost_model = cost_model
+
+    def replay_allowance(self) -> float:
+        model = self._cost_model
+        return max(self._budget - model.snapshot_load_seconds, model.snapshot_write_seconds)
+
+    def should_snapshot(self, events_since_snapshot: int, last_snapshot_time: datetime) -> bool:
+        replay_seconds = events_since_snapshot * self._cost_model.per_event_seconds
+        return replay_seconds >= self.replay_allowance()
+
+    def describe(self, events_since_snapshot: int) -> dict[str, Any]:
+        model = self._cost_model
+        return {
+            "predicted_replay_seconds": events_since_snapshot * model.per_event_seconds,
+            "replay_allowance_seconds": self.replay_allowance(),
+            "per_event_seconds": model.per_event_seconds,
+            "snapshot_load_seconds": model.snapshot_load_seconds,
+            "snapshot_write_seconds": model.snapshot_write_seconds,
+        }
+
+    def snapshot_taken(self, write_seconds: float) -> None:
+        self._cost_model.observe_write(write_seconds)
@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+
+from floorcast.domain.rollups import DAY, HOUR, MINUTE
+
+# Tile widths in seconds; tile `index` of width `w` covers [index * w, (index + 1) * w)
+TILE_WIDTHS = (5 * MINUTE, HOUR, 6 * HOUR, DAY)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def tile_bounds(width: int, index: int) -> tuple[datetime, datetime]:
+    start = _EPOCH + timedelta(seconds=width * index)
+    return start, start + timedelta(seconds=width)
+
+
+def progressive_slices(
+    start: datetime, end: datetime, focus: datetime, count: int
+) -> list[tuple[datetime, datetime]]:
+    """Splits [start, end) into `count` equal slices, nearest to `focus` first."""
+    if end <= start or count <= 0:
+        return []
+    width = (end - start) / count
+    slices = [
+        (start + width * i, end if i == count - 1 else start + width * (i + 1))
+        for i in range(count)
+    ]
+    focus_index = min(max(int((focus - start) / width), 0), count - 1)
+    order = sorted(range(count), key=lambda i: (abs(i - focus_index), i))
+    return [slices[i] for i in order]
@@ -1,6 +1,9 @@
 import asyncio
+import json
 import uuid
+from collections import deque
 from dataclasses import dataclass, field
+from enum import StrEnum
 from typing import Any
 
 
@@ -12,10 +15,292 @@ class WSMessage:
     data: dict[str, Any] | str | None = None
 
 
+@dataclass(frozen=True, slots=True)
+class WSFrame:
+    """A message already encoded for the wire.
+
+    Broadcasts are encoded once and the same frame is queued to every recipient.
+    """
+
+    text: str
+    # Live updates carry the entity they describe, so a slow client's backlog can be coalesced
+    key: str | None = None
+    # Other encodings of the same frame, filled in by the first connection that needs one
+    encodings: dict[str, bytes] = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def encode(cls, message: WSMessage, key: str | None = None) -> "WSFrame":
+        # Same separators as Starlette's send_json, so frames match what it would have sent
+        text = json.dumps(serialize(message), separators=(",", ":"), ensure_ascii=False)
+        return cls(text=text, key=key)
+
+    @classmethod
+    def pack(cls, frames: list["WSFrame"]) -> "WSFrame":
+        """Packs already-encoded frames into one `events` frame without re-encoding them."""
+        return cls(text='{"type":"events","events":[' + ",".join(f.text for f in frames) + "]}")
+
+
+class SlowConsumerPolicy(StrEnum):
+    """What to do with live updates once a client's send queue is full."""
+
+    # Replace the pending update for the same entity with the newer one
+    COALESCE = "coalesce"
+    # Drop pending updates and send a resync marker, followed by a fresh snapshot
+    RESYNC = "resync"
+    # Give up on the client and close the connection
+    DISCONNECT = "disconnect"
+
+
+@dataclass(kw_only=True, frozen=True)
+class BatchOptions:
+    """How a client wants live updates batched, negotiated when it subscribes."""
+
+    window_ms: int
+    # Keep only the newest update per entity within a window
+    latest_only: bool = False
+    # Maximum updates per second for any one entity; faster changes are held for a later batch
+    max_rate: float | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "BatchOptions":
+        window_ms = int(data["window_ms"])
+        if not 0 < window_ms <= 10_000:
+            raise ValueError(f"Batch window must be between 1 and 10000 ms: {window_ms}")
+        max_rate = float(data["max_rate"]) if data.get("max_rate") else None
+        if max_rate is not None and max_rate <= 0:
+            raise ValueError(f"Max update rate must be positive: {max_rate}")
+        return cls(
+            window_ms=window_ms, latest_only=bool(data.get("latest_only")), max_rate=max_rate
+        )
+
+
+class FrameBatcher:
+    """Accumulates one connection's live frames between flushes.
+
+    Holds at most `limit` frames in arrival order; past that, or in latest_only mode, it keeps
+    only the newest frame per entity, so a burst can't grow it beyond the number of entities.
+    """
+
+    def __init__(self, options: BatchOptions, limit: int = 1000) -> None:
+        self.options = options
+        self._limit = limit
+        self._frames: list[WSFrame] = []
+        self._latest: dict[str | None, WSFrame] = {}
+        self._last_sent: dict[str | None, float] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._frames) + len(self._latest)
+
+    def add(self, frame: WSFrame) -> None:
+        if not (self.options.latest_only or self._latest) and len(self._frames) < self._limit:
+            self._frames.append(frame)
+            return
+        if self._frames:
+            for pending in self._frames:
+                self._keep_latest(pending)
+            self._frames.clear()
+        self._keep_latest(frame)
+
+    def flush(self, now: float) -> WSFrame | None:
+        """Packs everything that may be sent at `now` (seconds); rate-limited frames stay."""
+        pending = self._frames or list(self._latest.values())
+        self._frames = []
+        self._latest = {}
+        if self.options.max_rate is None:
+            ready = pending
+        else:
+            interval = 1 / self.options.max_rate
+            ready = []
+            for frame in pending:
+                last_sent = self._last_sent.get(frame.key)
+                if last_sent is not None and now - last_sent < interval:
+                    # Rate limiting only ever sends an entity's newest update
+                    self._latest.pop(frame.key, None)
+                    self._latest[frame.key] = frame
+                    continue
+                self._last_sent[frame.key] = now
+                ready.append(frame)
+        return WSFrame.pack(ready) if ready else None
+
+    def _keep_latest(self, frame: WSFrame) -> None:
+        if self._latest.pop(frame.key, None) is not None:
+            self.coalesced += 1
+        self._latest[frame.key] = frame
+
+
+class RecentFrames:
+    """The most recent live frames by event id, so a reconnecting client can catch up.
+
+    Ids only ever increase; everything after `floor` is held, so a gap is replayable exactly when
+    the client's last id is at or past it.
+    """
+
+    def __init__(self, max_size: int = 10_000) -> None:
+        self._frames: deque[tuple[int, WSFrame]] = deque(maxlen=max_size)
+        self._floor: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def last_id(self) -> int | None:
+        return self._frames[-1][0] if self._frames else None
+
+    def append(self, event_id: int, frame: WSFrame) -> None:
+        last_id = self.last_id
+        if last_id is not None and event_id <= last_id:
+            # A duplicate resolved to an event that was already broadcast
+            return
+        if self._floor is None:
+            # Nothing before the first live event was seen, so nothing before it can be replayed
+            self._floor = event_id - 1
+        elif len(self._frames) == self._frames.maxlen:
+            self._floor = self._frames[0][0]
+        self._frames.append((event_id, frame))
+
+    def since(self, event_id: int) -> list[tuple[int, WSFrame]] | None:
+        """Frames after `event_id` in order, or None if some of them are no longer held."""
+        last_id = self.last_id
+        if self._floor is None or last_id is None or not self._floor <= event_id <= last_id:
+            return None
+        missed = []
+        for frame_id, frame in reversed(self._frames):
+            if frame_id <= event_id:
+                break
+            missed.append((frame_id, frame))
+        missed.reverse()
+        return missed
+
+
+RESYNC = WSMessage(type="resync")
+DISCONNECT = WSMessage(type="disconnect")
+
+
+class OutboundQueue(asyncio.Queue[WSMessage | WSFrame]):
+    """A connection's send queue, bounded for live updates.
+
+    Only keyed frames are ever refused: replies to the client's own requests are always queued,
+    since their producers already wait for capacity. When full, COALESCE falls back to
+    RESYNC for an entity with nothing pending, because there is nothing to replace.
+    """
+
+    _queue: deque[WSMessage | WSFrame]
+
+    def __init__(
+        self, max_size: int = 1000, policy: SlowConsumerPolicy = SlowConsumerPolicy.COALESCE
+    ) -> None:
+        super().__init__()
+        self.max_size = max_size
+        self.policy = policy
+        self.dropped = 0
+        self.high_water = 0
+        self.resyncs = 0
+        # Live updates are discarded until the resync marker or disconnect is sent
+        self._suspended = False
+        self.closing = False
+        # Set whenever items leave the queue, to wake producers waiting for capacity
+        self.drained = asyncio.Event()
+
+    def _init(self, maxsize: int) -> None:
+        self._queue = deque()
+
+    def _get(self) -> WSMessage | WSFrame:
+        item = self._queue.popleft()
+        self.drained.set()
+        if item is RESYNC:
+            self._suspended = False
+        return item
+
+    def put_nowait(self, item: WSMessage | WSFrame) -> None:
+        if isinstance(item, WSFrame) and item.key is not None:
+            if self._suspended:
+                self.dropped += 1
+                return
+            if self.qsize() >= self.max_size:
+                self._overflow(item)
+                return
+        super().put_nowait(item)
+        self.high_water = max(self.high_water, self.qsize())
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "depth": self.qsize(),
+            "high_water": self.high_water,
+            "dropped": self.dropped,
+            "resyncs": self.resyncs,
+            "policy": self.policy.value,
+        }
+
+    def _overflow(self, item: WSFrame) -> None:
+        if self.policy is SlowConsumerPolicy.COALESCE:
+            for i in range(len(self._queue) - 1, -1, -1):
+                pending = self._queue[i]
+                if isinstance(pending, WSFrame) and pending.key == item.key:
+                    self._queue[i] = item
+                    self.dropped += 1
+                    return
+        # Everything pending that's a live update is superseded by the snapshot or the close
+        kept = [m for m in self._queue if not (isinstance(m, WSFrame) and m.key is not None)]
+        self.dropped += len(self._queue) - len(kept) + 1
+        self._queue.clear()
+        self._queue.extend(kept)
+        self.drained.set()
+        self._suspended = True
+        if self.policy is SlowConsumerPolicy.DISCONNECT:
+            self.closing = True
+            super().put_nowait(DISCONNECT)
+        else:
+            self.resyncs += 1
+            super().put_nowait(RESYNC)
+
+
+class WSEncoding(StrEnum):
+    """Wire encoding negotiated for a connection."""
+
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+
 @dataclass(frozen=True)
 class WSConnection:
     id: uuid.UUID = field(default_factory=uuid.uuid4)
-    queue: asyncio.Queue[WSMessage] = field(default_factory=asyncio.Queue)
+    queue: OutboundQueue = field(default_factory=OutboundQueue)
+    encoding: WSEncoding = WSEncoding.JSON
+    # Whether the client offered permessage-deflate, which the server always accepts
+    compressed: bool = False
 
     def __hash__(self) -> int:
         return hash(self.id)
+
+
+def serialize(message: WSMessage) -> dict[str, Any]:
+    if message.type == "registry":
+        assert isinstance(message.data, dict)
+        return {
+            "type": message.type,
+            "version": message.data["version"],
+            "registry": message.data["registry"],
+        }
+    if message.type == "snapshot":
+        return {"type": message.type, "state": message.data}
+    if message.type == "entity.state_change":
+        assert isinstance(message.data, dict)
+        data = message.data
+        return {
+            "type": "event",
+            "entity_id": data["entity_id"],
+            "state": data["state"],
+            "unit": data["unit"],
+            "timestamp": data["timestamp"],
+            "id": data["id"],
+        }
+    if message.type == "timeline" or message.type.startswith(("timeline.", "playback.")):
+        assert isinstance(message.data, dict)
+        return {"type": message.type, **message.data}
+    if message.type == "resumed":
+        assert isinstance(message.data, dict)
+        return {"type": message.type, **message.data}
+    if message.type in ("pong", "resync"):
+        return {"type": message.type}
+    raise ValueError(f"Unknown message type: {message.type}")
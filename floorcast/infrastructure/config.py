@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -5,10 +7,55 @@ class Config(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", env_prefix="FLOORCAST_")
 
     snapshot_interval_seconds: int = 300
+    # "elapsed" snapshots every snapshot_interval_seconds; "replay_cost" whenever reconstructing
+    # state from the last snapshot would take longer than snapshot_latency_budget_ms
+    snapshot_policy: Literal["elapsed", "replay_cost"] = "elapsed"
+    snapshot_latency_budget_ms: int = 250
+    # Old snapshots are thinned to hourly after a week and daily after 90 days, but never so far
+    # apart that reconstructing state replays more events than this (~0.4s at 20us per event)
+    snapshot_retention_max_replay_events: int = 20_000
+    retention_interval_seconds: int = 3600
+    # Events keep their raw Home Assistant payload this long; after that only state, unit and
+    # timestamp, and the payload can't be recovered. Past event_retention_days, or while the
+    # database is over db_max_bytes, the oldest events are dropped up to a snapshot that covers
+    # them. None keeps them for good
+    event_payload_retention_days: int | None = None
+    event_retention_days: int | None = None
+    db_max_bytes: int | None = None
+    # Whole months of events older than this move to compressed segment files next to db_uri,
+    # where they stay queryable without their payloads and don't count towards db_max_bytes
+    event_archive_after_days: int | None = None
     ha_websocket_token: str
     ha_websocket_url: str = "ws://homeassistant.local:8123/api/websocket"
     db_uri: str = "floorcast.db"
+    # Store events in one file per month next to db_uri, rather than in db_uri itself
+    event_partitions: bool = False
+    # Online backups of the database, its partitions and archive, taken while ingesting every
+    # backup_interval_seconds. None only backs up on POST /admin/backup
+    backup_dir: str = "backups"
+    backup_interval_seconds: int | None = None
+    backup_keep: int = 7
+    backup_compress: bool = True
 
     entity_blocklist: list[str] = ["update.*"]
     log_level: str = "INFO"
     log_to_console: bool = False
+
+    # Past windows are cached for good, or only until the next retention run once any of the
+    # event retention settings above is set
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    # Bearer token the /admin endpoints require; None turns them off
+    admin_token: str | None = None
+
+    # Live updates a websocket client may have pending before slow_consumer_policy applies
+    ws_queue_max_size: int = 1000
+    ws_slow_consumer_policy: Literal["coalesce", "resync", "disconnect"] = "coalesce"
+    # API worker processes; 0 serves the API from the ingest process
+    api_workers: int = 0
+    # Unix domain socket the ingest process publishes live events to API workers on
+    ipc_socket_path: str = "floorcast.sock"
+    # Where each process writes its metrics for the API workers to serve together at /metrics
+    metrics_dir: str = "floorcast.metrics"
+
+    # Recent live events kept so a reconnecting websocket client can catch up without a snapshot
+    ws_resume_buffer_size: int = 10_000
@@ -1,9 +1,36 @@
+import functools
+import re
 import sqlite3
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Iterable
 
 import aiosqlite
+from aiosqlite.context import contextmanager
+
+from floorcast.common.metrics import Histogram, exponential_buckets
+
+DB_STATEMENT_SECONDS = Histogram(
+    "floorcast_db_statement_seconds",
+    "Time to run a statement, including waiting for the connection, by verb and table",
+    ["statement"],
+)
+DB_COMMIT_SECONDS = Histogram(
+    "floorcast_db_commit_seconds", "Time to commit, including waiting for the connection"
+)
+DB_COMMIT_ROWS = Histogram(
+    "floorcast_db_commit_rows",
+    "Rows inserted, updated or deleted by each commit",
+    buckets=exponential_buckets(1, 4, 10),
+)
+DB_BATCH_ROWS = Histogram(
+    "floorcast_db_batch_rows",
+    "Rows changed by each executemany",
+    buckets=exponential_buckets(1, 4, 10),
+)
+
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?\"?(\w+)", re.I)
 
 
 def adapt_datetime(dt: datetime) -> str:
@@ -13,10 +40,89 @@ def adapt_datetime(dt: datetime) -> str:
 sqlite3.register_adapter(datetime, adapt_datetime)
 
 
+@functools.lru_cache(maxsize=1024)
+def statement_label(sql: str) -> str:
+    """A query's verb and first table ("SELECT events"), few enough to label metrics by."""
+    words = sql.split(maxsplit=2)
+    if not words:
+        return ""
+    verb = words[0].upper()
+    if verb == "PRAGMA" and len(words) > 1:
+        return f"PRAGMA {words[1].split('=')[0].split('(')[0]}"
+    table = _TABLE.search(sql)
+    return f"{verb} {table[1]}" if table else verb
+
+
+class InstrumentedConnection(aiosqlite.Connection):
+    """Records how long callers wait for each statement and commit, and how much they change.
+
+    Overrides execute, executemany, execute_fetchall and commit, and keeps their results usable
+    with either `await` or `async with` through aiosqlite's own `contextmanager`. That decorator and
+    the Connection constructor aren't public API, so pyproject pins aiosqlite to the minor version
+    this was tested against.
+
+    Timings are taken on the event loop, so they include the wait for earlier calls queued on the
+    connection's thread; fetching the rows of a cursor from execute isn't part of its statement's
+    time. Rows changed are counted from each cursor's rowcount until the next commit.
+    """
+
+    _uncommitted_rows = 0
+
+    @contextmanager
+    async def execute(self, sql: str, parameters: Iterable[Any] | None = None) -> aiosqlite.Cursor:
+        started = time.perf_counter()
+        try:
+            cursor = await super().execute(sql, parameters)
+        finally:
+            DB_STATEMENT_SECONDS.labels(statement_label(sql)).observe(time.perf_counter() - started)
+        self._changed(cursor.rowcount)
+        return cursor
+
+    @contextmanager
+    async def executemany(self, sql: str, parameters: Iterable[Iterable[Any]]) -> aiosqlite.Cursor:
+        started = time.perf_counter()
+        try:
+            cursor = await super().executemany(sql, parameters)
+        finally:
+            DB_STATEMENT_SECONDS.labels(statement_label(sql)).observe(time.perf_counter() - started)
+        if cursor.rowcount >= 0:
+            DB_BATCH_ROWS.observe(cursor.rowcount)
+        self._changed(cursor.rowcount)
+        return cursor
+
+    @contextmanager
+    async def execute_fetchall(
+        self, sql: str, parameters: Iterable[Any] | None = None
+    ) -> Iterable[sqlite3.Row]:
+        started = time.perf_counter()
+        try:
+            return await super().execute_fetchall(sql, parameters)
+        finally:
+            DB_STATEMENT_SECONDS.labels(statement_label(sql)).observe(time.perf_counter() - started)
+
+    async def commit(self) -> None:
+        started = time.perf_counter()
+        try:
+            await super().commit()
+        finally:
+            DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+        if self._uncommitted_rows:
+            DB_COMMIT_ROWS.observe(self._uncommitted_rows)
+        self._uncommitted_rows = 0
+
+    def _changed(self, rowcount: int) -> None:
+        # -1 for statements that change no rows, such as queries
+        if rowcount > 0:
+            self._uncommitted_rows += rowcount
+
+
 @asynccontextmanager
 async def connect_db(db_path: str) -> AsyncGenerator[aiosqlite.Connection]:
-    conn = await aiosqlite.connect(db_path)
+    conn = await InstrumentedConnection(functools.partial(sqlite3.connect, db_path), 64)
     conn.row_factory = aiosqlite.Row
+    # Readers in other processes never block the writer, or each other
+    cursor = await conn.execute("PRAGMA journal_mode=WAL")
+    await cursor.close()
     try:
         yield conn
     finally:
@@ -1,25 +1,132 @@
 import asyncio
+import weakref
+from collections import Counter as Tally
 from collections import defaultdict
 from typing import Any, Callable, Coroutine, Generic, TypeVar
 
 import structlog
 
 from floorcast.common.aio import create_logged_task
+from floorcast.common.metrics import Counter, Gauge, Histogram, Labels, exponential_buckets
 
 logger = structlog.get_logger(__name__)
 
+EVENT_BUS_PENDING_TASKS = Gauge(
+    "floorcast_event_bus_pending_tasks", "Unordered subscriber calls still running"
+)
+EVENT_BUS_QUEUED_EVENTS = Gauge(
+    "floorcast_event_bus_queued_events",
+    "Events waiting for an ordered subscriber",
+    ["subscriber"],
+)
+EVENT_BUS_DROPPED_EVENTS = Counter(
+    "floorcast_event_bus_dropped_events_total",
+    "Events dropped because an ordered subscriber was too far behind",
+    ["subscriber"],
+)
+EVENT_BUS_BATCH_SIZE = Histogram(
+    "floorcast_event_bus_batch_size",
+    "Events handed to a batched subscriber per call",
+    ["subscriber"],
+    buckets=exponential_buckets(1, 2, 10),
+)
+
 
 T = TypeVar("T")
 
 
+class _OrderedSubscriber:
+    """One subscriber's FIFO of undelivered events, drained by a single long-lived worker.
+
+    Events reach the callback in publish order, one call at a time, or as lists of up to
+    `max_batch` events when batched. With a `max_pending`, newer events are dropped once that many
+    are waiting; without one, none are.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Any], Coroutine[Any, Any, None]],
+        max_pending: int | None,
+        max_batch: int | None,
+    ) -> None:
+        self._callback = callback
+        self.name = getattr(callback, "__qualname__", repr(callback))
+        self._max_batch = max_batch
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(max_pending or 0)
+        self._worker: asyncio.Task[Any] | None = None
+        self.dropped = 0
+
+    def put(self, event: Any) -> None:
+        if self._worker is None:
+            self._worker = create_logged_task(self._run(), name=f"subscriber {self.name}")
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            EVENT_BUS_DROPPED_EVENTS.labels(self.name).inc()
+            logger.warning(
+                "subscriber is behind, dropping event",
+                subscriber=self.name,
+                dropped=self.dropped,
+            )
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def join(self) -> None:
+        await self._queue.join()
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+
+    async def _run(self) -> None:
+        while True:
+            events = [await self._queue.get()]
+            if self._max_batch is not None:
+                while len(events) < self._max_batch and not self._queue.empty():
+                    events.append(self._queue.get_nowait())
+                EVENT_BUS_BATCH_SIZE.labels(self.name).observe(len(events))
+            try:
+                if self._max_batch is None:
+                    await self._callback(events[0])
+                else:
+                    await self._callback(events)
+            except Exception:
+                # One bad event mustn't stop delivery of the ones behind it
+                logger.exception("subscriber failed", subscriber=self.name)
+            finally:
+                for _ in events:
+                    self._queue.task_done()
+
+
 class TypedEventBus(Generic[T]):
     def __init__(self) -> None:
         self._registry: dict[type, set[Callable[..., Coroutine[Any, Any, None]]]] = defaultdict(set)
+        self._ordered: dict[type, set[_OrderedSubscriber]] = defaultdict(set)
         self._pending_tasks: set[asyncio.Task[Any]] = set()
+        _buses.add(self)
 
     def subscribe[T](
-        self, event_type: type[T], callback: Callable[[T], Coroutine[Any, Any, None]]
+        self,
+        event_type: type[T],
+        callback: Callable[[T], Coroutine[Any, Any, None]],
+        *,
+        ordered: bool = False,
+        max_pending: int | None = None,
     ) -> Callable[[], None]:
+        """Calls `callback` with every published event of `event_type`.
+
+        By default each call runs as its own task, concurrently with the others. An `ordered`
+        subscriber instead receives events one at a time in publish order, from a single worker.
+        Only give it a `max_pending` if it can do without the events dropped past that; a
+        subscriber that keeps state from them can't.
+        """
+        if ordered:
+            return self._subscribe_ordered(
+                event_type, _OrderedSubscriber(callback, max_pending, None)
+            )
+
         self._registry[event_type].add(callback)
 
         def unsubscribe() -> None:
@@ -27,11 +134,62 @@ class TypedEventBus(Generic[T]):
 
         return unsubscribe
 
+    def subscribe_batches[T](
+        self,
+        event_type: type[T],
+        callback: Callable[[list[T]], Coroutine[Any, Any, None]],
+        *,
+        max_batch: int = 500,
+        max_pending: int | None = None,
+    ) -> Callable[[], None]:
+        """Like an ordered subscription, but each call takes every event that arrived meanwhile."""
+        return self._subscribe_ordered(
+            event_type, _OrderedSubscriber(callback, max_pending, max_batch)
+        )
+
+    def _subscribe_ordered(
+        self, event_type: type, subscriber: _OrderedSubscriber
+    ) -> Callable[[], None]:
+        self._ordered[event_type].add(subscriber)
+
+        def unsubscribe() -> None:
+            self._ordered[event_type].discard(subscriber)
+            subscriber.close()
+
+        return unsubscribe
+
     def publish(self, event: T) -> None:
+        for subscriber in self._ordered[type(event)]:
+            subscriber.put(event)
         for callback in self._registry[type(event)]:
             task = create_logged_task(callback(event))
             self._pending_tasks.add(task)
             task.add_done_callback(self._pending_tasks.discard)
 
     async def wait_all(self) -> None:
+        """Waits until every event published so far has been handled."""
         await asyncio.gather(*self._pending_tasks)
+        for subscribers in list(self._ordered.values()):
+            for subscriber in list(subscribers):
+                await subscriber.join()
+
+
+# Every bus in the process, for the gauges to read when rendered
+_buses: weakref.WeakSet[TypedEventBus[Any]] = weakref.WeakSet()
+
+
+def _pending_tasks() -> int:
+    return sum(len(bus._pending_tasks) for bus in _buses)
+
+
+def _queued_events() -> dict[Labels, int]:
+    queued: Tally[Labels] = Tally()
+    for bus in _buses:
+        for subscribers in bus._ordered.values():
+            for subscriber in subscribers:
+                queued[(subscriber.name,)] += subscriber.qsize()
+    return queued
+
+
+EVENT_BUS_PENDING_TASKS.set_function(_pending_tasks)
+EVENT_BUS_QUEUED_EVENTS.set_function(_queued_events)
@@ -0,0 +1,270 @@
+"""Carries bus events between processes over a Unix domain socket.
+
+Events are sent as JSON and rebuilt only as the dataclasses a relay was given, so a frame can't
+run code in the receiving process; both ends must still run the same version of those classes.
+The socket is only reachable by the user running floorcast.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import os
+import struct
+import types
+import uuid
+from contextlib import suppress
+from datetime import datetime
+from typing import Any, Union, get_args, get_origin, get_type_hints
+
+import structlog
+
+from floorcast.infrastructure.backoff import Backoff
+from floorcast.infrastructure.event_bus import TypedEventBus
+
+logger = structlog.get_logger(__name__)
+
+_HEADER = struct.Struct("!I")
+# Queued to a peer to end its connection: it fell too far behind, or the broadcaster is stopping
+_CLOSE = b""
+
+
+class EventBroadcaster:
+    """Forwards a bus's events of the given types to every connected EventRelay.
+
+    Each event is encoded once for all peers. The latest event of each `latest` type is also
+    sent to peers as they connect, so a late joiner isn't missing e.g. the registry. A peer that
+    falls `max_pending` events behind is disconnected rather than allowed to stall the publisher;
+    it reconnects, but the events dropped in between are lost to it. Events of the `receive` types
+    that relays send back are published on the bus.
+    """
+
+    def __init__(
+        self,
+        bus: TypedEventBus[Any],
+        path: str,
+        event_types: tuple[type, ...],
+        latest: tuple[type, ...] = (),
+        max_pending: int = 10_000,
+        receive: tuple[type, ...] = (),
+    ) -> None:
+        self._bus = bus
+        self._path = path
+        self._event_types = event_types
+        self._latest_types = latest
+        self._receive_types = _by_name(receive)
+        self._max_pending = max_pending
+        self._latest: dict[type, bytes] = {}
+        self._peers: set[asyncio.Queue[bytes]] = set()
+        self._unsubscribers: list[Any] = []
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self) -> EventBroadcaster:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        await self.stop()
+
+    async def start(self) -> None:
+        with suppress(FileNotFoundError):
+            os.unlink(self._path)
+        # Bound owner-only from the start: a chmod afterwards would leave a window to connect in.
+        # The umask is process-wide, but only ever narrowed for the duration of the bind.
+        umask = os.umask(0o077)
+        try:
+            self._server = await asyncio.start_unix_server(self._serve, path=self._path)
+        finally:
+            os.umask(umask)
+        self._unsubscribers = [
+            self._bus.subscribe(event_type, self._forward, ordered=True)
+            for event_type in self._event_types
+        ]
+        logger.info("broadcasting events", path=self._path)
+
+    async def stop(self) -> None:
+        for unsubscribe in self._unsubscribers:
+            unsubscribe()
+        self._unsubscribers = []
+        for peer in self._peers:
+            peer.put_nowait(_CLOSE)
+        self._peers.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        with suppress(FileNotFoundError):
+            os.unlink(self._path)
+
+    @property
+    def peers(self) -> int:
+        return len(self._peers)
+
+    async def _forward(self, event: Any) -> None:
+        frame = _frame(event)
+        if isinstance(event, self._latest_types):
+            self._latest[type(event)] = frame
+        for peer in list(self._peers):
+            if peer.qsize() < self._max_pending:
+                peer.put_nowait(frame)
+            else:
+                logger.warning("disconnecting lagging event relay", pending=peer.qsize())
+                self._peers.discard(peer)
+                peer.put_nowait(_CLOSE)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer: asyncio.Queue[bytes] = asyncio.Queue()
+        for frame in self._latest.values():
+            peer.put_nowait(frame)
+        self._peers.add(peer)
+        logger.info("event relay connected", peers=len(self._peers))
+        receiving = asyncio.create_task(self._receive(reader))
+        try:
+            while True:
+                frames = [await peer.get()]
+                # Write everything already queued before waiting on the socket
+                while not peer.empty():
+                    frames.append(peer.get_nowait())
+                if _CLOSE in frames:
+                    break
+                writer.writelines(frames)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            receiving.cancel()
+            self._peers.discard(peer)
+            writer.close()
+            logger.info("event relay disconnected", peers=len(self._peers))
+
+    async def _receive(self, reader: asyncio.StreamReader) -> None:
+        with suppress(asyncio.IncompleteReadError, ConnectionError):
+            await _publish_frames(reader, self._bus, self._receive_types)
+
+
+class EventRelay:
+    """Republishes events received from an EventBroadcaster on a local bus.
+
+    Subscribers on the local bus see the same events as in the broadcasting process. Only events
+    of the given dataclass types are accepted; any other frame is logged and dropped. Local events
+    of the `send` types go the other way, to the broadcaster's bus, while connected.
+    """
+
+    def __init__(
+        self,
+        bus: TypedEventBus[Any],
+        path: str,
+        event_types: tuple[type, ...],
+        send: tuple[type, ...] = (),
+    ) -> None:
+        self._bus = bus
+        self._path = path
+        self._event_types = _by_name(event_types)
+        self._send_types = send
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def run(self) -> None:
+        """Relays events forever, reconnecting whenever the broadcaster goes away."""
+        unsubscribers = [
+            self._bus.subscribe(event_type, self._send, ordered=True)
+            for event_type in self._send_types
+        ]
+        try:
+            await self._connect_forever()
+        finally:
+            for unsubscribe in unsubscribers:
+                unsubscribe()
+
+    async def _connect_forever(self) -> None:
+        for backoff in Backoff(1, 5):
+            try:
+                reader, writer = await asyncio.open_unix_connection(self._path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(backoff.wait_seconds())
+                continue
+            backoff.reset()
+            logger.info("relaying events", path=self._path)
+            self._writer = writer
+            try:
+                await _publish_frames(reader, self._bus, self._event_types)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning("event broadcaster went away", retry_in=backoff.wait_seconds())
+            finally:
+                self._writer = None
+                writer.close()
+            await asyncio.sleep(backoff.wait_seconds())
+
+    async def _send(self, event: Any) -> None:
+        # Sent while connected only; what happens in between stays in this process
+        writer = self._writer
+        if writer is None:
+            return
+        writer.write(_frame(event))
+        with suppress(ConnectionError):
+            await writer.drain()
+
+
+async def _publish_frames(
+    reader: asyncio.StreamReader, bus: TypedEventBus[Any], event_types: dict[str, type]
+) -> None:
+    while True:
+        (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+        payload = await reader.readexactly(size)
+        try:
+            event = _decode(payload, event_types)
+        except (ValueError, KeyError, TypeError):
+            logger.warning("dropping undecodable event", size=size, exc_info=True)
+            continue
+        bus.publish(event)
+
+
+def _by_name(event_types: tuple[type, ...]) -> dict[str, type]:
+    return {event_type.__qualname__: event_type for event_type in event_types}
+
+
+def _frame(event: Any) -> bytes:
+    payload = _encode(event)
+    return _HEADER.pack(len(payload)) + payload
+
+
+def _encode(event: Any) -> bytes:
+    frame = {"type": type(event).__qualname__, "event": dataclasses.asdict(event)}
+    return json.dumps(frame, separators=(",", ":"), default=_encode_value).encode()
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"can't send {type(value).__name__} between processes")
+
+
+def _decode(payload: bytes, event_types: dict[str, type]) -> Any:
+    frame = json.loads(payload)
+    return _build(event_types[frame["type"]], frame["event"])
+
+
+def _build(annotation: Any, value: Any) -> Any:
+    """Rebuilds `value`, as decoded from JSON, into the type it's annotated with."""
+    if value is None:
+        return None
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        (annotation,) = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _build(annotation, value)
+    if origin is dict:
+        _, value_type = get_args(annotation)
+        return {key: _build(value_type, item) for key, item in value.items()}
+    if origin is list:
+        (item_type,) = get_args(annotation)
+        return [_build(item_type, item) for item in value]
+    if isinstance(annotation, type) and dataclasses.is_dataclass(annotation):
+        hints = get_type_hints(annotation)
+        return annotation(**{name: _build(hints[name], item) for name, item in value.items()})
+    if annotation is datetime:
+        return datetime.fromisoformat(value)
+    if annotation is uuid.UUID:
+        return uuid.UUID(value)
+    return value
@@ -0,0 +1,82 @@
+"""Serving the metrics of several processes from any one of them.
+
+Each process with a directory writes its registry there every few seconds, as `<pid>.json`. A
+process rendering its metrics adds in what the others last wrote, so any API worker answers a
+scrape with the same totals: the ingest process's, and every worker's.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import structlog
+
+from floorcast.common.metrics import REGISTRY, Registry
+
+logger = structlog.get_logger(__name__)
+
+
+class ProcessMetrics:
+    """This process's metrics, and with a `directory`, those of the processes sharing it.
+
+    What the other processes wrote is up to `interval_seconds` old. Files are never removed while
+    running, so the counts of a process that exits are still part of the totals.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        interval_seconds: float = 5.0,
+        registry: Registry = REGISTRY,
+    ) -> None:
+        self._directory = Path(directory) if directory is not None else None
+        self._interval_seconds = interval_seconds
+        self._registry = registry
+        self._pid = os.getpid()
+
+    def clear(self) -> None:
+        """Removes what earlier runs wrote; call before starting the other processes."""
+        if self._directory is None:
+            return
+        self._directory.mkdir(parents=True, exist_ok=True)
+        for path in self._directory.glob("*.json"):
+            path.unlink()
+
+    async def run(self) -> None:
+        if self._directory is None:
+            return
+        self._directory.mkdir(parents=True, exist_ok=True)
+        try:
+            while True:
+                self.write()
+                await asyncio.sleep(self._interval_seconds)
+        finally:
+            self.write()
+
+    def write(self) -> None:
+        if self._directory is None:
+            return
+        path = self._directory / f"{self._pid}.json"
+        partial = path.with_suffix(".partial")
+        partial.write_text(json.dumps(self._registry.export(), separators=(",", ":")))
+        partial.replace(path)
+
+    def render(self) -> str:
+        return self._registry.render(self._others())
+
+    def _others(self) -> list[dict[str, Any]]:
+        if self._directory is None:
+            return []
+        others = []
+        for path in self._directory.glob("*.json"):
+            if path.stem == str(self._pid):
+                continue
+            try:
+                others.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                logger.warning("unreadable metrics file", path=str(path), exc_info=True)
+        return others
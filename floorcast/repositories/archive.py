@@ -0,0 +1,354 @@
+"""Old events moved out of SQLite into segment files, read back alongside the ones still in it.
+
+Each archived month is one segment file in `<db stem>.archive/` next to the database. Archived
+ranges are served from the segments alone: once a month is archived its rows are purged from the
+database, and any row still found in an archived range is ignored, so nothing is ever counted
+twice. Payloads aren't archived, so archived events read back with empty `data`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import time
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, TypeVar
+
+import structlog
+
+from floorcast.domain.models import TimelineCursor
+from floorcast.domain.ports import EventArchive, EventStore
+from floorcast.repositories.segments import Segment, SegmentWriter
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from floorcast.domain.event_filtering import TimelineFilter
+    from floorcast.domain.models import CompactEvent, Event
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+
+def _epoch_millis(timestamp: datetime) -> int:
+    return int(timestamp.timestamp() * 1000)
+
+
+def _key(cursor: TimelineCursor) -> tuple[datetime, int]:
+    return cursor.timestamp, cursor.id
+
+
+class ArchivedEventRepository(EventStore, EventArchive):
+    """An EventStore that reads archived months from segment files and the rest from `inner`.
+
+    Segment reads decompress blocks, so they run in a thread. Processes that only read pick up
+    segments the writer adds or retires by rescanning the directory, at most every
+    `rescan_seconds`.
+    """
+
+    def __init__(
+        self,
+        inner: EventStore,
+        db_path: str,
+        batch_size: int = 1000,
+        rescan_seconds: float = 5.0,
+    ) -> None:
+        self.inner = inner
+        path = Path(db_path)
+        self._directory = path.parent / f"{path.stem}.archive"
+        self._batch_size = batch_size
+        self._rescan_seconds = rescan_seconds
+        self._scanned_at = 0.0
+        self._segments: list[Segment] = []
+
+    async def __aenter__(self) -> ArchivedEventRepository:
+        await self._rescan()
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+    async def create(self, event: Event) -> Event:
+        return await self.inner.create(event)
+
+    async def get_by_id(self, event_id: int) -> Event | None:
+        await self._maybe_rescan()
+        for segment in self._segments:
+            if segment.min_id is not None and segment.max_id is not None:
+                if segment.min_id <= event_id <= segment.max_id:
+                    event = await asyncio.to_thread(segment.get_by_id, event_id)
+                    if event is not None:
+                        return event
+        event = await self.inner.get_by_id(event_id)
+        bounds = self._archive_bounds()
+        if event is None or (bounds is not None and bounds[0] <= event.timestamp < bounds[1]):
+            return None
+        return event
+
+    async def get_between_id_and_timestamp(
+        self, start_time: datetime, end_time: datetime
+    ) -> list[Event]:
+        archived = await self._from_segments(
+            start_time, end_time, lambda segment: segment.events_between(start_time, end_time)
+        )
+        live = await self.inner.get_between_id_and_timestamp(start_time, end_time)
+        if bounds := self._archive_bounds(start_time, end_time):
+            first, end = bounds
+            live = [event for event in live if not first <= event.timestamp < end]
+        return list(heapq.merge(*archived, live, key=lambda event: (event.timestamp, event.id)))
+
+    async def get_timeline_between(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        include_start: bool = False,
+        timeline_filter: TimelineFilter | None = None,
+    ) -> list[CompactEvent]:
+        archived = await self._from_segments(
+            start_time,
+            end_time,
+            lambda segment: segment.timeline_between(
+                start_time, end_time, include_start, timeline_filter
+            ),
+        )
+        live = await self.inner.get_timeline_between(
+            start_time, end_time, include_start, timeline_filter
+        )
+        if bounds := self._archive_bounds(start_time, end_time):
+            first_ms, end_ms = map(_epoch_millis, bounds)
+            live = [event for event in live if not first_ms <= event.timestamp < end_ms]
+        return list(heapq.merge(*archived, live, key=lambda event: (event.timestamp, event.id)))
+
+    async def get_timeline_after_id(self, after_id: int, limit: int) -> list[CompactEvent]:
+        await self._maybe_rescan()
+        archived = await asyncio.gather(
+            *(
+                asyncio.to_thread(segment.timeline_after_id, after_id, limit)
+                for segment in self._segments
+                if segment.max_id is not None and segment.max_id > after_id
+            )
+        )
+        bounds = self._archive_bounds()
+        first_ms, end_ms = map(_epoch_millis, bounds) if bounds else (0, 0)
+        live: list[CompactEvent] = []
+        live_after = after_id
+        while len(live) < limit:
+            page = await self.inner.get_timeline_after_id(live_after, limit)
+            live.extend(event for event in page if not first_ms <= event.timestamp < end_ms)
+            if len(page) < limit:
+                break
+            live_after = page[-1].id
+        return list(islice(heapq.merge(*archived, live, key=lambda event: event.id), limit))
+
+    async def iter_timeline_between(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        after: TimelineCursor | None = None,
+        chunk_size: int = 1000,
+        limit: int | None = None,
+    ) -> AsyncIterator[tuple[list[CompactEvent], TimelineCursor]]:
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = chunk_size if remaining is None else min(chunk_size, remaining)
+            page = await self.get_timeline_page(start_time, end_time, after, page_size)
+            if not page:
+                return
+            after = page[-1][0]
+            yield [event for _, event in page], after
+            if len(page) < page_size:
+                return
+            if remaining is not None:
+                remaining -= len(page)
+
+    async def get_timeline_page(
+        self, start_time: datetime, end_time: datetime, after: TimelineCursor | None, limit: int
+    ) -> list[tuple[TimelineCursor, CompactEvent]]:
+        """One keyset page over the segments and the database, short only once they run out.
+
+        Every overlapping segment and the database are asked for a page after the cursor. One that
+        filled its page may hold more, so nothing past the end of the shortest full page is taken
+        before they are all asked again.
+        """
+        await self._maybe_rescan()
+        bounds = self._archive_bounds(start_time, end_time)
+        page: list[tuple[TimelineCursor, CompactEvent]] = []
+        while len(page) < limit:
+            wanted = limit - len(page)
+            live_page, *segment_pages = await asyncio.gather(
+                self.inner.get_timeline_page(start_time, end_time, after, wanted),
+                *(
+                    asyncio.to_thread(segment.timeline_page, start_time, end_time, after, wanted)
+                    for segment in self._segments
+                    if segment.overlaps(start_time, end_time)
+                ),
+            )
+            bound = min(
+                (
+                    _key(source[-1][0])
+                    for source in (live_page, *segment_pages)
+                    if len(source) == wanted
+                ),
+                default=None,
+            )
+            live = live_page
+            if bounds is not None:
+                first, end = bounds
+                live = [item for item in live_page if not first <= item[0].timestamp < end]
+            merged = heapq.merge(live, *segment_pages, key=lambda item: _key(item[0]))
+            taken = [
+                item for item in islice(merged, wanted) if bound is None or _key(item[0]) <= bound
+            ]
+            page.extend(taken)
+            if bound is None:
+                break
+            # Past an archived range the database's rows are all skipped; carry on after them
+            after = taken[-1][0] if taken else TimelineCursor(timestamp=bound[0], id=bound[1])
+        return page
+
+    async def get_latest_timestamp(self) -> datetime | None:
+        latest = await self.inner.get_latest_timestamp()
+        if latest is not None:
+            return latest
+        await self._maybe_rescan()
+        return next((s.last_timestamp for s in reversed(self._segments) if s.last_timestamp), None)
+
+    async def get_earliest_timestamp(self) -> datetime | None:
+        await self._maybe_rescan()
+        earliest = next((s.first_timestamp for s in self._segments if s.first_timestamp), None)
+        return earliest or await self.inner.get_earliest_timestamp()
+
+    async def get_events_page(
+        self, start_time: datetime, end_time: datetime, after: TimelineCursor | None, limit: int
+    ) -> list[Event]:
+        """A page of the full events still in the database; archived events have no payload."""
+        return await self.inner.get_events_page(start_time, end_time, after, limit)
+
+    async def delete_between(self, start_time: datetime, end_time: datetime, limit: int) -> int:
+        return await self.inner.delete_between(start_time, end_time, limit)
+
+    async def get_ids_before(self, timestamp: datetime) -> range:
+        return await self.inner.get_ids_before(timestamp)
+
+    async def strip_payloads(self, after_id: int, through_id: int) -> int:
+        return await self.inner.strip_payloads(after_id, through_id)
+
+    async def delete_before_id(self, event_id: int, limit: int) -> int:
+        """Deletes events with ids below `event_id`, oldest first; how many.
+
+        Segments only ever go whole, however many events that is. One that also holds later
+        events is kept, as are the database's own events in its range.
+        """
+        await self._maybe_rescan()
+        if self._segments:
+            oldest = self._segments[0]
+            if oldest.max_id is None or oldest.max_id < event_id:
+                return self._retire(oldest)
+        return await self.inner.delete_before_id(event_id, limit)
+
+    async def archived_until(self) -> datetime | None:
+        await self._maybe_rescan()
+        return self._segments[-1].end if self._segments else None
+
+    async def archive(self, start_time: datetime, end_time: datetime) -> int:
+        """Writes the events in [start_time, end_time) to a new segment; how many.
+
+        The range's rows stay in the database, unread, until purge_archived deletes them.
+        """
+        path = self._directory / f"events-{start_time:%Y%m%d}-{end_time:%Y%m%d}.seg"
+        if not path.exists():
+            self._directory.mkdir(exist_ok=True)
+            writer = SegmentWriter(path, start_time, end_time)
+            try:
+                after: TimelineCursor | None = None
+                while events := await self.inner.get_events_page(
+                    start_time, end_time, after, self._batch_size
+                ):
+                    await asyncio.to_thread(writer.add, events)
+                    after = TimelineCursor(timestamp=events[-1].timestamp, id=events[-1].id)
+                await asyncio.to_thread(writer.finish)
+            except BaseException:
+                writer.abort()
+                raise
+        await self._rescan()
+        segment = next(segment for segment in self._segments if segment.path == path)
+        logger.info(
+            "archived events",
+            start=start_time.isoformat(),
+            end=end_time.isoformat(),
+            events=segment.count,
+            bytes=path.stat().st_size,
+        )
+        return segment.count
+
+    async def purge_archived(self, limit: int) -> int:
+        """Deletes up to `limit` of the database's rows in archived ranges; how many.
+
+        Rows only land there after their range was archived if they arrived that late, and
+        aren't read; purging them keeps the database from holding what's never served.
+        """
+        await self._maybe_rescan()
+        for segment in self._segments:
+            if deleted := await self.inner.delete_between(segment.start, segment.end, limit):
+                return deleted
+        return 0
+
+    def _archive_bounds(
+        self, start_time: datetime | None = None, end_time: datetime | None = None
+    ) -> tuple[datetime, datetime] | None:
+        """[start, end) of the archive, or None if nothing in the query's range is archived.
+
+        Months are archived one after another from the oldest, and retired oldest first, so the
+        segments always make up one unbroken range: the database's rows are checked against its
+        two ends, not against each segment.
+        """
+        if not self._segments:
+            return None
+        first, end = self._segments[0].start, self._segments[-1].end
+        if start_time is not None and end_time is not None:
+            if end_time < first or start_time >= end:
+                return None
+        return first, end
+
+    async def _from_segments(
+        self, start_time: datetime, end_time: datetime, read: Callable[[Segment], list[T]]
+    ) -> list[list[T]]:
+        await self._maybe_rescan()
+        return await asyncio.gather(
+            *(
+                asyncio.to_thread(read, segment)
+                for segment in self._segments
+                if segment.overlaps(start_time, end_time)
+            )
+        )
+
+    def _retire(self, segment: Segment) -> int:
+        self._segments.remove(segment)
+        # Not closed: a read in a thread may still hold it, and the map goes with the last one
+        segment.path.unlink(missing_ok=True)
+        logger.info(
+            "retired archive segment",
+            start=segment.start.isoformat(),
+            end=segment.end.isoformat(),
+            events=segment.count,
+        )
+        return segment.count
+
+    async def _maybe_rescan(self) -> None:
+        if time.monotonic() - self._scanned_at >= self._rescan_seconds:
+            await self._rescan()
+
+    async def _rescan(self) -> None:
+        """Opens segments that appeared on disk and drops the ones that were retired."""
+        self._scanned_at = time.monotonic()
+        on_disk = set(self._directory.glob("events-*.seg"))
+        known = {segment.path for segment in self._segments}
+        self._segments = [segment for segment in self._segments if segment.path in on_disk]
+        for path in on_disk - known:
+            self._segments.append(await asyncio.to_thread(Segment, path))
+        self._segments.sort(key=lambda segment: segment.start)
@@ -0,0 +1,146 @@
+"""Online backups of the database, and of the event partitions and archive next to it.
+
+Each backup is a directory under `directory`: a copy of every database file, optionally gzipped,
+and hard links to the archive's segments, which are never modified once written.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import structlog
+
+from floorcast.domain.ports import BackupStore
+
+if TYPE_CHECKING:
+    from floorcast.domain.models import BackupProgress
+
+logger = structlog.get_logger(__name__)
+
+
+class BackupRepository(BackupStore):
+    """Backs up through SQLite's online backup API, a few pages per step.
+
+    Each file is copied on its own connection, in a thread, from inside one read transaction. In
+    WAL mode that never blocks the writer, and pins the copy to one consistent snapshot: without
+    it, every write between steps would restart the backup from the first page. Each step copies
+    `pages_per_step` pages and then sleeps `step_sleep` seconds, so a backup shares the disk with
+    ingestion rather than saturating it. The sleep is in the progress callback: sqlite3's own
+    `sleep` argument only applies when a step finds the database busy or locked.
+
+    Backups are named by the caller; `names` sorts them, so names should sort oldest first. A
+    lock file keeps backups from several processes from running at once.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        directory: str,
+        compress: bool = True,
+        pages_per_step: int = 256,
+        step_sleep: float = 0.005,
+    ) -> None:
+        self._db_path = Path(db_path)
+        self._directory = Path(directory)
+        self._compress = compress
+        self._pages_per_step = pages_per_step
+        self._step_sleep = step_sleep
+
+    async def create(self, name: str, progress: BackupProgress) -> bool:
+        """Writes the backup `name`; False, having done nothing, if another one is running."""
+        self._directory.mkdir(parents=True, exist_ok=True)
+        with open(self._directory / ".lock", "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            # Left behind by a backup that never finished
+            for stale in self._directory.glob("*.partial"):
+                await asyncio.to_thread(shutil.rmtree, stale)
+            partial = self._directory / f"{name}.partial"
+            partial.mkdir()
+            try:
+                await self._copy_into(partial, progress)
+                partial.rename(self._directory / name)
+            except BaseException:
+                await asyncio.to_thread(shutil.rmtree, partial, ignore_errors=True)
+                raise
+        return True
+
+    async def names(self) -> list[str]:
+        return sorted(
+            path.name
+            for path in self._directory.glob("*")
+            if path.is_dir() and path.suffix != ".partial"
+        )
+
+    async def delete(self, name: str) -> None:
+        await asyncio.to_thread(shutil.rmtree, self._directory / name)
+
+    async def _copy_into(self, target: Path, progress: BackupProgress) -> None:
+        # The database, then its event partitions (`<stem>.events-YYYY-MM.db`)
+        directory, stem = self._db_path.parent, self._db_path.stem
+        sources = [self._db_path, *sorted(directory.glob(f"{stem}.*.db"))]
+        for source in sources:
+            if not source.exists():
+                continue
+            copy = target / source.name
+            await asyncio.to_thread(self._backup_file, source, copy, progress)
+            if self._compress:
+                await asyncio.to_thread(_gzip, copy)
+        segments = directory / f"{stem}.archive"
+        if segments.is_dir():
+            await asyncio.to_thread(_link_tree, segments, target / segments.name)
+        progress.bytes = sum(path.stat().st_size for path in target.rglob("*") if path.is_file())
+
+    def _backup_file(self, source: Path, target: Path, progress: BackupProgress) -> None:
+        copied_before = progress.pages_copied
+        total_before = progress.pages_total
+
+        def on_step(_: int, remaining: int, total: int) -> None:
+            progress.pages_total = total_before + total
+            progress.pages_copied = copied_before + total - remaining
+            if remaining:
+                time.sleep(self._step_sleep)
+
+        started = time.monotonic()
+        with (
+            closing(sqlite3.connect(source, isolation_level=None)) as conn,
+            closing(sqlite3.connect(target)) as copy,
+        ):
+            # Opens the read transaction every step then copies from
+            conn.execute("BEGIN")
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            conn.backup(copy, pages=self._pages_per_step, progress=on_step)
+            conn.execute("COMMIT")
+        logger.debug(
+            "backed up database file",
+            source=str(source),
+            pages=progress.pages_total - total_before,
+            seconds=round(time.monotonic() - started, 3),
+        )
+
+
+def _gzip(path: Path) -> None:
+    with open(path, "rb") as source, gzip.open(f"{path}.gz", "wb", compresslevel=6) as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    path.unlink()
+
+
+def _link_tree(source: Path, target: Path) -> None:
+    target.mkdir()
+    for path in source.glob("*.seg"):
+        try:
+            os.link(path, target / path.name)
+        except OSError:
+            # Across filesystems; segments are immutable, so a copy is as good
+            shutil.copy2(path, target / path.name)
@@ -1,11 +1,15 @@
 import json
+import sqlite3
 from datetime import datetime, timezone
+from typing import AsyncIterator
 
 import structlog
-from aiosqlite import Connection
+from aiosqlite import Connection, Row
 
-from floorcast.domain.models import CompactEvent, Event
+from floorcast.domain.event_filtering import TimelineFilter
+from floorcast.domain.models import CompactEvent, Event, TimelineCursor
 from floorcast.domain.ports import EventStore
+from floorcast.repositories.filters import timeline_filter_clause
 
 logger = structlog.get_logger(__name__)
 
@@ -51,28 +55,23 @@ class EventRepository(EventStore):
         return event
 
     async def get_timeline_between(
-        self, start_time: datetime, end_time: datetime
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        include_start: bool = False,
+        timeline_filter: TimelineFilter | None = None,
     ) -> list[CompactEvent]:
+        lower_bound = ">=" if include_start else ">"
+        filter_sql, filter_params = timeline_filter_clause(timeline_filter)
         rows = await self.conn.execute_fetchall(
-            """
+            f"""
             SELECT id, entity_id, timestamp, state, unit FROM events
-            WHERE timestamp > ? AND timestamp < ?
+            WHERE timestamp {lower_bound} ? AND timestamp < ?{filter_sql}
             ORDER BY timestamp, id
             """,
-            (start_time, end_time),
+            (start_time, end_time, *filter_params),
         )
-        events = [
-            CompactEvent(
-                id=row[0],
-                entity_id=row[1],
-                timestamp=int(
-                    datetime.fromisoformat(row[2]).replace(tzinfo=timezone.utc).timestamp() * 1000
-                ),
-                state=row[3],
-                unit=row[4],
-            )
-            for row in rows
-        ]
+        events = [_to_compact_event(row) for row in rows]
         logger.debug(
             "fetched events for timeline",
             lower_bound=start_time.isoformat(),
@@ -81,6 +80,94 @@ class EventRepository(EventStore):
         )
         return events
 
+    async def get_timeline_after_id(self, after_id: int, limit: int) -> list[CompactEvent]:
+        rows = await self.conn.execute_fetchall(
+            """
+            SELECT id, entity_id, timestamp, state, unit FROM events
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+            """,
+            (after_id, limit),
+        )
+        return [_to_compact_event(row) for row in rows]
+
+    async def iter_timeline_between(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        after: TimelineCursor | None = None,
+        chunk_size: int = 1000,
+        limit: int | None = None,
+    ) -> AsyncIterator[tuple[list[CompactEvent], TimelineCursor]]:
+        """Yields timeline events in (timestamp, id) order, one chunk per query.
+
+        Each chunk is a separate keyset query rather than one long-running statement, so the
+        shared connection is never held across awaits. The cursor yielded with a chunk resumes
+        immediately after its last event.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = chunk_size if remaining is None else min(chunk_size, remaining)
+            page = await self.get_timeline_page(start_time, end_time, after, page_size)
+            if not page:
+                return
+            after = page[-1][0]
+            yield [event for _, event in page], after
+            if len(page) < page_size:
+                return
+            if remaining is not None:
+                remaining -= len(page)
+
+    async def get_timeline_page(
+        self, start_time: datetime, end_time: datetime, after: TimelineCursor | None, limit: int
+    ) -> list[tuple[TimelineCursor, CompactEvent]]:
+        """One keyset page of the timeline, each event with the cursor that resumes after it."""
+        if after is None:
+            rows = await self.conn.execute_fetchall(
+                """
+                SELECT id, entity_id, timestamp, state, unit FROM events
+                WHERE timestamp > ? AND timestamp < ?
+                ORDER BY timestamp, id
+                LIMIT ?
+                """,
+                (start_time, end_time, limit),
+            )
+        else:
+            rows = await self.conn.execute_fetchall(
+                """
+                SELECT id, entity_id, timestamp, state, unit FROM events
+                WHERE (timestamp, id) > (?, ?) AND timestamp < ?
+                ORDER BY timestamp, id
+                LIMIT ?
+                """,
+                (after.timestamp, after.id, end_time, limit),
+            )
+        return [
+            (
+                TimelineCursor(
+                    timestamp=datetime.fromisoformat(row[2]).replace(tzinfo=timezone.utc),
+                    id=row[0],
+                ),
+                _to_compact_event(row),
+            )
+            for row in rows
+        ]
+
+    async def get_latest_timestamp(self) -> datetime | None:
+        cursor = await self.conn.execute("SELECT MAX(timestamp) FROM events")
+        row = await cursor.fetchone()
+        if not row or row[0] is None:
+            return None
+        return datetime.fromisoformat(row[0]).replace(tzinfo=timezone.utc)
+
+    async def get_earliest_timestamp(self) -> datetime | None:
+        cursor = await self.conn.execute("SELECT MIN(timestamp) FROM events")
+        row = await cursor.fetchone()
+        if not row or row[0] is None:
+            return None
+        return datetime.fromisoformat(row[0]).replace(tzinfo=timezone.utc)
+
     async def get_by_id(self, serial: int) -> Event | None:
         cursor = await self.conn.execute("SELECT * FROM events WHERE id = ?", (serial,))
         row = await cursor.fetchone()
@@ -88,11 +175,126 @@ class EventRepository(EventStore):
             return None
         return Event.from_dict(dict(row))
 
+    async def get_id_by_external_id(self, external_id: str) -> int | None:
+        cursor = await self.conn.execute(
+            "SELECT id FROM events WHERE external_id = ?", (external_id,)
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        return None if row is None else int(row[0])
+
+    async def get_events_page(
+        self, start_time: datetime, end_time: datetime, after: TimelineCursor | None, limit: int
+    ) -> list[Event]:
+        """One keyset page of full events from `start_time`, inclusive, in (timestamp, id) order."""
+        if after is None:
+            rows = await self.conn.execute_fetchall(
+                """
+                SELECT * FROM events WHERE timestamp >= ? AND timestamp < ?
+                ORDER BY timestamp, id LIMIT ?
+                """,
+                (start_time, end_time, limit),
+            )
+        else:
+            rows = await self.conn.execute_fetchall(
+                """
+                SELECT * FROM events WHERE (timestamp, id) > (?, ?) AND timestamp < ?
+                ORDER BY timestamp, id LIMIT ?
+                """,
+                (after.timestamp, after.id, end_time, limit),
+            )
+        return [Event.from_dict(dict(row)) for row in rows]
+
+    async def delete_between(self, start_time: datetime, end_time: datetime, limit: int) -> int:
+        """Deletes up to `limit` events timestamped in [start_time, end_time); how many."""
+        cursor = await self.conn.execute(
+            """
+            DELETE FROM events WHERE id IN (
+                SELECT id FROM events WHERE timestamp >= ? AND timestamp < ? LIMIT ?
+            )
+            """,
+            (start_time, end_time, limit),
+        )
+        await self.conn.commit()
+        return cursor.rowcount
+
+    async def get_ids_before(self, timestamp: datetime) -> range:
+        """Ids of the events ingested before the first one at or after `timestamp`."""
+        cursor = await self.conn.execute(
+            """
+            SELECT
+                (SELECT MIN(id) FROM events),
+                COALESCE(
+                    (SELECT id FROM events WHERE timestamp >= ? ORDER BY timestamp, id LIMIT 1),
+                    (SELECT MAX(id) + 1 FROM events)
+                )
+            """,
+            (timestamp,),
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        if row is None or row[0] is None:
+            return range(0)
+        return range(row[0], row[1])
+
+    async def strip_payloads(self, after_id: int, through_id: int) -> int:
+        """Empties data and metadata of the events in the id range; how many it changed.
+
+        Shrinking rows in place leaves their pages just as many, so the rows are deleted and
+        inserted again instead, which lets SQLite merge the emptied pages and free them. The
+        rewrite is one script, so nothing else on the connection runs between the delete and the
+        insert, and it runs in a savepoint that is rolled back if any of it fails.
+        """
+        await self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS stripped_events AS SELECT * FROM events WHERE 0"
+        )
+        await self.conn.execute("DELETE FROM temp.stripped_events")
+        cursor = await self.conn.execute(
+            """
+            INSERT INTO temp.stripped_events SELECT * FROM events
+            WHERE id > ? AND id <= ? AND (data != '{}' OR metadata != '{}')
+            """,
+            (after_id, through_id),
+        )
+        if cursor.rowcount <= 0:
+            return 0
+        try:
+            await self.conn.executescript(
+                """
+                SAVEPOINT strip_payloads;
+                UPDATE temp.stripped_events SET data = '{}', metadata = '{}';
+                DELETE FROM events WHERE id IN (SELECT id FROM temp.stripped_events);
+                INSERT INTO events SELECT * FROM temp.stripped_events;
+                DELETE FROM temp.stripped_events;
+                RELEASE strip_payloads;
+                """
+            )
+        except sqlite3.Error:
+            # Some errors already rolled the whole transaction back, savepoint and all
+            if self.conn.in_transaction:
+                await self.conn.execute("ROLLBACK TO strip_payloads")
+                await self.conn.execute("RELEASE strip_payloads")
+            raise
+        return cursor.rowcount
+
+    async def delete_before_id(self, event_id: int, limit: int) -> int:
+        """Deletes up to `limit` of the oldest events with ids below `event_id`; how many."""
+        cursor = await self.conn.execute(
+            """
+            DELETE FROM events WHERE id IN (
+                SELECT id FROM events WHERE id < ? ORDER BY id LIMIT ?
+            )
+            """,
+            (event_id, limit),
+        )
+        await self.conn.commit()
+        return cursor.rowcount
+
     async def get_between_id_and_timestamp(
         self, start_time: datetime, end_time: datetime
     ) -> list[Event]:
         rows = await self.conn.execute_fetchall(
-            "SELECT * FROM events WHERE timestamp > ? AND timestamp < ?",
+            "SELECT * FROM events WHERE timestamp > ? AND timestamp < ? ORDER BY timestamp, id",
             (start_time, end_time),
         )
         events = [Event.from_dict(dict(row)) for row in rows]
@@ -103,3 +305,15 @@ class EventRepository(EventStore):
             count=len(events),
         )
         return events
+
+
+def _to_compact_event(row: Row) -> CompactEvent:
+    return CompactEvent(
+        id=row[0],
+        entity_id=row[1],
+        timestamp=int(
+            datetime.fromisoformat(row[2]).replace(tzinfo=timezone.utc).timestamp() * 1000
+        ),
+        state=row[3],
+        unit=row[4],
+    )
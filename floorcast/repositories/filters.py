@@ -0,0 +1,24 @@
+import json
+from typing import Any
+
+from floorcast.domain.event_filtering import TimelineFilter
+
+
+def timeline_filter_clause(
+    timeline_filter: TimelineFilter | None, domain_column: str = "domain"
+) -> tuple[str, tuple[Any, ...]]:
+    """Renders a TimelineFilter as extra `AND ...` conditions plus their parameters.
+
+    Sets are bound as a single JSON array so the statement text doesn't vary with their size.
+    """
+    if timeline_filter is None:
+        return "", ()
+    sql = ""
+    params: list[Any] = []
+    if timeline_filter.entity_ids is not None:
+        sql += " AND entity_id IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps(sorted(timeline_filter.entity_ids)))
+    if timeline_filter.domains is not None:
+        sql += f" AND {domain_column} IN (SELECT value FROM json_each(?))"
+        params.append(json.dumps(sorted(timeline_filter.domains)))
+    return sql, tuple(params)
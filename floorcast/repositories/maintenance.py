@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from aiosqlite import Connection
+
+from floorcast.domain.ports import StorageMaintenance
+
+if TYPE_CHECKING:
+    from floorcast.repositories.partitioned_event import PartitionedEventRepository
+
+
+class MaintenanceRepository(StorageMaintenance):
+    """Storage upkeep for the database, and for its event partition files if there are any."""
+
+    def __init__(self, conn: Connection, partitions: PartitionedEventRepository | None = None):
+        self.conn = conn
+        self._partitions = partitions
+
+    async def reclaim_space(self, max_pages: int) -> int:
+        """Returns up to `max_pages` free pages per file to the filesystem; how many it returned.
+
+        A no-op unless the database uses auto_vacuum=INCREMENTAL. Unlike VACUUM, each call
+        holds the write lock only as long as it takes to move that many pages.
+        """
+        reclaimed = 0
+        for conn in self._connections():
+            before = await self._free_pages(conn)
+            # execute() steps a pragma only once, which frees a single page; a script runs it
+            await conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)})")
+            reclaimed += before - await self._free_pages(conn)
+        return reclaimed
+
+    async def used_bytes(self) -> int:
+        """Size of the database less its free pages, which the next writes would reuse."""
+        used = 0
+        for conn in self._connections():
+            page_count = await self._pragma(conn, "page_count")
+            page_size = await self._pragma(conn, "page_size")
+            used += (page_count - await self._free_pages(conn)) * page_size
+        return used
+
+    def _connections(self) -> list[Connection]:
+        # The partitions include the main database, which holds events from before partitioning
+        return self._partitions.connections if self._partitions else [self.conn]
+
+    async def _free_pages(self, conn: Connection) -> int:
+        return await self._pragma(conn, "freelist_count")
+
+    async def _pragma(self, conn: Connection, name: str) -> int:
+        cursor = await conn.execute(f"PRAGMA {name}")
+        row = await cursor.fetchone()
+        await cursor.close()
+        assert row is not None
+        return int(row[0])
@@ -0,0 +1,446 @@
+"""Events stored in one SQLite file per month, next to the main database.
+
+Each month's events go to their own file, so indexes stay the size of a month and retiring a month
+is a file delete. Events from before partitioning stay in the main database's events table, which
+is treated as the oldest partition.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import os
+import re
+import time
+from contextlib import AbstractAsyncContextManager, AsyncExitStack, suppress
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, TypeVar
+
+import structlog
+from aiosqlite import Connection
+
+from floorcast.domain.ports import EventStore
+from floorcast.repositories.event import EventRepository
+
+if TYPE_CHECKING:
+    from floorcast.domain.event_filtering import TimelineFilter
+    from floorcast.domain.models import CompactEvent, Event, TimelineCursor
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+# The events table as migrations leave it in the main database. Partition files aren't migrated,
+# so a migration that changes the events table has to change this too
+PARTITION_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        state TEXT,
+        domain TEXT NOT NULL,
+        external_id TEXT UNIQUE NOT NULL,
+        event_id TEXT UNIQUE NOT NULL,
+        event_type TEXT NOT NULL,
+        entity_id TEXT,
+        timestamp DATETIME NOT NULL,
+        data JSON NOT NULL DEFAULT '{}',
+        metadata JSON NOT NULL DEFAULT '{}',
+        unit TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS ix_events_timestamp ON events(timestamp);
+    CREATE INDEX IF NOT EXISTS ix_events_type ON events(event_type);
+    CREATE INDEX IF NOT EXISTS ix_events_timestamp_id ON events(timestamp, id);
+    CREATE INDEX IF NOT EXISTS ix_events_entity_id_timestamp ON events(entity_id, timestamp, id);
+    CREATE INDEX IF NOT EXISTS ix_events_domain_timestamp ON events(domain, timestamp, id);
+"""
+
+_MONTH = re.compile(r"\.events-(\d{4}-\d{2})\.db$")
+
+
+@dataclass(kw_only=True, eq=False)
+class _Partition:
+    # None for the main database's own events table
+    month: str | None
+    path: Path | None
+    repo: EventRepository
+    exit_stack: AsyncExitStack = field(default_factory=AsyncExitStack)
+    # Bounds of a partition no longer written to; the newest partition's keep moving
+    min_id: int | None = None
+    max_id: int | None = None
+    min_timestamp: datetime | None = None
+    max_timestamp: datetime | None = None
+    sealed: bool = False
+
+    @property
+    def empty(self) -> bool:
+        return self.sealed and self.min_id is None
+
+    def may_hold(self, start_time: datetime, end_time: datetime) -> bool:
+        if not self.sealed:
+            return True
+        if self.min_timestamp is None or self.max_timestamp is None:
+            return False
+        return self.min_timestamp < end_time and self.max_timestamp >= start_time
+
+    async def seal(self) -> None:
+        """Records the bounds, now that the partition only ever shrinks."""
+        cursor = await self.repo.conn.execute(
+            """
+            SELECT
+                (SELECT MIN(id) FROM events),
+                (SELECT MAX(id) FROM events),
+                (SELECT MIN(timestamp) FROM events),
+                (SELECT MAX(timestamp) FROM events)
+            """
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        assert row is not None
+        self.min_id, self.max_id = row[0], row[1]
+        self.min_timestamp = _parse_timestamp(row[2])
+        self.max_timestamp = _parse_timestamp(row[3])
+        self.sealed = True
+
+
+def _parse_timestamp(value: str | None) -> datetime | None:
+    return None if value is None else datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+class PartitionedEventRepository(EventStore):
+    """An EventStore over monthly partition files, each on its own connection and thread.
+
+    Writes go to the newest partition; the first event timestamped in a later month starts a new
+    one, with ids carrying on from the last, so ids stay unique and ingestion-ordered across all
+    partitions. Range queries run on every partition that may overlap, concurrently, and are
+    merged in (timestamp, id) order.
+
+    Processes that only read pick up partitions other processes create or retire by rescanning
+    the directory, at most every `rescan_seconds`.
+    """
+
+    def __init__(
+        self,
+        conn: Connection,
+        db_path: str,
+        connect: Callable[[str], AbstractAsyncContextManager[Connection]],
+        rescan_seconds: float = 5.0,
+    ) -> None:
+        self._connect = connect
+        path = Path(db_path)
+        self._directory = path.parent
+        self._prefix = path.stem
+        self._rescan_seconds = rescan_seconds
+        self._scanned_at = 0.0
+        self._partitions: list[_Partition] = [
+            _Partition(month=None, path=None, repo=EventRepository(conn))
+        ]
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self) -> PartitionedEventRepository:
+        await self._rescan()
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        for partition in self._partitions:
+            await partition.exit_stack.aclose()
+
+    @property
+    def connections(self) -> list[Connection]:
+        return [partition.repo.conn for partition in self._partitions]
+
+    async def create(self, event: Event) -> Event:
+        month = event.timestamp.strftime("%Y-%m")
+        newest = self._partitions[-1]
+        if newest.month is None or month > newest.month:
+            async with self._lock:
+                newest = await self._start_partition(month)
+        elif month < newest.month:
+            # A late or replayed event; it may already be in an earlier partition
+            moment = (event.timestamp, event.timestamp + timedelta(microseconds=1))
+            for partition in self._partitions[:-1]:
+                if partition.may_hold(*moment):
+                    existing = await partition.repo.get_id_by_external_id(event.external_id)
+                    if existing is not None:
+                        event.id = existing
+                        return event
+        return await newest.repo.create(event)
+
+    async def get_by_id(self, event_id: int) -> Event | None:
+        await self._maybe_rescan()
+        for partition in reversed(self._partitions):
+            if not partition.sealed or (
+                partition.min_id is not None and partition.min_id <= event_id
+            ):
+                event = await partition.repo.get_by_id(event_id)
+                if event is not None or partition.sealed:
+                    return event
+        return None
+
+    async def get_between_id_and_timestamp(
+        self, start_time: datetime, end_time: datetime
+    ) -> list[Event]:
+        results = await self._fan_out(
+            start_time,
+            end_time,
+            lambda repo: repo.get_between_id_and_timestamp(start_time, end_time),
+        )
+        return list(heapq.merge(*results, key=lambda event: (event.timestamp, event.id)))
+
+    async def get_timeline_between(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        include_start: bool = False,
+        timeline_filter: TimelineFilter | None = None,
+    ) -> list[CompactEvent]:
+        results = await self._fan_out(
+            start_time,
+            end_time,
+            lambda repo: repo.get_timeline_between(
+                start_time, end_time, include_start, timeline_filter
+            ),
+        )
+        return list(heapq.merge(*results, key=lambda event: (event.timestamp, event.id)))
+
+    async def get_timeline_after_id(self, after_id: int, limit: int) -> list[CompactEvent]:
+        await self._maybe_rescan()
+        events: list[CompactEvent] = []
+        for partition in self._partitions:
+            if len(events) >= limit:
+                break
+            if partition.sealed and (partition.max_id is None or partition.max_id <= after_id):
+                continue
+            events.extend(await partition.repo.get_timeline_after_id(after_id, limit - len(events)))
+            if events:
+                after_id = events[-1].id
+        return events
+
+    async def iter_timeline_between(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        after: TimelineCursor | None = None,
+        chunk_size: int = 1000,
+        limit: int | None = None,
+    ) -> AsyncIterator[tuple[list[CompactEvent], TimelineCursor]]:
+        """Yields timeline events in (timestamp, id) order, one chunk per round of queries.
+
+        Every overlapping partition is asked for a chunk after the cursor, and the first chunk of
+        their merged results is yielded; nothing else is held between chunks.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = chunk_size if remaining is None else min(chunk_size, remaining)
+            page = await self.get_timeline_page(start_time, end_time, after, page_size)
+            if not page:
+                return
+            after = page[-1][0]
+            yield [event for _, event in page], after
+            if len(page) < page_size:
+                return
+            if remaining is not None:
+                remaining -= len(page)
+
+    async def get_timeline_page(
+        self, start_time: datetime, end_time: datetime, after: TimelineCursor | None, limit: int
+    ) -> list[tuple[TimelineCursor, CompactEvent]]:
+        pages = await self._fan_out(
+            start_time,
+            end_time,
+            lambda repo: repo.get_timeline_page(start_time, end_time, after, limit),
+        )
+        merged = heapq.merge(*pages, key=lambda item: (item[0].timestamp, item[0].id))
+        return list(islice(merged, limit))
+
+    async def get_latest_timestamp(self) -> datetime | None:
+        await self._maybe_rescan()
+        latest = await asyncio.gather(
+            *(partition.repo.get_latest_timestamp() for partition in self._partitions)
+        )
+        return max((timestamp for timestamp in latest if timestamp is not None), default=None)
+
+    async def get_earliest_timestamp(self) -> datetime | None:
+        await self._maybe_rescan()
+        earliest = await asyncio.gather(
+            *(partition.repo.get_earliest_timestamp() for partition in self._partitions)
+        )
+        return min((timestamp for timestamp in earliest if timestamp is not None), default=None)
+
+    async def get_events_page(
+        self, start_time: datetime, end_time: datetime, after: TimelineCursor | None, limit: int
+    ) -> list[Event]:
+        pages = await self._fan_out(
+            start_time,
+            end_time,
+            lambda repo: repo.get_events_page(start_time, end_time, after, limit),
+        )
+        return list(
+            islice(heapq.merge(*pages, key=lambda event: (event.timestamp, event.id)), limit)
+        )
+
+    async def delete_between(self, start_time: datetime, end_time: datetime, limit: int) -> int:
+        """Deletes up to `limit` events timestamped in the range; how many.
+
+        A partition file that holds nothing but such events is deleted whole instead.
+        """
+        async with self._lock:
+            for partition in list(self._partitions):
+                if not partition.may_hold(start_time, end_time):
+                    continue
+                if (
+                    partition.path is not None
+                    and partition.min_timestamp is not None
+                    and partition.max_timestamp is not None
+                    and start_time <= partition.min_timestamp
+                    and partition.max_timestamp < end_time
+                ):
+                    return await self._retire(partition)
+                if deleted := await partition.repo.delete_between(start_time, end_time, limit):
+                    return deleted
+            return 0
+
+    async def get_ids_before(self, timestamp: datetime) -> range:
+        await self._maybe_rescan()
+        start = stop = None
+        for partition in self._partitions:
+            if partition.empty:
+                continue
+            ids = await partition.repo.get_ids_before(timestamp)
+            if ids == range(0):
+                continue
+            if start is None:
+                start = ids.start
+            stop = ids.stop
+            # Partitions are in id order; the first to hold a later event ends the range
+            if partition.max_id is not None and ids.stop <= partition.max_id:
+                break
+        return range(0) if start is None or stop is None else range(start, stop)
+
+    async def strip_payloads(self, after_id: int, through_id: int) -> int:
+        await self._maybe_rescan()
+        stripped = 0
+        for partition in self._partitions:
+            if partition.empty:
+                continue
+            if partition.sealed and (
+                partition.max_id is None
+                or partition.max_id <= after_id
+                or (partition.min_id is not None and partition.min_id > through_id)
+            ):
+                continue
+            stripped += await partition.repo.strip_payloads(after_id, through_id)
+        return stripped
+
+    async def delete_before_id(self, event_id: int, limit: int) -> int:
+        """Deletes up to `limit` of the oldest events with ids below `event_id`; how many.
+
+        A partition file that holds nothing but such events is deleted whole instead, however
+        many events that is.
+        """
+        async with self._lock:
+            for partition in list(self._partitions):
+                if partition.empty and partition.path is None:
+                    continue
+                if (
+                    partition.sealed
+                    and partition.path is not None
+                    and (partition.max_id is None or partition.max_id < event_id)
+                ):
+                    return await self._retire(partition)
+                deleted = await partition.repo.delete_before_id(event_id, limit)
+                if deleted or not partition.sealed or (partition.max_id or 0) >= event_id:
+                    return deleted
+                # The main database's table has nothing older left; carry on with the files
+                partition.min_id = partition.max_id = None
+            return 0
+
+    async def _fan_out(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        query: Callable[[EventRepository], Awaitable[list[T]]],
+    ) -> list[list[T]]:
+        """Runs `query` on every partition that may hold events in the range, concurrently."""
+        await self._maybe_rescan()
+        return await asyncio.gather(
+            *(
+                query(partition.repo)
+                for partition in self._partitions
+                if partition.may_hold(start_time, end_time)
+            )
+        )
+
+    def _path(self, month: str) -> Path:
+        return self._directory / f"{self._prefix}.events-{month}.db"
+
+    async def _open(self, month: str) -> _Partition:
+        exit_stack = AsyncExitStack()
+        conn = await exit_stack.enter_async_context(self._connect(str(self._path(month))))
+        return _Partition(
+            month=month, path=self._path(month), repo=EventRepository(conn), exit_stack=exit_stack
+        )
+
+    async def _start_partition(self, month: str) -> _Partition:
+        newest = self._partitions[-1]
+        if newest.month is not None and newest.month >= month:
+            return newest
+        cursor = await newest.repo.conn.execute(
+            "SELECT seq FROM sqlite_sequence WHERE name = 'events'"
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+        partition = await self._open(month)
+        conn = partition.repo.conn
+        # Free pages can only be handed back piecemeal if auto_vacuum is set before any table
+        # exists; the VACUUM applies it, since the connection is already in WAL mode
+        await conn.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+        await conn.executescript(PARTITION_SCHEMA)
+        # Ids carry on from the previous partition
+        await conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES ('events', ?)", (row[0] if row else 0,)
+        )
+        await conn.commit()
+        await newest.seal()
+        self._partitions.append(partition)
+        logger.info("started event partition", month=month, path=str(partition.path))
+        return partition
+
+    async def _retire(self, partition: _Partition) -> int:
+        cursor = await partition.repo.conn.execute("SELECT COUNT(*) FROM events")
+        row = await cursor.fetchone()
+        await cursor.close()
+        self._partitions.remove(partition)
+        await partition.exit_stack.aclose()
+        assert partition.path is not None
+        for suffix in ("", "-wal", "-shm"):
+            with suppress(FileNotFoundError):
+                os.unlink(f"{partition.path}{suffix}")
+        logger.info("retired event partition", month=partition.month, events=row[0] if row else 0)
+        return int(row[0]) if row else 0
+
+    async def _maybe_rescan(self) -> None:
+        if time.monotonic() - self._scanned_at >= self._rescan_seconds:
+            await self._rescan()
+
+    async def _rescan(self) -> None:
+        """Opens partitions that appeared on disk and drops the ones that were retired."""
+        async with self._lock:
+            self._scanned_at = time.monotonic()
+            on_disk = set()
+            for path in self._directory.glob(f"{self._prefix}.events-*.db"):
+                if match := _MONTH.search(path.name):
+                    on_disk.add(match.group(1))
+            known = {partition.month for partition in self._partitions}
+            for partition in list(self._partitions):
+                if partition.month is not None and partition.month not in on_disk:
+                    self._partitions.remove(partition)
+                    await partition.exit_stack.aclose()
+            for month in sorted(on_disk - known):
+                self._partitions.append(await self._open(month))
+            self._partitions.sort(key=lambda partition: partition.month or "")
+            for partition in self._partitions[:-1]:
+                if not partition.sealed:
+                    await partition.seal()
@@ -0,0 +1,128 @@
+from datetime import datetime
+
+import structlog
+from aiosqlite import Connection
+
+from floorcast.domain.event_filtering import TimelineFilter
+from floorcast.domain.ports import RollupStore
+from floorcast.domain.rollups import RollupBucket, bucket_start
+from floorcast.repositories.filters import timeline_filter_clause
+
+logger = structlog.get_logger(__name__)
+
+
+class RollupRepository(RollupStore):
+    def __init__(self, conn: Connection):
+        self.conn = conn
+
+    async def merge(self, buckets: list[RollupBucket]) -> None:
+        """Folds pre-aggregated buckets into the stored rollups."""
+        if not buckets:
+            return
+        await self.conn.executemany(
+            """
+            INSERT INTO rollups (
+                resolution,
+                bucket_start,
+                entity_id,
+                count,
+                numeric_count,
+                min_value,
+                max_value,
+                sum_value,
+                last_state,
+                last_unit,
+                last_timestamp,
+                last_event_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(resolution, bucket_start, entity_id) DO UPDATE SET
+                count = count + excluded.count,
+                numeric_count = numeric_count + excluded.numeric_count,
+                min_value = MIN(
+                    COALESCE(min_value, excluded.min_value),
+                    COALESCE(excluded.min_value, min_value)
+                ),
+                max_value = MAX(
+                    COALESCE(max_value, excluded.max_value),
+                    COALESCE(excluded.max_value, max_value)
+                ),
+                sum_value = sum_value + excluded.sum_value,
+                last_state = CASE WHEN excluded.last_timestamp >= last_timestamp
+                    THEN excluded.last_state ELSE last_state END,
+                last_unit = CASE WHEN excluded.last_timestamp >= last_timestamp
+                    THEN excluded.last_unit ELSE last_unit END,
+                last_timestamp = MAX(last_timestamp, excluded.last_timestamp),
+                last_event_id = MAX(last_event_id, excluded.last_event_id)
+            """,
+            [
+                (
+                    bucket.resolution,
+                    bucket.bucket_start,
+                    bucket.entity_id,
+                    bucket.count,
+                    bucket.numeric_count,
+                    bucket.min_value,
+                    bucket.max_value,
+                    bucket.sum_value,
+                    bucket.last_state,
+                    bucket.last_unit,
+                    bucket.last_timestamp,
+                    bucket.last_event_id,
+                )
+                for bucket in buckets
+            ],
+        )
+        await self.conn.commit()
+
+    async def get_between(
+        self,
+        resolution: int,
+        start_time: datetime,
+        end_time: datetime,
+        timeline_filter: TimelineFilter | None = None,
+    ) -> list[RollupBucket]:
+        lower = bucket_start(int(start_time.timestamp() * 1000), resolution)
+        upper = int(end_time.timestamp() * 1000)
+        filter_sql, filter_params = timeline_filter_clause(
+            timeline_filter, domain_column="substr(entity_id, 1, instr(entity_id, '.') - 1)"
+        )
+        rows = await self.conn.execute_fetchall(
+            f"""
+            SELECT resolution, bucket_start, entity_id, count, numeric_count, min_value,
+                   max_value, sum_value, last_state, last_unit, last_timestamp, last_event_id
+            FROM rollups
+            WHERE resolution = ? AND bucket_start >= ? AND bucket_start < ?{filter_sql}
+            ORDER BY bucket_start, entity_id
+            """,
+            (resolution, lower, upper, *filter_params),
+        )
+        buckets = [
+            RollupBucket(
+                resolution=row[0],
+                bucket_start=row[1],
+                entity_id=row[2],
+                count=row[3],
+                numeric_count=row[4],
+                min_value=row[5],
+                max_value=row[6],
+                sum_value=row[7],
+                last_state=row[8],
+                last_unit=row[9],
+                last_timestamp=row[10],
+                last_event_id=row[11],
+            )
+            for row in rows
+        ]
+        logger.debug(
+            "fetched rollups",
+            resolution=resolution,
+            lower_bound=start_time.isoformat(),
+            upper_bound=end_time.isoformat(),
+            count=len(buckets),
+        )
+        return buckets
+
+    async def get_last_event_id(self) -> int:
+        cursor = await self.conn.execute("SELECT MAX(last_event_id) FROM rollups")
+        row = await cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None else 0
@@ -0,0 +1,356 @@
+"""Immutable, compressed, columnar files of archived events.
+
+A segment holds every event of a closed time range, sorted by (timestamp, id) and cut into blocks.
+Each block is two zlib-compressed JSON sections of parallel columns: the columns timeline reads
+need, then the events' identifiers, which are mostly random bytes and only read to rebuild full
+events. Strings that repeat are dictionary-encoded, ids and microsecond timestamps delta-encoded.
+A footer lists each block's time and id bounds, a sparse index, so a read only decompresses the
+blocks it overlaps. Raw payloads aren't kept.
+
+Layout: MAGIC, blocks..., footer (zlib JSON), then the footer's offset and size, and MAGIC again.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import uuid
+import zlib
+from dataclasses import astuple, dataclass, replace
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Sequence
+
+from floorcast.domain.models import CompactEvent, Event, TimelineCursor
+
+if TYPE_CHECKING:
+    from floorcast.domain.event_filtering import TimelineFilter
+
+MAGIC = b"FCSEG01\n"
+_TRAILER = struct.Struct("<QQ8s")
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+BLOCK_SIZE = 1024
+
+# Columns stored through a per-block dictionary, as in encode_columnar
+_DICTIONARY_COLUMNS = ("entity_id", "domain", "state", "unit", "event_type")
+_IDENTITY_COLUMNS = ("event_id", "external_id")
+
+
+def _to_micros(timestamp: datetime) -> int:
+    return (timestamp - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(micros: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=micros)
+
+
+def _compress(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+
+
+def _decompress(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data))
+
+
+@dataclass(frozen=True, slots=True)
+class BlockInfo:
+    first_timestamp: int  # microseconds since the epoch
+    last_timestamp: int
+    min_id: int
+    max_id: int
+    offset: int
+    size: int
+    # The identity section follows the block's first `size` bytes
+    identity_size: int
+    count: int
+
+
+def _encode_block(events: Sequence[Event]) -> tuple[bytes, BlockInfo]:
+    dictionaries: dict[str, dict[Any, int]] = {name: {} for name in _DICTIONARY_COLUMNS}
+    columns: dict[str, list[Any]] = {name: [] for name in ("id", "timestamp", *_DICTIONARY_COLUMNS)}
+    identity: dict[str, list[str]] = {name: [] for name in _IDENTITY_COLUMNS}
+    previous_id = previous_timestamp = 0
+    for event in events:
+        timestamp = _to_micros(event.timestamp)
+        columns["id"].append(event.id - previous_id)
+        columns["timestamp"].append(timestamp - previous_timestamp)
+        previous_id, previous_timestamp = event.id, timestamp
+        for name in _DICTIONARY_COLUMNS:
+            value = getattr(event, name)
+            columns[name].append(dictionaries[name].setdefault(value, len(dictionaries[name])))
+        identity["event_id"].append(str(event.event_id))
+        identity["external_id"].append(event.external_id)
+    core = _compress(
+        {"dictionaries": {name: list(values) for name, values in dictionaries.items()}, **columns}
+    )
+    identifiers = _compress(identity)
+    ids = [event.id for event in events]
+    info = BlockInfo(
+        first_timestamp=_to_micros(events[0].timestamp),
+        last_timestamp=_to_micros(events[-1].timestamp),
+        min_id=min(ids),
+        max_id=max(ids),
+        offset=0,
+        size=len(core),
+        identity_size=len(identifiers),
+        count=len(events),
+    )
+    return core + identifiers, info
+
+
+class _Block:
+    """A block's decoded columns, which are in (timestamp, id) order."""
+
+    __slots__ = ("ids", "timestamps", "columns")
+
+    def __init__(self, data: bytes) -> None:
+        block = _decompress(data)
+        self.ids = list(accumulate(block["id"]))
+        self.timestamps = list(accumulate(block["timestamp"]))
+        self.columns = {
+            name: [block["dictionaries"][name][code] for code in block[name]]
+            for name in _DICTIONARY_COLUMNS
+        }
+
+    def compact(self, rows: Iterable[int]) -> list[CompactEvent]:
+        columns = self.columns
+        return [
+            CompactEvent(
+                id=self.ids[i],
+                entity_id=columns["entity_id"][i],
+                timestamp=self.timestamps[i] // 1000,
+                state=columns["state"][i],
+                unit=columns["unit"][i],
+            )
+            for i in rows
+        ]
+
+    def events(self, identity: dict[str, list[str]], rows: Iterable[int]) -> list[Event]:
+        columns = self.columns
+        return [
+            Event(
+                id=self.ids[i],
+                domain=columns["domain"][i],
+                entity_id=columns["entity_id"][i],
+                event_id=uuid.UUID(identity["event_id"][i]),
+                event_type=columns["event_type"][i],
+                external_id=identity["external_id"][i],
+                state=columns["state"][i],
+                timestamp=_from_micros(self.timestamps[i]),
+                data={},
+                unit=columns["unit"][i],
+            )
+            for i in rows
+        ]
+
+    def matching(self, timeline_filter: TimelineFilter | None, lo: int, hi: int) -> Iterable[int]:
+        if timeline_filter is None:
+            return range(lo, hi)
+        entity_ids, domains = timeline_filter.entity_ids, timeline_filter.domains
+        return [
+            i
+            for i in range(lo, hi)
+            if (entity_ids is None or self.columns["entity_id"][i] in entity_ids)
+            and (domains is None or self.columns["domain"][i] in domains)
+        ]
+
+
+class SegmentWriter:
+    """Writes one segment; events must be added in (timestamp, id) order.
+
+    The file only appears under `path` once finished, so a crash never leaves a partial segment
+    where a reader would find it.
+    """
+
+    def __init__(self, path: Path, start: datetime, end: datetime) -> None:
+        self._path = path
+        self._partial = path.with_name(path.name + ".partial")
+        self._file = open(self._partial, "wb")
+        self._file.write(MAGIC)
+        self._start = start
+        self._end = end
+        self._pending: list[Event] = []
+        self._blocks: list[BlockInfo] = []
+
+    def add(self, events: Sequence[Event]) -> None:
+        self._pending.extend(events)
+        while len(self._pending) >= BLOCK_SIZE:
+            self._write_block(self._pending[:BLOCK_SIZE])
+            del self._pending[:BLOCK_SIZE]
+
+    def finish(self) -> Path:
+        if self._pending:
+            self._write_block(self._pending)
+            self._pending = []
+        footer = _compress(
+            {
+                "start": self._start.isoformat(),
+                "end": self._end.isoformat(),
+                "blocks": [astuple(block) for block in self._blocks],
+            }
+        )
+        offset = self._file.tell()
+        self._file.write(footer)
+        self._file.write(_TRAILER.pack(offset, len(footer), MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._partial, self._path)
+        return self._path
+
+    def abort(self) -> None:
+        self._file.close()
+        self._partial.unlink(missing_ok=True)
+
+    def _write_block(self, events: Sequence[Event]) -> None:
+        data, info = _encode_block(events)
+        self._blocks.append(replace(info, offset=self._file.tell()))
+        self._file.write(data)
+
+
+class Segment:
+    """A finished segment, read through a memory map.
+
+    Reads are synchronous and CPU-bound; callers on the event loop should run them in a thread.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        offset, size, magic = _TRAILER.unpack_from(self._map, len(self._map) - _TRAILER.size)
+        if self._map[: len(MAGIC)] != MAGIC or magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"Not an event segment: {path}")
+        footer = _decompress(self._map[offset : offset + size])
+        self.start = datetime.fromisoformat(footer["start"])
+        self.end = datetime.fromisoformat(footer["end"])
+        self.blocks = [BlockInfo(*block) for block in footer["blocks"]]
+        self._first_timestamps = [block.first_timestamp for block in self.blocks]
+
+    @property
+    def count(self) -> int:
+        return sum(block.count for block in self.blocks)
+
+    @property
+    def min_id(self) -> int | None:
+        return min((block.min_id for block in self.blocks), default=None)
+
+    @property
+    def max_id(self) -> int | None:
+        return max((block.max_id for block in self.blocks), default=None)
+
+    @property
+    def first_timestamp(self) -> datetime | None:
+        return _from_micros(self.blocks[0].first_timestamp) if self.blocks else None
+
+    @property
+    def last_timestamp(self) -> datetime | None:
+        return _from_micros(self.blocks[-1].last_timestamp) if self.blocks else None
+
+    def close(self) -> None:
+        self._map.close()
+
+    def covers(self, timestamp: datetime) -> bool:
+        return self.start <= timestamp < self.end
+
+    def overlaps(self, start_time: datetime, end_time: datetime) -> bool:
+        return self.start < end_time and start_time < self.end
+
+    def timeline_between(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        include_start: bool = False,
+        timeline_filter: TimelineFilter | None = None,
+    ) -> list[CompactEvent]:
+        timeline: list[CompactEvent] = []
+        for _, block, lo, hi in self._slices(start_time, end_time, include_start):
+            timeline.extend(block.compact(block.matching(timeline_filter, lo, hi)))
+        return timeline
+
+    def events_between(self, start_time: datetime, end_time: datetime) -> list[Event]:
+        events: list[Event] = []
+        for info, block, lo, hi in self._slices(start_time, end_time, include_start=False):
+            events.extend(block.events(self._identity(info), range(lo, hi)))
+        return events
+
+    def timeline_page(
+        self, start_time: datetime, end_time: datetime, after: TimelineCursor | None, limit: int
+    ) -> list[tuple[TimelineCursor, CompactEvent]]:
+        """One keyset page of the timeline, as EventRepository.get_timeline_page pages it."""
+        lower, include_start = (start_time, False) if after is None else (after.timestamp, True)
+        page: list[tuple[TimelineCursor, CompactEvent]] = []
+        for _, block, lo, hi in self._slices(lower, end_time, include_start):
+            if after is not None:
+                # Events sharing the cursor's timestamp are ordered by id
+                key = (_to_micros(after.timestamp), after.id)
+                while lo < hi and (block.timestamps[lo], block.ids[lo]) <= key:
+                    lo += 1
+            hi = min(hi, lo + limit - len(page))
+            page.extend(
+                (TimelineCursor(timestamp=_from_micros(block.timestamps[i]), id=event.id), event)
+                for i, event in zip(range(lo, hi), block.compact(range(lo, hi)))
+            )
+            if len(page) == limit:
+                break
+        return page
+
+    def get_by_id(self, event_id: int) -> Event | None:
+        for info in self.blocks:
+            if info.min_id <= event_id <= info.max_id:
+                block = self._read(info)
+                if event_id in block.ids:
+                    i = block.ids.index(event_id)
+                    return block.events(self._identity(info), [i])[0]
+        return None
+
+    def timeline_after_id(self, after_id: int, limit: int) -> list[CompactEvent]:
+        """The `limit` lowest-id events with ids above `after_id`."""
+        found: list[CompactEvent] = []
+        for info in sorted(self.blocks, key=lambda block: block.min_id):
+            if info.max_id <= after_id:
+                continue
+            # Blocks are in time order, so their id ranges can interleave
+            if len(found) >= limit and info.min_id > found[limit - 1].id:
+                break
+            block = self._read(info)
+            found.extend(
+                event for event in block.compact(range(len(block.ids))) if event.id > after_id
+            )
+            found.sort(key=lambda event: event.id)
+        return found[:limit]
+
+    def _slices(
+        self, start_time: datetime, end_time: datetime, include_start: bool
+    ) -> Iterator[tuple[BlockInfo, _Block, int, int]]:
+        """Each overlapping block with the [lo, hi) rows of it that fall in the range."""
+        start, end = _to_micros(start_time), _to_micros(end_time)
+        # The last block starting before `start` may still hold events at or after it, even when
+        # the next block starts exactly at `start`
+        first = max(bisect.bisect_left(self._first_timestamps, start) - 1, 0)
+        after_start = bisect.bisect_left if include_start else bisect.bisect_right
+        for info in self.blocks[first:]:
+            if info.first_timestamp >= end:
+                return
+            if info.last_timestamp < start:
+                continue
+            block = self._read(info)
+            lo = after_start(block.timestamps, start)
+            hi = bisect.bisect_left(block.timestamps, end)
+            if lo < hi:
+                yield info, block, lo, hi
+
+    def _read(self, info: BlockInfo) -> _Block:
+        # Slicing the map copies just this block's compressed bytes out of the page cache
+        return _Block(self._map[info.offset : info.offset + info.size])
+
+    def _identity(self, info: BlockInfo) -> dict[str, list[str]]:
+        start = info.offset + info.size
+        identity: dict[str, list[str]] = _decompress(self._map[start : start + info.identity_size])
+        return identity
@@ -1,32 +1,38 @@
-import json
-from datetime import datetime
+import asyncio
+from collections.abc import Sequence
+from datetime import datetime, timezone
 
 import structlog
 from aiosqlite import Connection
 
-from floorcast.domain.models import Snapshot
+from floorcast.common.metrics import Gauge
+from floorcast.domain.models import Snapshot, SnapshotInfo, encode_snapshot_state
 from floorcast.domain.ports import SnapshotStore
 
 logger = structlog.get_logger(__name__)
 
+SNAPSHOT_BYTES = Gauge("floorcast_snapshot_bytes", "Encoded size of the last snapshot written")
+
 
 class SnapshotRepository(SnapshotStore):
     def __init__(self, conn: Connection):
         self.conn = conn
 
     async def create(self, snapshot: Snapshot) -> Snapshot:
-        row = await self.conn.execute_insert(
-            "INSERT INTO snapshots (last_event_id, state) VALUES (?, ?)",
-            (
-                snapshot.last_event_id,
-                json.dumps(snapshot.state),
-            ),
+        # Encoding a large state takes long enough to stall the event loop, so do it elsewhere;
+        # callers hand over a state nothing else mutates
+        state = await asyncio.to_thread(encode_snapshot_state, snapshot.state)
+        SNAPSHOT_BYTES.set(len(state))
+        cursor = await self.conn.execute(
+            "INSERT INTO snapshots (last_event_id, state) VALUES (?, ?) RETURNING id, created_at",
+            (snapshot.last_event_id, state),
         )
-
-        snapshot.id = row[0]  # type: ignore[index]
+        row = await cursor.fetchone()
+        await cursor.close()
         await self.conn.commit()
-        updated = await self.get_by_id(snapshot.id)
-        snapshot.created_at = updated.created_at
+        assert row is not None
+        snapshot.id = row[0]
+        snapshot.created_at = datetime.fromisoformat(row[1]).replace(tzinfo=timezone.utc)
         return snapshot
 
     async def get_by_id(self, snapshot_id: int) -> Snapshot:
@@ -56,3 +62,23 @@ class SnapshotRepository(SnapshotStore):
         if not row:
             return None
         return Snapshot.from_dict(dict(row))
+
+    async def get_infos(self) -> list[SnapshotInfo]:
+        """Every snapshot in creation order, without the state."""
+        cursor = await self.conn.execute(
+            "SELECT id, last_event_id, created_at FROM snapshots ORDER BY created_at, id"
+        )
+        return [
+            SnapshotInfo(
+                id=row["id"],
+                last_event_id=row["last_event_id"],
+                created_at=datetime.fromisoformat(row["created_at"]).replace(tzinfo=timezone.utc),
+            )
+            for row in await cursor.fetchall()
+        ]
+
+    async def delete_many(self, snapshot_ids: Sequence[int]) -> None:
+        await self.conn.executemany(
+            "DELETE FROM snapshots WHERE id = ?", [(snapshot_id,) for snapshot_id in snapshot_ids]
+        )
+        await self.conn.commit()
@@ -1,10 +1,30 @@
+import socket
+
 import uvicorn
 from fastapi import FastAPI
 
+HOST = "0.0.0.0"
+PORT = 8000
+
+
+def bind_server_socket() -> socket.socket:
+    """Binds the API's listening socket, to be shared by several server processes."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.set_inheritable(True)
+    return sock
+
 
-async def run_websocket_server(app: FastAPI) -> None:
+async def run_websocket_server(app: FastAPI, sockets: list[socket.socket] | None = None) -> None:
     server_config = uvicorn.Config(
-        app, host="0.0.0.0", port=8000, log_level="warning", access_log=False
+        app,
+        host=HOST,
+        port=PORT,
+        log_level="warning",
+        access_log=False,
+        # Registry and snapshot messages run to megabytes, and GZipMiddleware doesn't cover /ws
+        ws_per_message_deflate=True,
     )
     server = uvicorn.Server(server_config)
-    await server.serve()
+    await server.serve(sockets=sockets)
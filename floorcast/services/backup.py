@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+import structlog
+
+from floorcast.common.aio import create_logged_task
+from floorcast.domain.models import BackupProgress
+
+if TYPE_CHECKING:
+    from floorcast.domain.ports import BackupStore
+
+logger = structlog.get_logger(__name__)
+
+
+class BackupService:
+    """Takes online backups on a schedule or on demand, keeping the newest `keep`."""
+
+    def __init__(self, store: BackupStore, keep: int) -> None:
+        if keep < 1:
+            raise ValueError(f"keep must be at least 1, not {keep}")
+        self._store = store
+        self._keep = keep
+        self._task: asyncio.Task[None] | None = None
+        # The running backup, or else the last one this process took
+        self.latest: BackupProgress | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.latest is not None and self.latest.running
+
+    async def run(self, interval_seconds: float) -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if not self.running:
+                await self.backup()
+
+    def start(self) -> BackupProgress:
+        """Starts a backup in the background, unless one is running; returns its progress."""
+        if self.latest is not None and self.running:
+            return self.latest
+        progress = self._begin()
+        self._task = create_logged_task(self._take(progress), name="backup")
+        return progress
+
+    async def backup(self) -> BackupProgress:
+        progress = self._begin()
+        await self._take(progress)
+        return progress
+
+    def _begin(self) -> BackupProgress:
+        now = datetime.now(tz=timezone.utc)
+        self.latest = BackupProgress(name=now.strftime("%Y%m%dT%H%M%S%fZ"), started_at=now)
+        return self.latest
+
+    async def _take(self, progress: BackupProgress) -> None:
+        try:
+            taken = await self._store.create(progress.name, progress)
+        except Exception as e:
+            progress.error = repr(e)
+            logger.exception("backup failed", name=progress.name)
+            return
+        finally:
+            progress.finished_at = datetime.now(tz=timezone.utc)
+        if not taken:
+            progress.error = "another process is taking a backup"
+            logger.warning("backup skipped", name=progress.name, reason=progress.error)
+            return
+        logger.info(
+            "backup finished",
+            name=progress.name,
+            pages=progress.pages_total,
+            bytes=progress.bytes,
+            seconds=round(progress.duration_seconds, 3),
+        )
+        for name in (await self._store.names())[: -self._keep]:
+            await self._store.delete(name)
+            logger.info("backup rotated out", name=name)
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import time
 from typing import TYPE_CHECKING, AsyncIterator
 
 import structlog
 
+from floorcast.common.metrics import Counter, Histogram
 from floorcast.domain.event_filtering import EntityBlockList, FilteredEventStream
 from floorcast.domain.events import EntityStateChanged, FCEvent
 
@@ -16,6 +18,13 @@ if TYPE_CHECKING:
 
 logger = structlog.get_logger(__name__)
 
+INGEST_EVENTS = Counter("floorcast_ingest_events_total", "Home Assistant events persisted")
+INGEST_STAGE_SECONDS = Histogram(
+    "floorcast_ingest_stage_seconds", "Time each event spends in each stage of ingestion", ["stage"]
+)
+_persist_seconds = INGEST_STAGE_SECONDS.labels("persist")
+_publish_seconds = INGEST_STAGE_SECONDS.labels("publish")
+
 
 class IngestionService:
     def __init__(
@@ -32,10 +41,15 @@ class IngestionService:
         logger.info("ingestion started")
         event_pipeline = FilteredEventStream(source=event_source, block_list=self._entity_blocklist)
         async for event in event_pipeline:
+            started = time.perf_counter()
             event = await self._process_event(event)
+            persisted = time.perf_counter()
             self._event_bus.publish(
                 EntityStateChanged(entity_id=event.entity_id, state=event.state, event=event)
             )
+            _publish_seconds.observe(time.perf_counter() - persisted)
+            _persist_seconds.observe(persisted - started)
+            INGEST_EVENTS.inc()
 
     async def _process_event(self, event: Event) -> Event:
         event = await self._event_repo.create(event)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any
+
+import structlog
+
+from floorcast.common.aio import create_logged_task, wait_for_capacity
+from floorcast.domain.models import TimelineCursor
+from floorcast.domain.websocket import WSConnection, WSMessage
+
+if TYPE_CHECKING:
+    from floorcast.domain.ports import EventStore
+    from floorcast.services.state import StateService
+
+logger = structlog.get_logger(__name__)
+
+
+class PlaybackSession:
+    """Replays history to a single connection at a chosen speed.
+
+    Events are read ahead through a keyset cursor a page at a time and paced against the wall
+    clock, so the client only ever holds the current state plus whatever it has not drawn yet.
+    """
+
+    # Events fetched per query while playing; the only history held in memory at once
+    READ_AHEAD = 500
+    # Stop reading ahead while this many messages are waiting to be sent to the client
+    MAX_PENDING = 64
+
+    def __init__(
+        self, conn: WSConnection, state_service: StateService, event_repo: EventStore
+    ) -> None:
+        self._conn = conn
+        self._state_service = state_service
+        self._event_repo = event_repo
+        # Resume point: a precise keyset cursor at the last page boundary, plus the ids already
+        # played from the page after it, so pausing mid-page never skips or repeats an event
+        self._after: TimelineCursor | None = None
+        self._played: set[int] = set()
+        self._position: int | None = None
+        self._speed = 1.0
+        self._task: asyncio.Task[Any] | None = None
+
+    @property
+    def playing(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def position(self) -> int | None:
+        """Timestamp (ms) of the playhead."""
+        return self._position
+
+    def play(self, from_time: datetime | None = None, speed: float | None = None) -> None:
+        """Starts playing from `from_time`, or resumes where playback was paused."""
+        if speed is not None:
+            if speed <= 0:
+                raise ValueError(f"Playback speed must be positive: {speed}")
+            self._speed = speed
+        self._stop()
+        if from_time is not None or self._after is None:
+            self._seek(from_time or datetime.now(tz=timezone.utc))
+            self._task = create_logged_task(self._play(send_state=True))
+        else:
+            self._task = create_logged_task(self._play(send_state=False))
+
+    def pause(self) -> None:
+        self._stop()
+        self._conn.queue.put_nowait(
+            WSMessage(type="playback.paused", data={"timestamp": self._position})
+        )
+
+    def seek(self, to: datetime) -> None:
+        """Moves the playhead, sending the state there even while paused."""
+        playing = self.playing
+        self._stop()
+        self._seek(to)
+        if playing:
+            self._task = create_logged_task(self._play(send_state=True))
+        else:
+            self._task = create_logged_task(self._send_state())
+
+    def close(self) -> None:
+        self._stop()
+
+    def _seek(self, to: datetime) -> None:
+        # State at `to` excludes events stamped exactly `to`, so playback must include them
+        self._after = TimelineCursor(timestamp=to, id=0)
+        self._played.clear()
+        self._position = int(to.timestamp() * 1000)
+
+    def _stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _send_state(self) -> None:
+        assert self._after is not None
+        state = await self._state_service.get_state_at(self._after.timestamp)
+        self._conn.queue.put_nowait(
+            WSMessage(
+                type="playback.state",
+                data={"timestamp": self._position, "state": state.state},
+            )
+        )
+
+    async def _play(self, send_state: bool) -> None:
+        assert self._after is not None and self._position is not None
+        if send_state:
+            await self._send_state()
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        origin = self._position
+        end_time = datetime.now(tz=timezone.utc)
+        async for events, cursor in self._event_repo.iter_timeline_between(
+            self._after.timestamp, end_time, after=self._after, chunk_size=self.READ_AHEAD
+        ):
+            for event in events:
+                if event.id in self._played:
+                    continue
+                delay = (event.timestamp - origin) / 1000 / self._speed - (loop.time() - started_at)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await wait_for_capacity(self._conn.queue, self.MAX_PENDING)
+                self._conn.queue.put_nowait(
+                    WSMessage(
+                        type="playback.event",
+                        data={
+                            "id": event.id,
+                            "timestamp": event.timestamp,
+                            "entity_id": event.entity_id,
+                            "state": event.state,
+                            "unit": event.unit,
+                        },
+                    )
+                )
+                self._played.add(event.id)
+                self._position = event.timestamp
+            self._after = cursor
+            self._played.clear()
+
+        logger.debug("playback reached end", conn_id=self._conn.id)
+        self._conn.queue.put_nowait(
+            WSMessage(type="playback.end", data={"timestamp": self._position})
+        )
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import hashlib
+import json
+
 from typing_extensions import TYPE_CHECKING
 
 from floorcast.domain.events import FCEvent, RegistryUpdated
@@ -12,11 +15,24 @@ if TYPE_CHECKING:
 class RegistryService:
     def __init__(self, bus: EventPublisher[FCEvent]) -> None:
         self._registry = Registry.empty()
+        self._version = _version_of(self._registry)
         self._bus = bus
         self._unsubscribe = bus.subscribe(RegistryUpdated, self._handle_registry_updated_event)
 
     def get_registry(self) -> Registry:
         return self._registry
 
+    @property
+    def version(self) -> str:
+        """Identifies the registry's contents, so a client can tell whether its copy is current."""
+        return self._version
+
     async def _handle_registry_updated_event(self, event: RegistryUpdated) -> None:
         self._registry = event.registry
+        self._version = _version_of(event.registry)
+
+
+def _version_of(registry: Registry) -> str:
+    # A content hash rather than a counter, so it stays valid across restarts
+    payload = json.dumps(registry.to_dict(), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+import structlog
+
+from floorcast.domain.retention import EventRetention, months_to_archive, snapshots_to_thin
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from floorcast.domain.models import SnapshotInfo
+    from floorcast.domain.ports import EventArchive, EventStore, SnapshotStore, StorageMaintenance
+    from floorcast.domain.retention import RetentionTier
+
+logger = structlog.get_logger(__name__)
+
+
+class RetentionService:
+    """Ages out history: strips, archives and drops old events, and thins out old snapshots.
+
+    Everything is deleted, and the space reclaimed, a small batch at a time. That keeps each write
+    transaction short, so ingestion is never held up for long.
+    """
+
+    def __init__(
+        self,
+        snapshot_repo: SnapshotStore,
+        event_repo: EventStore,
+        maintenance: StorageMaintenance,
+        snapshot_tiers: Sequence[RetentionTier],
+        max_replay_events: int,
+        event_retention: EventRetention = EventRetention(),
+        archive: EventArchive | None = None,
+        batch_size: int = 100,
+        event_batch_size: int = 500,
+        reclaim_pages: int = 1000,
+    ) -> None:
+        self._snapshot_repo = snapshot_repo
+        self._event_repo = event_repo
+        self._maintenance = maintenance
+        self._snapshot_tiers = snapshot_tiers
+        self._max_replay_events = max_replay_events
+        self._event_retention = event_retention
+        self._archive = archive
+        self._batch_size = batch_size
+        self._event_batch_size = event_batch_size
+        self._reclaim_pages = reclaim_pages
+        # Events up to this id have already had their payloads stripped
+        self._stripped_through = 0
+
+    async def run(self, interval_seconds: float) -> None:
+        while True:
+            await self.apply_event_retention()
+            await self.thin_snapshots()
+            await asyncio.sleep(interval_seconds)
+
+    async def apply_event_retention(self) -> None:
+        now = datetime.now(tz=timezone.utc)
+        retention = self._event_retention
+        if retention.keep_for is not None:
+            await self._drop_events_before(now - retention.keep_for)
+        if retention.archive_after is not None and self._archive is not None:
+            await self._archive_before(self._archive, now - retention.archive_after)
+        if retention.max_bytes is not None:
+            await self._drop_events_over_quota(retention.max_bytes)
+        if retention.payload_for is not None:
+            await self._strip_payloads_before(now - retention.payload_for)
+
+    async def thin_snapshots(self) -> int:
+        """Deletes the snapshots the retention tiers no longer call for; how many it deleted."""
+        snapshots = await self._snapshot_repo.get_infos()
+        doomed = snapshots_to_thin(
+            snapshots, datetime.now(tz=timezone.utc), self._snapshot_tiers, self._max_replay_events
+        )
+        reclaimed = 0
+        for start in range(0, len(doomed), self._batch_size):
+            await self._snapshot_repo.delete_many(doomed[start : start + self._batch_size])
+            reclaimed += await self._reclaim()
+        if doomed:
+            logger.info(
+                "snapshots thinned",
+                deleted=len(doomed),
+                kept=len(snapshots) - len(doomed),
+                reclaimed_pages=reclaimed,
+            )
+        return len(doomed)
+
+    async def _drop_events_before(self, cutoff: datetime) -> None:
+        snapshots = await self._snapshot_repo.get_infos()
+        covering = sum(1 for snapshot in snapshots if snapshot.created_at <= cutoff) - 1
+        if covering >= 0:
+            await self._drop_events_covered_by(snapshots[covering], snapshots[:covering])
+
+    async def _drop_events_over_quota(self, max_bytes: int) -> None:
+        snapshots = await self._snapshot_repo.get_infos()
+        used_bytes = await self._maintenance.used_bytes()
+        for i, snapshot in enumerate(snapshots):
+            if used_bytes <= max_bytes:
+                return
+            # Each step only has the one snapshot before it left to delete
+            await self._drop_events_covered_by(snapshot, snapshots[i - 1 : i])
+            used_bytes = await self._maintenance.used_bytes()
+        if used_bytes > max_bytes:
+            logger.warning(
+                "database over quota with nothing left to drop",
+                used_bytes=used_bytes,
+                max_bytes=max_bytes,
+            )
+
+    async def _drop_events_covered_by(
+        self, snapshot: SnapshotInfo, older: Sequence[SnapshotInfo]
+    ) -> None:
+        """Deletes the events `snapshot` already accounts for, and the `older` snapshots.
+
+        State at or after the snapshot is reconstructed from it, never from the events before, so
+        history up to it goes but everything later can still be rebuilt.
+        """
+        dropped = reclaimed = 0
+        while deleted := await self._event_repo.delete_before_id(
+            snapshot.last_event_id, self._event_batch_size
+        ):
+            dropped += deleted
+            reclaimed += await self._reclaim()
+        for start in range(0, len(older), self._batch_size):
+            batch = older[start : start + self._batch_size]
+            await self._snapshot_repo.delete_many([s.id for s in batch])
+            reclaimed += await self._reclaim()
+        if dropped or older:
+            logger.info(
+                "events dropped",
+                events=dropped,
+                snapshots=len(older),
+                through=snapshot.created_at.isoformat(),
+                reclaimed_pages=reclaimed,
+            )
+
+    async def _archive_before(self, archive: EventArchive, cutoff: datetime) -> None:
+        """Archives every whole month over before `cutoff`, then purges the archived rows."""
+        months = months_to_archive(
+            await archive.archived_until(), await self._event_repo.get_earliest_timestamp(), cutoff
+        )
+        archived = purged = reclaimed = 0
+        for start, end in months:
+            archived += await archive.archive(start, end)
+        # Also catches rows that arrived for a month after it was archived
+        while deleted := await archive.purge_archived(self._event_batch_size):
+            purged += deleted
+            reclaimed += await self._reclaim()
+        if months or purged:
+            logger.info(
+                "events archived",
+                months=len(months),
+                events=archived,
+                purged=purged,
+                reclaimed_pages=reclaimed,
+            )
+
+    async def _strip_payloads_before(self, cutoff: datetime) -> None:
+        ids = await self._event_repo.get_ids_before(cutoff)
+        stripped = reclaimed = 0
+        after_id = max(self._stripped_through, ids.start - 1)
+        while after_id < ids.stop - 1:
+            through_id = min(after_id + self._event_batch_size, ids.stop - 1)
+            stripped += await self._event_repo.strip_payloads(after_id, through_id)
+            reclaimed += await self._reclaim()
+            after_id = self._stripped_through = through_id
+        if stripped:
+            logger.info(
+                "event payloads stripped",
+                events=stripped,
+                through_id=self._stripped_through,
+                reclaimed_pages=reclaimed,
+            )
+
+    async def _reclaim(self) -> int:
+        reclaimed = 0
+        while pages := await self._maintenance.reclaim_space(self._reclaim_pages):
+            reclaimed += pages
+        return reclaimed
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import structlog
+
+from floorcast.domain.models import CompactEvent
+from floorcast.domain.rollups import choose_resolution, rollup_events
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+    from floorcast.domain.event_filtering import TimelineFilter
+    from floorcast.domain.events import EntityStateChanged
+    from floorcast.domain.ports import EventStore, RollupStore
+    from floorcast.domain.rollups import RollupBucket
+
+logger = structlog.get_logger(__name__)
+
+
+class RollupService:
+    """Keeps the 1m/1h/1d rollups in step with persisted events."""
+
+    def __init__(
+        self, rollup_repo: RollupStore, event_repo: EventStore, backfill_batch_size: int = 5000
+    ) -> None:
+        self._rollup_repo = rollup_repo
+        self._event_repo = event_repo
+        self._backfill_batch_size = backfill_batch_size
+        self._last_event_id = 0
+
+    async def initialize(self) -> None:
+        """Backfills every event persisted since the rollups were last updated.
+
+        Resumable: the high-water mark is the largest event id already folded into a bucket.
+        """
+        self._last_event_id = await self._rollup_repo.get_last_event_id()
+        backfilled = 0
+        while True:
+            events = await self._event_repo.get_timeline_after_id(
+                self._last_event_id, self._backfill_batch_size
+            )
+            if not events:
+                break
+            await self._rollup_repo.merge(rollup_events(events))
+            self._last_event_id = events[-1].id
+            backfilled += len(events)
+        logger.info("rollups backfilled", events=backfilled, last_event_id=self._last_event_id)
+
+    async def on_entity_state_changed(self, event: EntityStateChanged) -> None:
+        await self.on_entity_states_changed([event])
+
+    async def on_entity_states_changed(self, events: list[EntityStateChanged]) -> None:
+        """Folds a batch of events, in id order, into the rollups with a single merge."""
+        compact = []
+        for event in events:
+            # Duplicate external ids resolve to an already-persisted event; don't count it twice
+            if event.event.id <= self._last_event_id:
+                continue
+            self._last_event_id = event.event.id
+            compact.append(CompactEvent.from_event(event.event))
+        if compact:
+            await self._rollup_repo.merge(rollup_events(compact))
+
+    async def get_rollups_between(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        max_buckets: int,
+        timeline_filter: TimelineFilter | None = None,
+    ) -> tuple[int, list[RollupBucket]] | None:
+        """Returns rollups at the coarsest adequate resolution, or None if raw events fit."""
+        resolution = choose_resolution(start_time, end_time, max_buckets)
+        if resolution is None:
+            return None
+        buckets = await self._rollup_repo.get_between(
+            resolution, start_time, end_time, timeline_filter
+        )
+        return resolution, buckets
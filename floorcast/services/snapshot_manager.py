@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import time
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Any
 
 import structlog
 
+from floorcast.common.metrics import Gauge, Histogram
 from floorcast.domain.events import EntityStateChanged
 from floorcast.domain.models import Snapshot
 
@@ -15,6 +17,9 @@ if TYPE_CHECKING:
 
 logger = structlog.get_logger(__name__)
 
+SNAPSHOT_SECONDS = Histogram("floorcast_snapshot_seconds", "Time to encode and write a snapshot")
+SNAPSHOT_ENTITIES = Gauge("floorcast_snapshot_entities", "Entities in the last snapshot taken")
+
 
 class SnapshotManager:
     def __init__(
@@ -33,10 +38,11 @@ class SnapshotManager:
         self._state_cache: dict[str, Any] = {}
 
     async def initialize(self) -> None:
-        current_state = await self._state_service.get_state_at(datetime.now(tz=timezone.utc))
+        current_state = await self._state_service.get_current_state()
         self._last_snapshot_time = current_state.snapshot_time
         self._last_snapshot_event_id = current_state.last_event_id or 0
-        self._state_cache = current_state.state
+        # Reconstructed state may be shared with other callers, and this copy is kept up to date
+        self._state_cache = dict(current_state.state)
 
     async def on_entity_state_changed(self, event: EntityStateChanged) -> None:
         self._state_cache[event.event.entity_id] = {
@@ -52,17 +58,28 @@ class SnapshotManager:
             events_since_snapshot, last_snapshot_time
         ):
             self._last_snapshot_time = datetime.now(tz=timezone.utc)
+            reasons = self._snapshot_policy.describe(events_since_snapshot)
+            started = time.perf_counter()
             snapshot = await self._take_snapshot(event)
+            write_seconds = time.perf_counter() - started
+            self._snapshot_policy.snapshot_taken(write_seconds)
+            SNAPSHOT_SECONDS.observe(write_seconds)
+            SNAPSHOT_ENTITIES.set(len(snapshot.state))
             logger.info(
                 "snapshot taken",
                 snapshot_id=snapshot.id,
                 last_event_id=snapshot.last_event_id,
+                events_since_snapshot=events_since_snapshot,
+                entities=len(snapshot.state),
+                write_seconds=write_seconds,
+                **reasons,
             )
 
     async def _take_snapshot(self, event: EntityStateChanged) -> Snapshot:
+        # Entries are replaced, never mutated, so a shallow copy is a stable capture
         snapshot = await self._snapshot_repo.create(
             Snapshot(
-                state=self._state_cache,
+                state=dict(self._state_cache),
                 last_event_id=event.event.id,
             )
         )
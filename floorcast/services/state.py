@@ -1,44 +1,128 @@
 from __future__ import annotations
 
+import asyncio
 import copy
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
 from typing import TYPE_CHECKING
 
 import structlog
 
+from floorcast.common.metrics import Histogram, exponential_buckets
+from floorcast.domain.events import FCEvent, ReplayObserved
 from floorcast.domain.models import ConstructedState, Event, Snapshot
 
 if TYPE_CHECKING:
-    from floorcast.domain.ports import EventStore, SnapshotStore
+    from floorcast.domain.ports import EventPublisher, EventStore, SnapshotStore
+    from floorcast.domain.snapshot_policies import ReplayCostModel
 
 logger = structlog.get_logger(__name__)
 
+STATE_RECONSTRUCTION_SECONDS = Histogram(
+    "floorcast_state_reconstruction_seconds",
+    "Time to reconstruct state from a snapshot and the events after it",
+)
+STATE_REPLAYED_EVENTS = Histogram(
+    "floorcast_state_replayed_events",
+    "Events replayed on top of the snapshot per reconstruction",
+    buckets=exponential_buckets(10, 4, 9),
+)
+
 
 class StateService:
-    def __init__(self, snapshot_repo: SnapshotStore, event_repo: EventStore) -> None:
+    """Reconstructs entity state at a point in time from the nearest snapshot plus later events.
+
+    Concurrent requests share work: callers asking for the same time await one reconstruction,
+    and get_current_state callers arriving within `current_state_tolerance` of each other share
+    one "now". Results are shared, so callers must not mutate them. Timings feed `cost_model`,
+    if given, which a ReplayCostPolicy uses to decide when to snapshot, and are published on `bus`
+    as ReplayObserved for one in another process.
+    """
+
+    def __init__(
+        self,
+        snapshot_repo: SnapshotStore,
+        event_repo: EventStore,
+        current_state_tolerance: timedelta = timedelta(milliseconds=500),
+        cost_model: ReplayCostModel | None = None,
+        bus: EventPublisher[FCEvent] | None = None,
+    ) -> None:
         self._snapshot_repo = snapshot_repo
+        self._cost_model = cost_model
+        self._bus = bus
         self._event_repo = event_repo
+        self._current_state_tolerance = current_state_tolerance
+        self._in_flight: dict[datetime, asyncio.Task[ConstructedState]] = {}
+        self._current_time: datetime | None = None
+
+    async def get_current_state(self) -> ConstructedState:
+        now = datetime.now(tz=timezone.utc)
+        current_time = self._current_time
+        if (
+            current_time is not None
+            and current_time in self._in_flight
+            and now - current_time <= self._current_state_tolerance
+        ):
+            return await self.get_state_at(current_time)
+        self._current_time = now
+        return await self.get_state_at(now)
 
     async def get_state_at(self, end_time: datetime) -> ConstructedState:
-        import time
+        task = self._in_flight.get(end_time)
+        if task is None:
+            # A task of its own, so a caller that goes away doesn't cancel it for the others
+            task = asyncio.create_task(self._reconstruct_at(end_time))
+            self._in_flight[end_time] = task
+            task.add_done_callback(lambda t: self._finish(end_time, t))
+        else:
+            logger.debug("StateService joined in-flight reconstruction", end_time=end_time)
+        return await asyncio.shield(task)
 
-        start = time.time()
+    def _finish(self, end_time: datetime, task: asyncio.Task[ConstructedState]) -> None:
+        if self._in_flight.get(end_time) is task:
+            del self._in_flight[end_time]
+        # Every waiter may have been cancelled; don't warn about an unretrieved exception
+        if not task.cancelled():
+            task.exception()
+
+    async def _reconstruct_at(self, end_time: datetime) -> ConstructedState:
+        start = time.perf_counter()
         snapshot = await self._snapshot_repo.get_before_timestamp(end_time)
-        snapshot_time = time.time()
+        snapshot_time = time.perf_counter()
         logger.debug("StateService loaded snapshot", snapshot_id=snapshot.id if snapshot else None)
         last_event_id = snapshot.last_event_id if snapshot else 0
         snapshot_created_at = (snapshot.created_at if snapshot else None) or datetime(1990, 2, 25)
         events = await self._event_repo.get_between_id_and_timestamp(snapshot_created_at, end_time)
-        events_time = time.time()
+        events_time = time.perf_counter()
         logger.debug("StateService loaded events", events_count=len(events))
         reconstructed_state = self._reconstruct_state(snapshot, events)
-        reconstruct_state_time = time.time()
+        reconstruct_state_time = time.perf_counter()
+        cost_model = self._cost_model
+        predicted = cost_model.predict(len(events)) if cost_model is not None else None
         logger.info(
             "get_state_at timings",
             reconstruction=reconstruct_state_time - events_time,
             snapshot_query=snapshot_time - start,
             events_query=events_time - snapshot_time,
+            events_applied=len(events),
+            predicted=predicted,
+            actual=reconstruct_state_time - start,
+        )
+        STATE_RECONSTRUCTION_SECONDS.observe(reconstruct_state_time - start)
+        STATE_REPLAYED_EVENTS.observe(len(events))
+        observed = ReplayObserved(
+            events=len(events),
+            load_seconds=snapshot_time - start,
+            replay_seconds=reconstruct_state_time - snapshot_time,
         )
+        if cost_model is not None:
+            cost_model.observe_replay(
+                observed.events,
+                load_seconds=observed.load_seconds,
+                replay_seconds=observed.replay_seconds,
+            )
+        if self._bus is not None:
+            self._bus.publish(observed)
         logger.debug(
             "StateService reconstructed state",
             end_time=end_time.isoformat(),
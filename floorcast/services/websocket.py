@@ -1,95 +1,426 @@
 from __future__ import annotations
 
+import asyncio
+import weakref
 from collections import defaultdict
 from datetime import datetime, timezone
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Coroutine
 
-from floorcast.domain.events import EntityStateChanged, FCEvent
-from floorcast.domain.websocket import WSConnection, WSMessage
+from floorcast.common.aio import create_logged_task, wait_for_capacity
+from floorcast.common.metrics import Gauge, Labels
+from floorcast.domain.columnar import encode_columnar
+from floorcast.domain.event_filtering import EntitySelector, SubscriptionIndex
+from floorcast.domain.events import EntityStateChanged, FCEvent, RegistryUpdated
+from floorcast.domain.models import TimelineCursor
+from floorcast.domain.tiles import progressive_slices
+from floorcast.domain.websocket import (
+    BatchOptions,
+    FrameBatcher,
+    OutboundQueue,
+    RecentFrames,
+    SlowConsumerPolicy,
+    WSConnection,
+    WSEncoding,
+    WSFrame,
+    WSMessage,
+)
+from floorcast.services.playback import PlaybackSession
 
 if TYPE_CHECKING:
-    from floorcast.domain.ports import EventPublisher
+    from floorcast.domain.models import ConstructedState
+    from floorcast.domain.ports import EventPublisher, EventStore
     from floorcast.services.registry import RegistryService
     from floorcast.services.state import StateService
 
+WEBSOCKET_CLIENTS = Gauge("floorcast_websocket_clients", "Connected websocket clients")
+WEBSOCKET_QUEUE_DEPTH = Gauge(
+    "floorcast_websocket_queue_depth",
+    "Messages waiting to be sent to each websocket client",
+    ["connection"],
+)
+
 
 class WebsocketService:
+    # Progressive timeline delivery: the window is cut into slices sent nearest-playhead first,
+    # each as one or more chunks of at most TIMELINE_CHUNK_ROWS events.
+    TIMELINE_SLICES = 16
+    TIMELINE_CHUNK_ROWS = 2000
+    # Pause producing chunks while this many messages are waiting to be sent to the client
+    TIMELINE_MAX_PENDING = 32
+
     def __init__(
         self,
         bus: EventPublisher[FCEvent],
         state_service: StateService,
         registry_service: RegistryService,
+        event_repo: EventStore,
+        queue_max_size: int = 1000,
+        slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.COALESCE,
+        resume_buffer_size: int = 10_000,
     ) -> None:
         self._bus = bus
+        self._queue_max_size = queue_max_size
+        self._slow_consumer_policy = slow_consumer_policy
         self._registry_service = registry_service
         self._state_service = state_service
+        self._event_repo = event_repo
         self._clients: set[WSConnection] = set()
-        self._subscriptions: dict[str, set[WSConnection]] = defaultdict(set)
+        _services.add(self)
+        self._tasks: dict[WSConnection, set[asyncio.Task[Any]]] = defaultdict(set)
+        self._timeline_requests: dict[WSConnection, dict[str, asyncio.Task[Any]]] = defaultdict(
+            dict
+        )
+        self._playback: dict[WSConnection, PlaybackSession] = {}
+        self._snapshot_frame: tuple[ConstructedState, WSFrame] | None = None
+        self._batchers: dict[WSConnection, FrameBatcher] = {}
+        self._flush_timers: dict[WSConnection, asyncio.TimerHandle] = {}
+        self._recent = RecentFrames(resume_buffer_size)
+        # Resumed connections: the last event id each had seen, replayed from once it subscribes
+        self._resume_after: dict[WSConnection, int] = {}
+        self._entity_subscriptions = SubscriptionIndex[WSConnection](
+            registry_service.get_registry()
+        )
+        # Ordered, so the resume buffer and every client see every event, in id order
         self._unsubscribe_from_state_changes = bus.subscribe(
-            EntityStateChanged, self._handle_entity_state_change_event
+            EntityStateChanged, self._handle_entity_state_change_event, ordered=True
+        )
+        self._unsubscribe_from_registry_updates = bus.subscribe(
+            RegistryUpdated, self._handle_registry_updated_event
         )
 
     async def _handle_entity_state_change_event(self, event: EntityStateChanged) -> None:
-        entity_state_subscriptions = self._subscriptions["entity_states"]
-        for client in self._clients:
-            if client in entity_state_subscriptions:
-                client.queue.put_nowait(
-                    WSMessage(
-                        type="entity.state_change",
-                        data={
-                            "id": event.event.id,
-                            "timestamp": int(event.event.timestamp.timestamp() * 1000),
-                            "state": event.state,
-                            "entity_id": event.event.entity_id,
-                            "unit": event.event.unit,
-                        },
-                    )
-                )
+        # Encoded once and shared: the per-client cost is just an enqueue
+        frame = WSFrame.encode(
+            WSMessage(
+                type="entity.state_change",
+                data={
+                    "id": event.event.id,
+                    "timestamp": int(event.event.timestamp.timestamp() * 1000),
+                    "state": event.state,
+                    "entity_id": event.event.entity_id,
+                    "unit": event.event.unit,
+                },
+            ),
+            key=event.event.entity_id,
+        )
+        self._recent.append(event.event.id, frame)
+        for client in self._entity_subscriptions.subscribers(event.entity_id):
+            self._deliver(client, frame)
 
-    def connect(self) -> WSConnection:
-        conn = WSConnection()
+    def _deliver(self, conn: WSConnection, frame: WSFrame) -> None:
+        batcher = self._batchers.get(conn)
+        if batcher is None:
+            conn.queue.put_nowait(frame)
+        else:
+            batcher.add(frame)
+            self._schedule_flush(conn, batcher)
+
+    def _schedule_flush(self, conn: WSConnection, batcher: FrameBatcher) -> None:
+        if conn not in self._flush_timers:
+            self._flush_timers[conn] = asyncio.get_running_loop().call_later(
+                batcher.options.window_ms / 1000, self._flush_batch, conn
+            )
+
+    def _flush_batch(self, conn: WSConnection) -> None:
+        self._flush_timers.pop(conn, None)
+        batcher = self._batchers.get(conn)
+        if batcher is None:
+            return
+        # Batches aren't subject to the queue's slow-consumer policy, so only hand one over
+        # while the client keeps up; until then the batcher coalesces per entity
+        if conn.queue.qsize() < conn.queue.max_size:
+            frame = batcher.flush(asyncio.get_running_loop().time())
+            if frame is not None:
+                conn.queue.put_nowait(frame)
+        if len(batcher):
+            self._schedule_flush(conn, batcher)
+
+    def _stop_batching(self, conn: WSConnection) -> None:
+        self._batchers.pop(conn, None)
+        timer = self._flush_timers.pop(conn, None)
+        if timer is not None:
+            timer.cancel()
+
+    def connect(
+        self, encoding: WSEncoding = WSEncoding.JSON, compressed: bool = False
+    ) -> WSConnection:
+        conn = WSConnection(
+            queue=OutboundQueue(self._queue_max_size, self._slow_consumer_policy),
+            encoding=encoding,
+            compressed=compressed,
+        )
         self._clients.add(conn)
         return conn
 
+    def connection_stats(self) -> list[dict[str, Any]]:
+        """Send queue depth and drop counts for every connected client."""
+        stats = []
+        for conn in self._clients:
+            entry = {
+                "id": str(conn.id),
+                "encoding": conn.encoding.value,
+                "compressed": conn.compressed,
+                **conn.queue.stats(),
+            }
+            batcher = self._batchers.get(conn)
+            if batcher is not None:
+                entry.update(batch_pending=len(batcher), coalesced=batcher.coalesced)
+            stats.append(entry)
+        return stats
+
     def disconnect(self, conn: WSConnection) -> None:
         self._clients.discard(conn)
+        self._entity_subscriptions.unsubscribe(conn)
+        self._stop_batching(conn)
+        self._resume_after.pop(conn, None)
+        self._timeline_requests.pop(conn, None)
+        playback = self._playback.pop(conn, None)
+        if playback is not None:
+            playback.close()
+        for task in self._tasks.pop(conn, set()):
+            task.cancel()
 
     def send_message(self, conn: WSConnection, message: WSMessage) -> None:
         match message.type:
             case "subscribe":
-                assert isinstance(message.data, str)
+                assert isinstance(message.data, (str, dict))
                 self._handle_subscribe(conn, message.data)
             case "unsubscribe":
-                assert isinstance(message.data, str)
+                assert isinstance(message.data, (str, dict))
                 self._handle_unsubscribe(conn, message.data)
             case "ping":
                 self._handle_ping(conn)
+            case "timeline":
+                assert isinstance(message.data, dict)
+                self._spawn(conn, self._handle_timeline(conn, message.data))
+            case "timeline.request":
+                assert isinstance(message.data, dict)
+                self._handle_timeline_request(conn, message.data)
+            case "timeline.cancel":
+                assert isinstance(message.data, dict)
+                self._cancel_timeline_request(conn, str(message.data["request_id"]))
+            case "play":
+                data = message.data if isinstance(message.data, dict) else {}
+                self._get_playback(conn).play(
+                    datetime.fromisoformat(data["from"]) if data.get("from") else None,
+                    float(data["speed"]) if data.get("speed") else None,
+                )
+            case "pause":
+                self._get_playback(conn).pause()
+            case "seek":
+                assert isinstance(message.data, dict)
+                self._get_playback(conn).seek(datetime.fromisoformat(message.data["to"]))
             case _:
                 raise ValueError(f"Unknown message type: {message.type}")
 
+    def _spawn(self, conn: WSConnection, coro: Coroutine[Any, Any, None]) -> asyncio.Task[Any]:
+        """Runs a request handler in the background, tied to the connection's lifetime."""
+        task = create_logged_task(coro)
+        tasks = self._tasks[conn]
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return task
+
+    def _get_playback(self, conn: WSConnection) -> PlaybackSession:
+        playback = self._playback.get(conn)
+        if playback is None:
+            playback = PlaybackSession(conn, self._state_service, self._event_repo)
+            self._playback[conn] = playback
+        return playback
+
+    def _handle_timeline_request(self, conn: WSConnection, request: dict[str, Any]) -> None:
+        request_id = str(request["request_id"])
+        # Re-using a request id supersedes the earlier request
+        self._cancel_timeline_request(conn, request_id)
+        task = self._spawn(conn, self._stream_timeline(conn, request_id, request))
+        requests = self._timeline_requests[conn]
+        requests[request_id] = task
+
+        def forget(_: asyncio.Task[Any]) -> None:
+            if requests.get(request_id) is task:
+                del requests[request_id]
+
+        task.add_done_callback(forget)
+
+    def _cancel_timeline_request(self, conn: WSConnection, request_id: str) -> None:
+        task = self._timeline_requests[conn].pop(request_id, None)
+        if task is not None:
+            task.cancel()
+
+    async def _stream_timeline(
+        self, conn: WSConnection, request_id: str, request: dict[str, Any]
+    ) -> None:
+        start_time = datetime.fromisoformat(request["start_time"])
+        end_time = (
+            datetime.fromisoformat(request["end_time"])
+            if request.get("end_time")
+            else datetime.now(tz=timezone.utc)
+        )
+        playhead = (
+            datetime.fromisoformat(request["playhead"]) if request.get("playhead") else end_time
+        )
+        playhead = min(max(playhead, start_time), end_time)
+
+        state = await self._state_service.get_state_at(playhead)
+        conn.queue.put_nowait(
+            WSMessage(
+                type="timeline.snapshot",
+                data={
+                    "request_id": request_id,
+                    "timestamp": int(playhead.timestamp() * 1000),
+                    "state": state.state,
+                },
+            )
+        )
+        for slice_start, slice_end in progressive_slices(
+            start_time, end_time, playhead, self.TIMELINE_SLICES
+        ):
+            # The window start is exclusive like /timeline; inner slice boundaries are inclusive
+            after = (
+                None if slice_start == start_time else TimelineCursor(timestamp=slice_start, id=0)
+            )
+            async for events, _ in self._event_repo.iter_timeline_between(
+                start_time, slice_end, after=after, chunk_size=self.TIMELINE_CHUNK_ROWS
+            ):
+                await wait_for_capacity(conn.queue, self.TIMELINE_MAX_PENDING)
+                conn.queue.put_nowait(
+                    WSMessage(
+                        type="timeline.chunk",
+                        data={
+                            "request_id": request_id,
+                            "start": int(slice_start.timestamp() * 1000),
+                            "end": int(slice_end.timestamp() * 1000),
+                            "events": encode_columnar(events),
+                        },
+                    )
+                )
+        conn.queue.put_nowait(WSMessage(type="timeline.done", data={"request_id": request_id}))
+
+    async def _handle_timeline(self, conn: WSConnection, request: dict[str, Any]) -> None:
+        start_time = datetime.fromisoformat(request["start_time"])
+        end_time = (
+            datetime.fromisoformat(request["end_time"])
+            if request.get("end_time")
+            else datetime.now(tz=timezone.utc)
+        )
+        state = await self._state_service.get_state_at(start_time)
+        events = await self._event_repo.get_timeline_between(start_time, end_time)
+        conn.queue.put_nowait(
+            WSMessage(
+                type="timeline",
+                data={
+                    "start_time": request["start_time"],
+                    "end_time": request.get("end_time"),
+                    "snapshot": state.state,
+                    "events": encode_columnar(events),
+                },
+            )
+        )
+
     @staticmethod
     def _handle_ping(conn: WSConnection) -> None:
         conn.queue.put_nowait(WSMessage(type="pong"))
 
-    def _handle_subscribe(self, conn: WSConnection, subscription: str) -> None:
-        if subscription not in ("entity_states",):
-            raise ValueError(f"Unknown subscription: {subscription}")
-        self._subscriptions[subscription].add(conn)
+    async def _handle_registry_updated_event(self, event: RegistryUpdated) -> None:
+        self._entity_subscriptions.set_registry(event.registry)
 
-    def _handle_unsubscribe(self, conn: WSConnection, subscription: str) -> None:
-        if subscription not in ("entity_states",):
-            raise ValueError(f"Unknown subscription: {subscription}")
-        self._subscriptions[subscription].discard(conn)
+    def _handle_subscribe(self, conn: WSConnection, subscription: str | dict[str, Any]) -> None:
+        """Subscribes to a topic, given by name or as {"topic", ...selector}.
 
-    async def request_registry(self, conn: WSConnection) -> None:
+        entity_states accepts entity_ids, globs, domains, area_ids and floor_ids to receive only
+        matching entities, and `batch` ({window_ms, latest_only, max_rate}) to receive updates
+        packed into one `events` frame per window; re-subscribing replaces both.
+        """
+        topic = subscription if isinstance(subscription, str) else subscription.get("topic")
+        if topic not in ("entity_states",):
+            raise ValueError(f"Unknown subscription: {topic}")
+        if isinstance(subscription, str):
+            selector, batch = EntitySelector(), None
+        else:
+            selector = EntitySelector.from_dict(subscription)
+            batch = (
+                BatchOptions.from_dict(subscription["batch"]) if subscription.get("batch") else None
+            )
+        self._entity_subscriptions.subscribe(conn, selector)
+        self._stop_batching(conn)
+        if batch is not None:
+            self._batchers[conn] = FrameBatcher(batch, limit=self._queue_max_size)
+        resume_after = self._resume_after.pop(conn, None)
+        if resume_after is not None:
+            self._replay(conn, resume_after, selector)
+
+    def _replay(self, conn: WSConnection, after: int, selector: EntitySelector) -> None:
+        # Runs in the same step as subscribing, so nothing falls between replay and live updates
+        missed = self._recent.since(after)
+        if missed is None:
+            self._spawn(conn, self.request_snapshot(conn))
+            return
         registry = self._registry_service.get_registry()
-        conn.queue.put_nowait(WSMessage(type="registry", data=registry.to_dict()))
+        for _, frame in missed:
+            if frame.key is not None and selector.matches(frame.key, registry):
+                self._deliver(conn, frame)
 
-    async def request_snapshot(self, conn: WSConnection) -> None:
-        state = await self._state_service.get_state_at(datetime.now(tz=timezone.utc))
+    def _handle_unsubscribe(self, conn: WSConnection, subscription: str | dict[str, Any]) -> None:
+        topic = subscription if isinstance(subscription, str) else subscription.get("topic")
+        if topic not in ("entity_states",):
+            raise ValueError(f"Unknown subscription: {topic}")
+        self._entity_subscriptions.unsubscribe(conn)
+        self._stop_batching(conn)
+
+    async def resume(
+        self,
+        conn: WSConnection,
+        last_event_id: int | None = None,
+        registry_version: str | None = None,
+    ) -> None:
+        """Brings a new connection up to date, sending only what a reconnecting client lacks.
+
+        The registry is skipped if the client's version is current. If every event after
+        `last_event_id` is still buffered, the snapshot is skipped too and the missed events are
+        replayed when the client subscribes; otherwise it gets a full snapshot.
+        """
+        if registry_version is None or registry_version != self._registry_service.version:
+            await self.request_registry(conn)
+        if last_event_id is None or self._recent.since(last_event_id) is None:
+            await self.request_snapshot(conn)
+            return
+        self._resume_after[conn] = last_event_id
+        conn.queue.put_nowait(WSMessage(type="resumed", data={"last_event_id": last_event_id}))
+
+    async def request_registry(self, conn: WSConnection) -> None:
+        registry = self._registry_service.get_registry()
         conn.queue.put_nowait(
             WSMessage(
-                type="snapshot",
-                data=state.state,
+                type="registry",
+                data={"version": self._registry_service.version, "registry": registry.to_dict()},
             )
         )
+
+    async def request_snapshot(self, conn: WSConnection) -> None:
+        state = await self._state_service.get_current_state()
+        # Clients that shared a reconstruction share its encoding too
+        cached = self._snapshot_frame
+        if cached is None or cached[0] is not state:
+            cached = self._snapshot_frame = (
+                state,
+                WSFrame.encode(WSMessage(type="snapshot", data=state.state)),
+            )
+        conn.queue.put_nowait(cached[1])
+
+
+# Every service in the process, for the gauges to read when rendered
+_services: weakref.WeakSet[WebsocketService] = weakref.WeakSet()
+
+
+def _client_count() -> int:
+    return sum(len(service._clients) for service in _services)
+
+
+def _queue_depths() -> dict[Labels, int]:
+    return {
+        (str(conn.id),): conn.queue.qsize() for service in _services for conn in service._clients
+    }
+
+
+WEBSOCKET_CLIENTS.set_function(_client_count)
+WEBSOCKET_QUEUE_DEPTH.set_function(_queue_depths)
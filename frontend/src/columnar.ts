@@ -0,0 +1,19 @@
+import type { ColumnarEvents, TimelineEvent } from "./types";
+
+export function decodeColumnar(columns: ColumnarEvents): TimelineEvent[] {
+  const events: TimelineEvent[] = new Array(columns.count);
+  let id = 0;
+  let timestamp = 0;
+  for (let i = 0; i < columns.count; i++) {
+    id += columns.id[i];
+    timestamp += columns.timestamp[i];
+    events[i] = {
+      id,
+      timestamp,
+      entity_id: columns.entities[columns.entity[i]],
+      state: columns.states[columns.state[i]],
+      unit: columns.units[columns.unit[i]],
+    };
+  }
+  return events;
+}
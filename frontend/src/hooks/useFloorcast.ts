@@ -1,104 +1,187 @@
 import { useCallback, useEffect, useRef, useState } from "react";
-import type { EntityState, Registry, TimelineEvent, WSMessage } from "../types";
+import { decodeColumnar } from "../columnar";
+import type { EntityState, LiveEvent, Registry, TimelineEvent, WSMessage } from "../types";
 
 const WS_PROTOCOL = window.location.protocol === "https:" ? "wss:" : "ws:";
 const WS_URL = `${WS_PROTOCOL}//${window.location.host}/ws`;
 const API_URL = `${window.location.protocol}//${window.location.host}`;
 const MAX_TIMELINE_EVENTS = 20000;
+const LIVE_BATCH_WINDOW_MS = 50;
+const RECONNECT_DELAY_MS = 1000;
+const COLUMNAR_JSON = "application/vnd.floorcast.columnar+json";
+// Must match the server's TILE_WIDTHS
+const TILE_WIDTHS_MS = [5 * 60, 60 * 60, 6 * 60 * 60, 24 * 60 * 60].map((s) => s * 1000);
+const MAX_TILES_PER_VIEW = 8;
+const MAX_CACHED_TILES = 256;
+
+function tileWidthFor(spanMs: number): number {
+  return (
+    TILE_WIDTHS_MS.find((width) => spanMs / width <= MAX_TILES_PER_VIEW) ??
+    TILE_WIDTHS_MS[TILE_WIDTHS_MS.length - 1]
+  );
+}
+
+// Completed tiles never change, so they are kept (LRU by insertion order) and never refetched
+async function fetchTile(
+  cache: Map<string, TimelineEvent[]>,
+  width: number,
+  index: number
+): Promise<TimelineEvent[]> {
+  const key = `${width}:${index}`;
+  const cached = cache.get(key);
+  if (cached) {
+    cache.delete(key);
+    cache.set(key, cached);
+    return cached;
+  }
+
+  const response = await fetch(`${API_URL}/timeline/tiles/${width / 1000}/${index}`, {
+    headers: { Accept: COLUMNAR_JSON },
+  });
+  if (!response.ok) throw new Error("Failed to fetch timeline tile");
+
+  const data = await response.json();
+  const events = decodeColumnar(data.events);
+  if (data.complete) {
+    cache.set(key, events);
+    const oldest = cache.keys().next().value;
+    if (cache.size > MAX_CACHED_TILES && oldest !== undefined) {
+      cache.delete(oldest);
+    }
+  }
+  return events;
+}
 
 export function useFloorcast() {
   const [registry, setRegistry] = useState<Registry | null>(null);
   const [entityStates, setEntityStates] = useState<EntityState>({});
   const [connected, setConnected] = useState(false);
   const [timelineEvents, setTimelineEvents] = useState<TimelineEvent[]>([]);
-  const [timelineRange, setTimelineRange] = useState<{ start: number; end: number } | null>(null);
   const wsRef = useRef<WebSocket | null>(null);
   const fetchingRef = useRef(false);
+  const tileCacheRef = useRef(new Map<string, TimelineEvent[]>());
+  // What this client already holds, so a reconnect only receives what it missed
+  const lastEventIdRef = useRef<number | null>(null);
+  const registryVersionRef = useRef<string | null>(null);
 
   useEffect(() => {
-    const ws = new WebSocket(WS_URL);
-    wsRef.current = ws;
+    let closed = false;
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
 
-    ws.onopen = () => {
-      setConnected(true);
-    };
-
-    ws.onclose = () => {
-      setConnected(false);
+    const applyLiveEvents = (events: LiveEvent[]) => {
+      if (events.length > 0) {
+        lastEventIdRef.current = events[events.length - 1].id;
+      }
+      setEntityStates((prev) => {
+        const next = { ...prev };
+        for (const e of events) {
+          next[e.entity_id] = { value: e.state, unit: e.unit };
+        }
+        return next;
+      });
+      setTimelineEvents((prev) => {
+        const added: TimelineEvent[] = events.map((e) => ({
+          entity_id: e.entity_id,
+          state: e.state,
+          unit: e.unit,
+          timestamp: e.timestamp,
+          id: e.id,
+        }));
+        return [...prev, ...added].slice(-MAX_TIMELINE_EVENTS);
+      });
     };
 
-    ws.onmessage = (event) => {
-      const message: WSMessage = JSON.parse(event.data);
-
-      switch (message.type) {
-        case "registry":
-          setRegistry(message.registry);
-          // Auto-subscribe to live after getting registry
-          ws.send(JSON.stringify({ type: "subscribe", data: "entity_states"}));
-          break;
-        case "snapshot":
-          setEntityStates(message.state);
-          break;
-        case "event":
-          setEntityStates((prev) => ({
-            ...prev,
-            [message.entity_id]: { value: message.state, unit: message.unit },
-          }));
-          setTimelineEvents((prev) => {
-            const newEvent: TimelineEvent = {
-              entity_id: message.entity_id,
-              state: message.state,
-              unit: message.unit,
-              timestamp: message.timestamp,
-              id: message.id,
-            };
-            const updated = [...prev, newEvent];
-            return updated.slice(-MAX_TIMELINE_EVENTS);
-          });
-          break;
-        case "connected":
-          console.log("Subscribed:", message.subscriber_id);
-          break;
+    const connect = () => {
+      const params = new URLSearchParams();
+      if (lastEventIdRef.current !== null) {
+        params.set("last_event_id", String(lastEventIdRef.current));
       }
+      if (registryVersionRef.current !== null) {
+        params.set("registry_version", registryVersionRef.current);
+      }
+      const query = params.toString();
+      const ws = new WebSocket(query ? `${WS_URL}?${query}` : WS_URL);
+      wsRef.current = ws;
+
+      // Live updates start once the registry is current; batched so bursts render once
+      let subscribed = false;
+      const subscribe = () => {
+        if (subscribed) return;
+        subscribed = true;
+        ws.send(
+          JSON.stringify({
+            type: "subscribe",
+            data: { topic: "entity_states", batch: { window_ms: LIVE_BATCH_WINDOW_MS } },
+          }),
+        );
+      };
+
+      ws.onopen = () => {
+        setConnected(true);
+      };
+
+      ws.onclose = () => {
+        setConnected(false);
+        if (!closed) {
+          reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+        }
+      };
+
+      ws.onmessage = (event) => {
+        const message: WSMessage = JSON.parse(event.data);
+
+        switch (message.type) {
+          case "registry":
+            setRegistry(message.registry);
+            registryVersionRef.current = message.version;
+            subscribe();
+            break;
+          case "resumed":
+            // Subscribing replays the events missed while disconnected
+            subscribe();
+            break;
+          case "snapshot":
+            setEntityStates(message.state);
+            break;
+          case "event":
+            applyLiveEvents([message]);
+            break;
+          case "events":
+            applyLiveEvents(message.events);
+            break;
+          case "connected":
+            console.log("Subscribed:", message.subscriber_id);
+            break;
+        }
+      };
     };
 
+    connect();
+
     return () => {
-      ws.close();
+      closed = true;
+      clearTimeout(reconnectTimer);
+      wsRef.current?.close();
     };
   }, []);
 
-  // Fetch historical timeline data
+  // Fetch historical timeline data as epoch-aligned tiles so overlapping views reuse them
   const fetchTimeline = useCallback(async (startTime: Date, endTime: Date) => {
     if (fetchingRef.current) return;
 
-    // Check if we already have this range
-    if (timelineRange) {
+    fetchingRef.current = true;
+    try {
       const startMs = startTime.getTime();
       const endMs = endTime.getTime();
-      if (startMs >= timelineRange.start && endMs <= timelineRange.end) {
-        return; // Already have this data
+      const width = tileWidthFor(endMs - startMs);
+      const indices: number[] = [];
+      for (let index = Math.floor(startMs / width); index * width < endMs; index++) {
+        indices.push(index);
       }
-    }
-
-    fetchingRef.current = true;
-    try {
-      const params = new URLSearchParams({
-        start_time: startTime.toISOString(),
-        end_time: endTime.toISOString(),
-      });
-      const response = await fetch(`${API_URL}/timeline?${params}`);
-      if (!response.ok) throw new Error("Failed to fetch timeline");
-
-      const data = await response.json();
-
-      // Convert backend events to TimelineEvent format
-      const historicalEvents: TimelineEvent[] = data.events.map((e: { id: number; entity_id: string; state: string | null; unit: string | null; timestamp: number }) => ({
-        id: e.id,
-        entity_id: e.entity_id,
-        state: e.state,
-        unit: e.unit,
-        timestamp: e.timestamp,
-      }));
+      const tiles = await Promise.all(
+        indices.map((index) => fetchTile(tileCacheRef.current, width, index))
+      );
+      const historicalEvents = tiles.flat();
 
       setTimelineEvents((prev) => {
         // Merge historical events with existing, removing duplicates
@@ -109,22 +192,12 @@ export function useFloorcast() {
         const merged = [...newEvents, ...prev].sort((a, b) => a.timestamp - b.timestamp);
         return merged.slice(-MAX_TIMELINE_EVENTS);
       });
-
-      setTimelineRange((prev) => {
-        const startMs = startTime.getTime();
-        const endMs = endTime.getTime();
-        if (!prev) return { start: startMs, end: endMs };
-        return {
-          start: Math.min(prev.start, startMs),
-          end: Math.max(prev.end, endMs),
-        };
-      });
     } catch (error) {
       console.error("Failed to fetch timeline:", error);
     } finally {
       fetchingRef.current = false;
     }
-  }, [timelineRange]);
+  }, []);
 
   return { registry, entityStates, connected, timelineEvents, fetchTimeline };
 }
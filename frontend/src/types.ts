@@ -41,11 +41,46 @@ export interface EntityState {
   [entityId: string]: EntityStateValue;
 }
 
+// Dictionary-encoded entity/state/unit columns; id and timestamp are deltas from the previous row
+export interface ColumnarEvents {
+  count: number;
+  entities: string[];
+  states: (string | null)[];
+  units: (string | null)[];
+  id: number[];
+  timestamp: number[];
+  entity: number[];
+  state: number[];
+  unit: number[];
+}
+
+export interface LiveEvent {
+  type: "event";
+  entity_id: string;
+  state: string | null;
+  unit: string | null;
+  timestamp: number;
+  id: number;
+}
+
 export type WSMessage =
-  | { type: "registry"; registry: Registry }
+  | { type: "registry"; version: string; registry: Registry }
+  // Reconnected within the server's buffer: missed events follow the subscribe, no snapshot
+  | { type: "resumed"; last_event_id: number }
   | { type: "connected"; subscriber_id: string }
   | { type: "snapshot"; state: EntityState }
-  | { type: "event"; entity_id: string; state: string | null; unit: string | null; timestamp: number; id: number };
+  | LiveEvent
+  | { type: "events"; events: LiveEvent[] }
+  | { type: "timeline"; start_time: string; end_time: string | null; snapshot: EntityState; events: ColumnarEvents }
+  | { type: "timeline.snapshot"; request_id: string; timestamp: number; state: EntityState }
+  | { type: "timeline.chunk"; request_id: string; start: number; end: number; events: ColumnarEvents }
+  | { type: "timeline.done"; request_id: string }
+  | { type: "playback.state"; timestamp: number; state: EntityState }
+  | { type: "playback.event"; entity_id: string; state: string | null; unit: string | null; timestamp: number; id: number }
+  | { type: "playback.paused"; timestamp: number | null }
+  | { type: "playback.end"; timestamp: number | null }
+  // Live updates were dropped; a fresh snapshot follows
+  | { type: "resync" };
 
 export interface TimelineEvent {
   entity_id: string;
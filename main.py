@@ -1,26 +1,56 @@
 from __future__ import annotations
 
 import asyncio
+import multiprocessing
+import socket
+from collections.abc import AsyncIterator, Sequence
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import timedelta
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
 
 import structlog
+from aiosqlite import Connection
+from fastapi import FastAPI
 from websockets import ConnectionClosed
 
 from floorcast.adapters.home_assistant import connect_home_assistant
 from floorcast.api.app_state import AppState
 from floorcast.api.factories import create_app
+from floorcast.api.response_cache import ResponseCache
+from floorcast.common.aio import create_logged_task
+from floorcast.common.metrics import Counter, Gauge
 from floorcast.domain.event_filtering import EntityBlockList
-from floorcast.domain.events import EntityStateChanged, FCEvent, RegistryUpdated
-from floorcast.domain.snapshot_policies import ElapsedTimePolicy
+from floorcast.domain.events import EntityStateChanged, FCEvent, RegistryUpdated, ReplayObserved
+from floorcast.domain.ports import EventStore
+from floorcast.domain.retention import SNAPSHOT_RETENTION_TIERS, EventRetention
+from floorcast.domain.snapshot_policies import (
+    ElapsedTimePolicy,
+    ReplayCostModel,
+    ReplayCostPolicy,
+    SnapshotPolicy,
+)
+from floorcast.domain.websocket import SlowConsumerPolicy
 from floorcast.infrastructure.backoff import Backoff
 from floorcast.infrastructure.config import Config
 from floorcast.infrastructure.db import connect_db
 from floorcast.infrastructure.event_bus import TypedEventBus
+from floorcast.infrastructure.ipc import EventBroadcaster, EventRelay
 from floorcast.infrastructure.logging import configure_logging
+from floorcast.infrastructure.metrics import ProcessMetrics
+from floorcast.repositories.archive import ArchivedEventRepository
+from floorcast.repositories.backup import BackupRepository
 from floorcast.repositories.event import EventRepository
+from floorcast.repositories.maintenance import MaintenanceRepository
+from floorcast.repositories.partitioned_event import PartitionedEventRepository
+from floorcast.repositories.rollup import RollupRepository
 from floorcast.repositories.snapshot import SnapshotRepository
-from floorcast.server import run_websocket_server
+from floorcast.server import bind_server_socket, run_websocket_server
+from floorcast.services.backup import BackupService
 from floorcast.services.ingestion import IngestionService
 from floorcast.services.registry import RegistryService
+from floorcast.services.retention import RetentionService
+from floorcast.services.rollup import RollupService
 from floorcast.services.snapshot_manager import SnapshotManager
 from floorcast.services.state import StateService
 from floorcast.services.websocket import WebsocketService
@@ -29,64 +59,263 @@ config = Config()  # type: ignore[call-arg]
 configure_logging(config.log_level, config.log_to_console)
 logger = structlog.get_logger(__name__)
 
+HA_CONNECTED = Gauge("floorcast_home_assistant_connected", "1 while connected to Home Assistant")
+HA_RECONNECTS = Counter(
+    "floorcast_home_assistant_reconnects_total",
+    "Connections to Home Assistant lost or refused, each followed by a retry",
+)
+# What the ingest process forwards to the API workers
+RELAYED_EVENTS = (EntityStateChanged, RegistryUpdated)
 
-async def main() -> None:
-    event_bus = TypedEventBus[FCEvent]()
 
-    async with connect_db(config.db_uri) as db_conn:
-        logger.info("connected to floorcast db", db_uri=config.db_uri)
+@asynccontextmanager
+async def open_event_store(db_conn: Connection) -> AsyncIterator[ArchivedEventRepository]:
+    async with AsyncExitStack() as stack:
+        event_repo: EventRepository | PartitionedEventRepository = EventRepository(db_conn)
+        if config.event_partitions:
+            event_repo = await stack.enter_async_context(
+                PartitionedEventRepository(db_conn, config.db_uri, connect_db)
+            )
+        # Archived months are read from their segments even while archiving is turned off
+        yield await stack.enter_async_context(ArchivedEventRepository(event_repo, config.db_uri))
 
-        event_repo = EventRepository(db_conn)
-        snapshot_repo = SnapshotRepository(db_conn)
-        state_service = StateService(snapshot_repo, event_repo)
-        blocklist = EntityBlockList(config.entity_blocklist)
-        registry_service = RegistryService(event_bus)
 
-        websocket_service = WebsocketService(
-            bus=event_bus, registry_service=registry_service, state_service=state_service
-        )
-        app_state = AppState(
-            event_bus=event_bus,
-            event_repo=event_repo,
-            state_service=state_service,
-            registry_service=registry_service,
-            websocket_service=websocket_service,
+def create_backup_service() -> BackupService:
+    return BackupService(
+        BackupRepository(config.db_uri, config.backup_dir, compress=config.backup_compress),
+        keep=config.backup_keep,
+    )
+
+
+def create_api(
+    event_bus: TypedEventBus[FCEvent],
+    db_conn: Connection,
+    event_repo: EventStore,
+    cost_model: ReplayCostModel,
+    backup_service: BackupService,
+    metrics: ProcessMetrics,
+) -> FastAPI:
+    state_service = StateService(
+        SnapshotRepository(db_conn), event_repo, cost_model=cost_model, bus=event_bus
+    )
+    registry_service = RegistryService(event_bus)
+    websocket_service = WebsocketService(
+        bus=event_bus,
+        registry_service=registry_service,
+        state_service=state_service,
+        event_repo=event_repo,
+        queue_max_size=config.ws_queue_max_size,
+        slow_consumer_policy=SlowConsumerPolicy(config.ws_slow_consumer_policy),
+        resume_buffer_size=config.ws_resume_buffer_size,
+    )
+    app_state = AppState(
+        event_bus=event_bus,
+        event_repo=event_repo,
+        state_service=state_service,
+        registry_service=registry_service,
+        websocket_service=websocket_service,
+        rollup_service=RollupService(RollupRepository(db_conn), event_repo),
+        response_cache=create_response_cache(),
+        backup_service=backup_service,
+        metrics=metrics,
+        admin_token=config.admin_token,
+    )
+    return create_app(app_state)
+
+
+def create_response_cache() -> ResponseCache:
+    # Once retention can drop or rewrite old events, cached windows only hold until its next run
+    rewrites_history = create_event_retention().rewrites_history
+    max_age = config.retention_interval_seconds if rewrites_history else None
+    return ResponseCache(config.response_cache_max_bytes, max_age=max_age)
+
+
+def create_snapshot_policy(cost_model: ReplayCostModel) -> SnapshotPolicy:
+    if config.snapshot_policy == "replay_cost":
+        return ReplayCostPolicy(config.snapshot_latency_budget_ms / 1000, cost_model)
+    return ElapsedTimePolicy(config.snapshot_interval_seconds)
+
+
+def create_event_retention() -> EventRetention:
+    def days(value: int | None) -> timedelta | None:
+        return None if value is None else timedelta(days=value)
+
+    return EventRetention(
+        payload_for=days(config.event_payload_retention_days),
+        keep_for=days(config.event_retention_days),
+        max_bytes=config.db_max_bytes,
+        archive_after=days(config.event_archive_after_days),
+    )
+
+
+async def run_ingestion(
+    event_bus: TypedEventBus[FCEvent],
+    db_conn: Connection,
+    event_repo: ArchivedEventRepository,
+    cost_model: ReplayCostModel,
+    backup_service: BackupService,
+) -> None:
+    """Persists Home Assistant events and keeps snapshots and rollups up to date."""
+    snapshot_repo = SnapshotRepository(db_conn)
+    state_service = StateService(snapshot_repo, event_repo, cost_model=cost_model)
+    rollup_service = RollupService(RollupRepository(db_conn), event_repo)
+    blocklist = EntityBlockList(config.entity_blocklist)
+
+    snapshot_policy = create_snapshot_policy(cost_model)
+    ingest_service = IngestionService(
+        event_bus=event_bus,
+        event_repo=event_repo,
+        entity_blocklist=blocklist,
+    )
+    snapshot_manager = SnapshotManager(
+        snapshot_repo=snapshot_repo,
+        state_service=state_service,
+        snapshot_policy=snapshot_policy,
+    )
+    retention_service = RetentionService(
+        snapshot_repo=snapshot_repo,
+        event_repo=event_repo,
+        maintenance=MaintenanceRepository(
+            db_conn,
+            event_repo.inner if isinstance(event_repo.inner, PartitionedEventRepository) else None,
+        ),
+        snapshot_tiers=SNAPSHOT_RETENTION_TIERS,
+        max_replay_events=config.snapshot_retention_max_replay_events,
+        event_retention=create_event_retention(),
+        archive=event_repo,
+    )
+    await snapshot_manager.initialize()
+    await rollup_service.initialize()
+
+    # Ordered: each sees every event, in id order, and never overlaps its own writes
+    event_bus.subscribe(EntityStateChanged, snapshot_manager.on_entity_state_changed, ordered=True)
+    event_bus.subscribe_batches(EntityStateChanged, rollup_service.on_entity_states_changed)
+
+    # Retention runs in the only writer, between ingested events
+    retention = create_logged_task(
+        retention_service.run(config.retention_interval_seconds), name="retention"
+    )
+    backups = None
+    if config.backup_interval_seconds is not None:
+        backups = create_logged_task(
+            backup_service.run(config.backup_interval_seconds), name="scheduled backups"
         )
-        app = create_app(app_state)
 
-        snapshot_policy = ElapsedTimePolicy(config.snapshot_interval_seconds)
-        ingest_service = IngestionService(
-            event_bus=event_bus,
-            event_repo=event_repo,
-            entity_blocklist=blocklist,
+    websocket_url = config.ha_websocket_url
+    websocket_token = config.ha_websocket_token
+    try:
+        for backoff in Backoff(2, 60):
+            try:
+                async with connect_home_assistant(websocket_url, websocket_token) as client:
+                    logger.info("connection to home assistant", websocket_url=websocket_url)
+                    HA_CONNECTED.set(1)
+                    registry = await client.fetch_registry()
+                    event_bus.publish(RegistryUpdated(registry=registry))
+                    await ingest_service.run(client)
+                    backoff.reset()
+            except (ConnectionClosed, ConnectionRefusedError, OSError):
+                HA_CONNECTED.set(0)
+                HA_RECONNECTS.inc()
+                logger.warning("connection to home assistant lost", retry_in=backoff)
+                await asyncio.sleep(backoff.wait_seconds())
+    finally:
+        retention.cancel()
+        if backups is not None:
+            backups.cancel()
+
+
+def run_api_worker(sock: socket.socket) -> None:
+    """Entry point of an API worker process."""
+    try:
+        asyncio.run(serve_api(sock))
+    except KeyboardInterrupt:
+        pass
+
+
+async def serve_api(sock: socket.socket) -> None:
+    # Live events arrive from the ingest process; subscribers can't tell the difference
+    event_bus = TypedEventBus[FCEvent]()
+    async with connect_db(config.db_uri) as db_conn, open_event_store(db_conn) as event_repo:
+        metrics = ProcessMetrics(config.metrics_dir)
+        # Only learns from this worker's reconstructions, for predicted vs. actual logging
+        app = create_api(
+            event_bus, db_conn, event_repo, ReplayCostModel(), create_backup_service(), metrics
         )
-        snapshot_manager = SnapshotManager(
-            snapshot_repo=snapshot_repo,
-            state_service=state_service,
-            snapshot_policy=snapshot_policy,
+        # Sends its reconstruction timings back, for the ingest process's snapshot policy
+        relay = EventRelay(
+            event_bus, config.ipc_socket_path, event_types=RELAYED_EVENTS, send=(ReplayObserved,)
         )
-        await snapshot_manager.initialize()
-
-        websocket_url = config.ha_websocket_url
-        websocket_token = config.ha_websocket_token
-
-        async def ingestion_loop() -> None:
-            for backoff in Backoff(2, 60):
-                try:
-                    async with connect_home_assistant(websocket_url, websocket_token) as client:
-                        logger.info("connection to home assistant", websocket_url=websocket_url)
-                        registry = await client.fetch_registry()
-                        event_bus.publish(RegistryUpdated(registry=registry))
-                        await ingest_service.run(client)
-                        backoff.reset()
-                except (ConnectionClosed, ConnectionRefusedError, OSError):
-                    logger.warning("connection to home assistant lost", retry_in=backoff)
-                    await asyncio.sleep(backoff.wait_seconds())
-
-        event_bus.subscribe(EntityStateChanged, snapshot_manager.on_entity_state_changed)
-
-        server_fn = run_websocket_server(app)
-        await asyncio.gather(ingestion_loop(), server_fn)
+        await asyncio.gather(relay.run(), metrics.run(), run_websocket_server(app, sockets=[sock]))
+
+
+async def watch_workers(workers: Sequence[BaseProcess]) -> None:
+    """Fails the deployment as soon as an API worker exits, rather than ingest without an API."""
+    await asyncio.to_thread(wait, [worker.sentinel for worker in workers])
+    exited = [worker for worker in workers if not worker.is_alive()]
+    raise RuntimeError(f"API worker exited: {', '.join(worker.name for worker in exited)}")
+
+
+async def main() -> None:
+    event_bus = TypedEventBus[FCEvent]()
+    # Reconstruction timings from wherever reads are served, here or in the API workers, drive
+    # the snapshot policy
+    cost_model = ReplayCostModel()
+
+    async with connect_db(config.db_uri) as db_conn, open_event_store(db_conn) as event_repo:
+        logger.info("connected to floorcast db", db_uri=config.db_uri)
+
+        # API workers take on-demand backups with their own service; the lock file keeps them
+        # from overlapping with the scheduled ones
+        backup_service = create_backup_service()
+        if not config.api_workers:
+            app = create_api(
+                event_bus, db_conn, event_repo, cost_model, backup_service, ProcessMetrics()
+            )
+            await asyncio.gather(
+                run_ingestion(event_bus, db_conn, event_repo, cost_model, backup_service),
+                run_websocket_server(app),
+            )
+            return
+
+        # One writer ingests; the API workers only read, from WAL-mode SQLite
+        metrics = ProcessMetrics(config.metrics_dir)
+        metrics.clear()
+        sock = bind_server_socket()
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(
+                target=run_api_worker, args=(sock,), name=f"floorcast-api-{i}", daemon=True
+            )
+            for i in range(config.api_workers)
+        ]
+
+        async def observe_replay(event: ReplayObserved) -> None:
+            cost_model.observe_replay(event.events, event.load_seconds, event.replay_seconds)
+
+        # The workers serve the reads, so the snapshot policy learns from their reconstructions
+        event_bus.subscribe(ReplayObserved, observe_replay)
+        async with EventBroadcaster(
+            event_bus,
+            config.ipc_socket_path,
+            event_types=RELAYED_EVENTS,
+            latest=(RegistryUpdated,),
+            receive=(ReplayObserved,),
+        ):
+            for worker in workers:
+                worker.start()
+            logger.info("started api workers", workers=len(workers))
+            try:
+                await asyncio.gather(
+                    run_ingestion(event_bus, db_conn, event_repo, cost_model, backup_service),
+                    metrics.run(),
+                    watch_workers(workers),
+                )
+            finally:
+                for worker in workers:
+                    worker.terminate()
+                for worker in workers:
+                    worker.join()
+                sock.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,41 @@
+"""add rollups table
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "006"
+down_revision: Union[str, Sequence[str], None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+    CREATE TABLE IF NOT EXISTS rollups (
+        resolution INTEGER NOT NULL,
+        bucket_start INTEGER NOT NULL,
+        entity_id TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        numeric_count INTEGER NOT NULL DEFAULT 0,
+        min_value REAL,
+        max_value REAL,
+        sum_value REAL NOT NULL DEFAULT 0,
+        last_state TEXT,
+        last_unit TEXT,
+        last_timestamp INTEGER NOT NULL,
+        last_event_id INTEGER NOT NULL,
+        PRIMARY KEY (resolution, bucket_start, entity_id)
+    ) WITHOUT ROWID
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_rollups_last_event_id ON rollups(last_event_id)")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE rollups")
@@ -0,0 +1,36 @@
+"""add entity/domain timestamp indexes
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "007"
+down_revision: Union[str, Sequence[str], None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The composite indexes cover every lookup the single-column ones served
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_events_entity_id_timestamp "
+        "ON events(entity_id, timestamp, id)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_events_domain_timestamp ON events(domain, timestamp, id)"
+    )
+    op.execute("DROP INDEX IF EXISTS ix_events_entity_id")
+    op.execute("DROP INDEX IF EXISTS ix_events_domain")
+
+
+def downgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_events_domain ON events(domain)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_events_entity_id ON events(entity_id)")
+    op.execute("DROP INDEX ix_events_domain_timestamp")
+    op.execute("DROP INDEX ix_events_entity_id_timestamp")
@@ -0,0 +1,37 @@
+"""enable incremental auto_vacuum
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import context, op
+
+revision: str = "008"
+down_revision: Union[str, Sequence[str], None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lets retention hand freed pages back a few at a time. Changing auto_vacuum on an existing
+    # database only takes effect after a full VACUUM, which can't run inside a transaction and
+    # rewrites the whole file once: it blocks for as long as that takes and needs as much free
+    # disk again as the database. So it only runs on a database without events yet, or when
+    # asked for with `alembic -x vacuum=true upgrade head`
+    asked = context.get_x_argument(as_dictionary=True).get("vacuum") == "true"
+    empty = op.get_bind().execute(sa.text("SELECT NOT EXISTS (SELECT 1 FROM events)")).scalar()
+    with op.get_context().autocommit_block():
+        op.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        if asked or empty:
+            op.execute("VACUUM")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("PRAGMA auto_vacuum = NONE")
+        op.execute("VACUUM")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Benchmark how long taking a snapshot stalls the event loop.
+
+Compares the snapshot write SnapshotRepository.create does now (encoded and compressed in a
+worker thread, one INSERT ... RETURNING) with what it used to do (json.dumps on the loop, then
+insert, commit and a re-read for created_at). A ticker task measures how late it gets to run.
+Run from the repository root, which has to be on the import path:
+
+    PYTHONPATH=. python scripts/bench_snapshot_stall.py
+"""
+
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import aiosqlite
+
+from floorcast.domain.models import Snapshot
+from floorcast.repositories.snapshot import SnapshotRepository
+
+ENTITY_COUNTS = (1_000, 20_000, 100_000)
+RUNS = 5
+TICK = 0.001
+
+SCHEMA = """
+    CREATE TABLE snapshots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        last_event_id INTEGER NOT NULL,
+        state JSON NOT NULL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+
+def make_state(entities: int) -> dict[str, dict[str, str | None]]:
+    return {
+        f"sensor.bench_{i}": {"value": f"{i * 0.37:.2f}", "unit": "kWh" if i % 3 else None}
+        for i in range(entities)
+    }
+
+
+async def create_inline(conn: aiosqlite.Connection, snapshot: Snapshot) -> None:
+    row = await conn.execute_insert(
+        "INSERT INTO snapshots (last_event_id, state) VALUES (?, ?)",
+        (snapshot.last_event_id, json.dumps(snapshot.state)),
+    )
+    await conn.commit()
+    cursor = await conn.execute("SELECT * FROM snapshots WHERE id = ?", (row[0],))  # type: ignore[index]
+    await cursor.fetchone()
+
+
+async def max_stall(work: Callable[[], Awaitable[object]]) -> float:
+    """Longest delay past TICK that a task sleeping in TICK steps saw while `work` ran."""
+    stalls = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(TICK)
+            stalls.append(time.perf_counter() - before - TICK)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 5)
+    await work()
+    done.set()
+    await task
+    return max(stalls)
+
+
+async def main() -> None:
+    print(f"worst event-loop stall per snapshot, best of {RUNS} runs")
+    print(f"{'entities':>9} {'inline':>10} {'off-loop':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        async with aiosqlite.connect(Path(tmp) / "bench.db") as conn:
+            await conn.executescript(SCHEMA)
+            repo = SnapshotRepository(conn)
+            for entities in ENTITY_COUNTS:
+                state = make_state(entities)
+                inline = min(
+                    [
+                        await max_stall(
+                            lambda: create_inline(conn, Snapshot(last_event_id=1, state=state))
+                        )
+                        for _ in range(RUNS)
+                    ]
+                )
+                off_loop = min(
+                    [
+                        await max_stall(lambda: repo.create(Snapshot(last_event_id=1, state=state)))
+                        for _ in range(RUNS)
+                    ]
+                )
+                print(f"{entities:>9} {inline * 1000:>8.2f}ms {off_loop * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
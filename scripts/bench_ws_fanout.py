@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Benchmark live-event fan-out to simulated websocket clients.
+
+Compares encoding each event once and sharing the frame (what WebsocketService does) with
+building and JSON-encoding the message separately for every client (what it used to do).
+Run from the repository root, which has to be on the import path:
+
+    PYTHONPATH=. python scripts/bench_ws_fanout.py
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from unittest import mock
+
+from floorcast.domain.events import EntityStateChanged
+from floorcast.domain.models import Event
+from floorcast.domain.websocket import WSConnection, WSFrame, WSMessage, serialize
+from floorcast.infrastructure.event_bus import TypedEventBus
+from floorcast.services.websocket import WebsocketService
+
+CLIENT_COUNTS = (100, 1_000)
+EVENTS = 1_000
+
+
+def make_events(count: int) -> list[EntityStateChanged]:
+    now = datetime.now(tz=timezone.utc)
+    return [
+        EntityStateChanged(
+            entity_id=f"sensor.bench_{i % 50}",
+            state=str(i),
+            event=Event(
+                id=i,
+                domain="sensor",
+                entity_id=f"sensor.bench_{i % 50}",
+                event_id=uuid.uuid4(),
+                event_type="state_changed",
+                external_id=str(i),
+                state=str(i),
+                unit="W",
+                timestamp=now,
+                data={},
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def drain(clients: list[WSConnection]) -> int:
+    """Stands in for each client's sender: turn every queued item into the text it would send."""
+    sent = 0
+    for conn in clients:
+        while not conn.queue.empty():
+            message = conn.queue.get_nowait()
+            if isinstance(message, WSFrame):
+                text = message.text
+            else:
+                text = json.dumps(serialize(message), separators=(",", ":"), ensure_ascii=False)
+            sent += len(text)
+    return sent
+
+
+async def bench_encode_once(clients: int, events: list[EntityStateChanged]) -> float:
+    service = WebsocketService(
+        bus=TypedEventBus(),
+        state_service=mock.Mock(),
+        registry_service=mock.Mock(),
+        event_repo=mock.Mock(),
+    )
+    conns = [service.connect() for _ in range(clients)]
+    for conn in conns:
+        service.send_message(conn, WSMessage("subscribe", "entity_states"))
+
+    start = time.perf_counter()
+    for event in events:
+        await service._handle_entity_state_change_event(event)
+        drain(conns)
+    return time.perf_counter() - start
+
+
+async def bench_encode_per_client(clients: int, events: list[EntityStateChanged]) -> float:
+    conns = [WSConnection() for _ in range(clients)]
+
+    start = time.perf_counter()
+    for event in events:
+        for conn in conns:
+            conn.queue.put_nowait(
+                WSMessage(
+                    type="entity.state_change",
+                    data={
+                        "id": event.event.id,
+                        "timestamp": int(event.event.timestamp.timestamp() * 1000),
+                        "state": event.state,
+                        "entity_id": event.event.entity_id,
+                        "unit": event.event.unit,
+                    },
+                )
+            )
+        drain(conns)
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    events = make_events(EVENTS)
+    print(f"{EVENTS} events per run")
+    print(f"{'clients':>8} {'per-client':>12} {'encode-once':>12} {'speedup':>8}")
+    for clients in CLIENT_COUNTS:
+        per_client = await bench_encode_per_client(clients, events)
+        once = await bench_encode_once(clients, events)
+        print(f"{clients:>8} {per_client:>11.3f}s {once:>11.3f}s {per_client / once:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from floorcast.api.dependencies import require_admin
+
+
+def make_request(admin_token, authorization=None):
+    headers = [] if authorization is None else [(b"authorization", authorization.encode())]
+    app = SimpleNamespace(state=SimpleNamespace(admin_token=admin_token))
+    return Request({"type": "http", "app": app, "headers": headers})
+
+
+def test_admin_endpoints_are_off_without_a_token():
+    with pytest.raises(HTTPException) as raised:
+        require_admin(make_request(None, "Bearer anything"))
+
+    assert raised.value.status_code == 404
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "Basic s3cret", "s3cret"])
+def test_admin_endpoints_need_the_token(authorization):
+    with pytest.raises(HTTPException) as raised:
+        require_admin(make_request("s3cret", authorization))
+
+    assert raised.value.status_code == 401
+
+
+def test_admin_endpoints_accept_the_token():
+    require_admin(make_request("s3cret", "Bearer s3cret"))
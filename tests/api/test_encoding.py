@@ -0,0 +1,75 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from floorcast.api import encoding
+from floorcast.api.encoding import (
+    COLUMNAR_JSON,
+    COLUMNAR_MSGPACK,
+    JSON,
+    WS_JSON,
+    WS_MSGPACK,
+    accepts_gzip,
+    negotiate_timeline_format,
+    negotiate_ws_subprotocol,
+)
+from floorcast.api.routes import sender
+from floorcast.domain.websocket import WSConnection, WSEncoding, WSFrame, WSMessage
+
+msgpack = pytest.importorskip("msgpack")
+
+
+def test_negotiate_timeline_format_prefers_client_order():
+    assert negotiate_timeline_format(f"{COLUMNAR_MSGPACK}, {COLUMNAR_JSON}") == COLUMNAR_MSGPACK
+    assert negotiate_timeline_format("text/html") == JSON
+
+
+def test_accepts_gzip_honours_q_values():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, gzip;q=0.5")
+    assert not accepts_gzip("gzip;q=0, identity")
+    assert not accepts_gzip("gzip; q=0.000")
+    assert accepts_gzip("*")
+    assert not accepts_gzip("*;q=0")
+    assert not accepts_gzip("gzip;q=0, *")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip(None)
+
+
+def test_negotiate_ws_subprotocol():
+    assert negotiate_ws_subprotocol([WS_MSGPACK, WS_JSON]) == WS_MSGPACK
+    assert negotiate_ws_subprotocol(["chat", WS_JSON]) == WS_JSON
+    assert negotiate_ws_subprotocol([]) is None
+
+
+def test_negotiate_ws_subprotocol_without_msgpack():
+    with mock.patch.object(encoding, "msgpack", None):
+        assert negotiate_ws_subprotocol([WS_MSGPACK, WS_JSON]) == WS_JSON
+
+
+@pytest.mark.asyncio
+async def test_sender_encodes_shared_frames_once_per_encoding():
+    frame = WSFrame(text='{"type":"event","id":1}', key="a.b")
+    sent = []
+    ws = mock.Mock()
+    ws.send_bytes = mock.AsyncMock(side_effect=sent.append)
+    conns = [WSConnection(encoding=WSEncoding.MSGPACK) for _ in range(2)]
+    for conn in conns:
+        conn.queue.put_nowait(frame)
+        conn.queue.put_nowait(WSMessage(type="pong"))
+
+    with mock.patch("floorcast.api.routes.pack", wraps=encoding.pack) as pack:
+        for conn in conns:
+            with pytest.raises(TimeoutError):
+                async with asyncio.timeout(0.01):
+                    await sender(conn, ws, mock.Mock())
+
+    assert [msgpack.unpackb(data) for data in sent] == [
+        {"type": "event", "id": 1},
+        {"type": "pong"},
+        {"type": "event", "id": 1},
+        {"type": "pong"},
+    ]
+    # Once for the shared frame, once per pong
+    assert pack.call_count == 3
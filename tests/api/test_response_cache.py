@@ -0,0 +1,138 @@
+import asyncio
+import gzip
+from unittest import mock
+
+import pytest
+from fastapi.responses import Response
+
+from floorcast.api.response_cache import ResponseCache
+
+
+def render_body(body: bytes, calls: list[int] | None = None):
+    async def render() -> Response:
+        if calls is not None:
+            calls.append(1)
+        await asyncio.sleep(0)
+        return Response(body, media_type="application/json")
+
+    return render
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_caches_gzipped_body():
+    cache = ResponseCache(max_bytes=1024 * 1024)
+    calls = []
+
+    first = await cache.get_or_create("key", render_body(b'{"a": 1}', calls))
+    second = await cache.get_or_create("key", render_body(b'{"a": 2}', calls))
+
+    assert first is second
+    assert len(calls) == 1
+    assert gzip.decompress(first.gzipped) == b'{"a": 1}'
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_render():
+    cache = ResponseCache(max_bytes=1024 * 1024)
+    calls = []
+
+    results = await asyncio.gather(
+        *(cache.get_or_create("key", render_body(b"body", calls)) for _ in range(10))
+    )
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+@pytest.mark.asyncio
+async def test_rendering_caller_going_away_does_not_fail_the_others():
+    cache = ResponseCache(max_bytes=1024 * 1024)
+    release = asyncio.Event()
+
+    async def slow() -> Response:
+        await release.wait()
+        return Response(b"body")
+
+    first = asyncio.create_task(cache.get_or_create("key", slow))
+    second = asyncio.create_task(cache.get_or_create("key", slow))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    entry = await second
+    assert gzip.decompress(entry.gzipped) == b"body"
+    assert first.cancelled()
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_render_failure_propagates_and_is_not_cached():
+    cache = ResponseCache(max_bytes=1024 * 1024)
+
+    async def fail() -> Response:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_create("key", fail)
+
+    entry = await cache.get_or_create("key", render_body(b"ok"))
+    assert gzip.decompress(entry.gzipped) == b"ok"
+
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used_when_over_budget():
+    probe = ResponseCache(max_bytes=1024 * 1024)
+    entry_size = len((await probe.get_or_create("x", render_body(b"a" * 100))).gzipped)
+    cache = ResponseCache(max_bytes=entry_size * 2)
+
+    await cache.get_or_create("a", render_body(b"a" * 100))
+    await cache.get_or_create("b", render_body(b"a" * 100))
+    await cache.get_or_create("a", render_body(b"a" * 100))  # touch a
+    await cache.get_or_create("c", render_body(b"a" * 100))
+
+    calls = []
+    await cache.get_or_create("a", render_body(b"a" * 100, calls))
+    assert calls == []
+    await cache.get_or_create("b", render_body(b"a" * 100, calls))
+    assert calls == [1]
+    assert cache.size <= entry_size * 2
+
+
+@pytest.mark.asyncio
+async def test_respond_negotiates_encoding_and_handles_if_none_match():
+    cache = ResponseCache(max_bytes=1024 * 1024)
+    entry = await cache.get_or_create("key", render_body(b"payload"))
+
+    gzipped = entry.respond("gzip, br", None)
+    assert gzipped.status_code == 200
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "immutable" in gzipped.headers["cache-control"]
+
+    identity = entry.respond(None, None)
+    assert identity.body == b"payload"
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] != gzipped.headers["etag"]
+
+    not_modified = entry.respond("gzip", gzipped.headers["etag"])
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+
+
+@pytest.mark.asyncio
+async def test_max_age_expires_entries_and_drops_immutable():
+    cache = ResponseCache(max_bytes=1024 * 1024, max_age=60)
+    calls = []
+
+    with mock.patch("time.monotonic", return_value=1000.0):
+        entry = await cache.get_or_create("key", render_body(b"old", calls))
+    assert entry.respond("gzip", None).headers["cache-control"] == "public, max-age=60"
+
+    with mock.patch("time.monotonic", return_value=1059.0):
+        assert await cache.get_or_create("key", render_body(b"new", calls)) is entry
+    with mock.patch("time.monotonic", return_value=1060.0):
+        fresh = await cache.get_or_create("key", render_body(b"new", calls))
+
+    assert gzip.decompress(fresh.gzipped) == b"new"
+    assert len(calls) == 2
+    assert len(cache) == 1
+    assert cache.size == len(fresh.gzipped)
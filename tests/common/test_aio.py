@@ -3,7 +3,7 @@ from unittest.mock import patch
 
 import pytest
 
-from floorcast.common.aio import create_logged_task
+from floorcast.common.aio import create_logged_task, wait_for_capacity
 
 
 @pytest.mark.asyncio
@@ -94,3 +94,30 @@ async def test_cancelled_error_is_propagated():
 
     with pytest.raises(asyncio.CancelledError):
         await task
+
+
+class DrainableQueue(asyncio.Queue[int]):
+    def __init__(self) -> None:
+        super().__init__()
+        self.drained = asyncio.Event()
+
+    def get_nowait(self) -> int:
+        item = super().get_nowait()
+        self.drained.set()
+        return item
+
+
+@pytest.mark.asyncio
+async def test_wait_for_capacity_waits_for_queue_to_drain():
+    queue = DrainableQueue()
+    queue.put_nowait(1)
+    queue.put_nowait(2)
+
+    waiter = asyncio.create_task(wait_for_capacity(queue, max_pending=2))
+    await asyncio.sleep(0.02)
+    assert not waiter.done()
+
+    queue.get_nowait()
+    # Woken by the consumer, not by polling
+    await asyncio.sleep(0)
+    assert waiter.done()
@@ -0,0 +1,71 @@
+import pytest
+
+from floorcast.common.metrics import Counter, Gauge, Histogram, Registry
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_renders_counters_and_gauges(registry):
+    requests = Counter("requests_total", "Requests served", ["path"], registry=registry)
+    requests.labels("/timeline").inc()
+    requests.labels("/timeline").inc(2)
+    requests.labels('/say "hi"\n').inc()
+    Gauge("clients", "Connected clients", registry=registry).set_function(lambda: 3)
+
+    assert registry.render() == (
+        "# HELP clients Connected clients\n"
+        "# TYPE clients gauge\n"
+        "clients 3\n"
+        "# HELP requests_total Requests served\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{path="/timeline"} 3\n'
+        'requests_total{path="/say \\"hi\\"\\n"} 1\n'
+    )
+
+
+def test_renders_cumulative_histogram_buckets(registry):
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_labelled_gauge_function(registry):
+    depth = Gauge("queue_depth", "Queued", ["connection"], registry=registry)
+    depth.set_function(lambda: {("a",): 1, ("b",): 0})
+
+    assert 'queue_depth{connection="a"} 1' in registry.render()
+    assert 'queue_depth{connection="b"} 0' in registry.render()
+
+
+def test_merges_other_processes_by_name_and_labels(registry):
+    other = Registry()
+    for r, count in ((registry, 1), (other, 2)):
+        Counter("events_total", "Events", ["kind"], registry=r).labels("state").inc(count)
+        Histogram("batch", "Batch", buckets=(10,), registry=r).observe(count * 10)
+    Counter("reconnects_total", "Reconnects", registry=other).inc()
+
+    lines = registry.render([other.export()]).splitlines()
+
+    assert 'events_total{kind="state"} 3' in lines
+    assert 'batch_bucket{le="10"} 1' in lines
+    assert 'batch_bucket{le="+Inf"} 2' in lines
+    assert "batch_sum 30" in lines
+    assert "reconnects_total 1" in lines
+
+
+def test_names_are_unique(registry):
+    Counter("events_total", "Events", registry=registry)
+
+    with pytest.raises(ValueError):
+        Gauge("events_total", "Events", registry=registry)
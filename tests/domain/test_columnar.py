@@ -0,0 +1,37 @@
+from floorcast.domain.columnar import decode_columnar, encode_columnar
+from floorcast.domain.models import CompactEvent
+
+
+def test_encode_columnar_dictionary_and_delta_encodes():
+    events = [
+        CompactEvent(id=10, entity_id="sensor.temp", timestamp=1000, state="21", unit="C"),
+        CompactEvent(id=11, entity_id="light.a", timestamp=1500, state="on", unit=None),
+        CompactEvent(id=13, entity_id="sensor.temp", timestamp=1500, state="21", unit="C"),
+    ]
+
+    encoded = encode_columnar(events)
+
+    assert encoded == {
+        "count": 3,
+        "entities": ["sensor.temp", "light.a"],
+        "states": ["21", "on"],
+        "units": ["C", None],
+        "id": [10, 1, 2],
+        "timestamp": [1000, 500, 0],
+        "entity": [0, 1, 0],
+        "state": [0, 1, 0],
+        "unit": [0, 1, 0],
+    }
+
+
+def test_round_trip():
+    events = [
+        CompactEvent(id=i, entity_id=f"sensor.s{i % 3}", timestamp=i * 7, state=None, unit=None)
+        for i in range(1, 20)
+    ]
+
+    assert decode_columnar(encode_columnar(events)) == events
+
+
+def test_empty():
+    assert decode_columnar(encode_columnar([])) == []
@@ -1,8 +1,15 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
 import pytest
 
-from floorcast.domain.event_filtering import EntityBlockList, FilteredEventStream
+from floorcast.domain.event_filtering import (
+    EntityBlockList,
+    EntitySelector,
+    FilteredEventStream,
+    SubscriptionIndex,
+    TimelineFilter,
+)
+from floorcast.domain.models import Area, Device, Entity, Registry
 
 
 @dataclass
@@ -95,3 +102,131 @@ class TestFilteredEventStream:
         results = [e.entity_id async for e in stream]
 
         assert results == []
+
+
+@pytest.fixture
+def registry():
+    def entity(entity_id, area_id=None, device_id=None):
+        return Entity(
+            id=entity_id,
+            device_id=device_id,
+            domain=entity_id.split(".")[0],
+            display_name=entity_id,
+            area_id=area_id,
+            entity_category=None,
+        )
+
+    return Registry(
+        entities={
+            e.id: e
+            for e in [
+                entity("light.kitchen", area_id="kitchen"),
+                entity("sensor.kitchen_temp", device_id="thermo"),
+                entity("light.bedroom", area_id="bedroom"),
+                entity("light.porch"),
+            ]
+        },
+        devices={"thermo": Device(id="thermo", area_id="kitchen", display_name="Thermo")},
+        areas={
+            "kitchen": Area(id="kitchen", display_name="Kitchen", floor_id="ground"),
+            "bedroom": Area(id="bedroom", display_name="Bedroom", floor_id="upstairs"),
+        },
+        floors={},
+    )
+
+
+class TestTimelineFilter:
+    def test_no_selection_is_unrestricted(self, registry):
+        assert TimelineFilter.resolve(registry) is None
+
+    def test_domains_only(self, registry):
+        timeline_filter = TimelineFilter.resolve(registry, domains=["light"])
+
+        assert timeline_filter == TimelineFilter(domains=frozenset({"light"}))
+        assert timeline_filter.matches("light.anything")
+        assert not timeline_filter.matches("sensor.kitchen_temp")
+
+    def test_area_includes_entities_through_their_device(self, registry):
+        timeline_filter = TimelineFilter.resolve(registry, area_ids=["kitchen"])
+
+        assert timeline_filter.entity_ids == {"light.kitchen", "sensor.kitchen_temp"}
+
+    def test_floor_union_with_entities_narrowed_by_domain(self, registry):
+        timeline_filter = TimelineFilter.resolve(
+            registry, floor_ids=["ground"], entity_ids=["light.porch"], domains=["light"]
+        )
+
+        assert timeline_filter.entity_ids == {"light.kitchen", "light.porch"}
+        assert timeline_filter.domains is None
+
+    def test_unknown_area_selects_nothing(self, registry):
+        timeline_filter = TimelineFilter.resolve(registry, area_ids=["attic"])
+
+        assert timeline_filter.entity_ids == frozenset()
+        assert not timeline_filter.matches("light.kitchen")
+
+
+class TestEntitySelector:
+    def test_empty_selects_everything(self, registry):
+        selector = EntitySelector.from_dict({"topic": "entity_states"})
+
+        assert selector.selects_everything
+        assert selector.matches("anything.at_all", registry)
+
+    def test_globs_match_entities_missing_from_registry(self, registry):
+        selector = EntitySelector(globs=("sensor.*_temp",))
+
+        assert selector.matches("sensor.attic_temp", registry)
+        assert not selector.matches("sensor.attic_humidity", registry)
+
+    def test_floor_union_with_entities_narrowed_by_domain(self, registry):
+        selector = EntitySelector.from_dict(
+            {"floor_ids": ["ground"], "entity_ids": ["light.porch"], "domains": ["light"]}
+        )
+
+        assert selector.matches("light.kitchen", registry)
+        assert selector.matches("light.porch", registry)
+        assert not selector.matches("sensor.kitchen_temp", registry)
+        assert not selector.matches("light.bedroom", registry)
+
+
+class TestSubscriptionIndex:
+    def test_routes_entities_to_matching_subscribers(self, registry):
+        index = SubscriptionIndex[str](registry)
+        index.subscribe("everything", EntitySelector())
+        index.subscribe("kitchen", EntitySelector(area_ids=frozenset({"kitchen"})))
+        index.subscribe("bedroom", EntitySelector(area_ids=frozenset({"bedroom"})))
+
+        assert set(index.subscribers("sensor.kitchen_temp")) == {"everything", "kitchen"}
+        assert set(index.subscribers("light.bedroom")) == {"everything", "bedroom"}
+        assert set(index.subscribers("light.porch")) == {"everything"}
+
+    def test_keeps_indexed_entities_current_as_subscribers_change(self, registry):
+        index = SubscriptionIndex[str](registry)
+        index.subscribe("a", EntitySelector(domains=frozenset({"light"})))
+        assert set(index.subscribers("light.kitchen")) == {"a"}
+
+        index.subscribe("b", EntitySelector(entity_ids=frozenset({"light.kitchen"})))
+        index.subscribe("a", EntitySelector(domains=frozenset({"sensor"})))
+
+        assert set(index.subscribers("light.kitchen")) == {"b"}
+        index.unsubscribe("b")
+        assert set(index.subscribers("light.kitchen")) == set()
+        assert len(index) == 1
+
+    def test_registry_change_reresolves_areas(self, registry):
+        index = SubscriptionIndex[str](registry)
+        index.subscribe("bedroom", EntitySelector(area_ids=frozenset({"bedroom"})))
+        assert set(index.subscribers("light.porch")) == set()
+
+        porch = registry.entities["light.porch"]
+        index.set_registry(
+            Registry(
+                entities={**registry.entities, porch.id: replace(porch, area_id="bedroom")},
+                devices=registry.devices,
+                areas=registry.areas,
+                floors=registry.floors,
+            )
+        )
+
+        assert set(index.subscribers("light.porch")) == {"bedroom"}
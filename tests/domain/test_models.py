@@ -1,4 +1,17 @@
-from floorcast.domain.models import Area, Device, Entity, Floor, Registry
+from datetime import datetime, timezone
+
+import pytest
+
+from floorcast.domain.models import (
+    Area,
+    Device,
+    Entity,
+    Floor,
+    Registry,
+    TimelineCursor,
+    decode_snapshot_state,
+    encode_snapshot_state,
+)
 
 
 class TestEntity:
@@ -149,3 +162,24 @@ class TestRegistry:
             "areas": {},
             "floors": {},
         }
+
+
+class TestTimelineCursor:
+    def test_round_trip(self):
+        cursor = TimelineCursor(
+            timestamp=datetime(2026, 1, 1, 12, 30, 0, 123456, tzinfo=timezone.utc), id=42
+        )
+
+        assert TimelineCursor.decode(cursor.encode()) == cursor
+
+    @pytest.mark.parametrize("token", ["", "abc", "123", "123.", "1.2.3", "1.-2"])
+    def test_decode_invalid(self, token):
+        with pytest.raises(ValueError):
+            TimelineCursor.decode(token)
+
+
+@pytest.mark.parametrize("entities", [0, 1, 1000, 2500])
+def test_snapshot_state_round_trips_across_encode_slices(entities):
+    state = {f"sensor.s{i}": {"value": str(i), "unit": None} for i in range(entities)}
+
+    assert decode_snapshot_state(encode_snapshot_state(state)) == state
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+from floorcast.domain.models import SnapshotInfo
+from floorcast.domain.retention import (
+    SNAPSHOT_RETENTION_TIERS,
+    EventRetention,
+    RetentionTier,
+    months_to_archive,
+    snapshots_to_thin,
+)
+
+NOW = datetime(2026, 10, 18, tzinfo=timezone.utc)
+
+
+def every_five_minutes(start: datetime, count: int, events_apart: int = 10) -> list[SnapshotInfo]:
+    return [
+        SnapshotInfo(
+            id=i + 1,
+            last_event_id=(i + 1) * events_apart,
+            created_at=start + timedelta(minutes=5 * i),
+        )
+        for i in range(count)
+    ]
+
+
+def test_keeps_recent_snapshots():
+    snapshots = every_five_minutes(NOW - timedelta(days=1), 100)
+
+    assert snapshots_to_thin(snapshots, NOW, SNAPSHOT_RETENTION_TIERS, 10_000) == []
+
+
+def test_thins_to_one_per_tier_bucket():
+    hourly = every_five_minutes(datetime(2026, 10, 1, tzinfo=timezone.utc), 12 * 24)
+    daily = every_five_minutes(datetime(2026, 6, 1, tzinfo=timezone.utc), 12 * 48)
+    for i, snapshot in enumerate(daily):
+        daily[i] = SnapshotInfo(
+            id=snapshot.id + 1000,
+            last_event_id=snapshot.last_event_id,
+            created_at=snapshot.created_at,
+        )
+    recent = SnapshotInfo(id=5000, last_event_id=100_000, created_at=NOW - timedelta(hours=1))
+    snapshots = [*daily, *hourly, recent]
+
+    doomed = set(snapshots_to_thin(snapshots, NOW, SNAPSHOT_RETENTION_TIERS, 10_000_000))
+
+    kept = [s for s in snapshots if s.id not in doomed]
+    assert [s.created_at for s in kept] == [
+        datetime(2026, 6, 1, tzinfo=timezone.utc),
+        datetime(2026, 6, 2, tzinfo=timezone.utc),
+        *(datetime(2026, 10, 1, hour, tzinfo=timezone.utc) for hour in range(24)),
+        recent.created_at,
+    ]
+
+
+def test_always_keeps_newest_snapshot():
+    snapshots = every_five_minutes(NOW - timedelta(days=30), 3)
+
+    assert snapshots_to_thin(snapshots, NOW, SNAPSHOT_RETENTION_TIERS, 10_000) == [2]
+
+
+def test_keeps_snapshots_that_bound_replay():
+    tiers = [RetentionTier(after=timedelta(days=1), every=timedelta(days=1))]
+    snapshots = every_five_minutes(datetime(2026, 10, 1, tzinfo=timezone.utc), 12 * 24, 10)
+
+    doomed = set(snapshots_to_thin(snapshots, NOW, tiers, max_replay_events=100))
+
+    # Every tenth snapshot, 100 events apart, and the newest
+    kept = [s.last_event_id for s in snapshots if s.id not in doomed]
+    assert kept == [*range(10, 2880, 100), 2880]
+
+
+def test_bound_cannot_close_gaps_that_were_always_there():
+    tiers = [RetentionTier(after=timedelta(days=1), every=timedelta(days=1))]
+    snapshots = every_five_minutes(datetime(2026, 10, 1, tzinfo=timezone.utc), 4, 500)
+
+    assert snapshots_to_thin(snapshots, NOW, tiers, max_replay_events=100) == []
+
+
+def test_months_to_archive_start_at_earliest_event_and_stop_before_cutoff():
+    months = months_to_archive(None, datetime(2025, 11, 20, 13, tzinfo=timezone.utc), NOW)
+
+    assert [(start.date().isoformat(), end.date().isoformat()) for start, end in months] == [
+        ("2025-11-01", "2025-12-01"),
+        ("2025-12-01", "2026-01-01"),
+        *[(f"2026-{m:02}-01", f"2026-{m + 1:02}-01") for m in range(1, 10)],
+    ]
+
+
+def test_months_to_archive_carry_on_from_archive():
+    archived_until = datetime(2026, 9, 1, tzinfo=timezone.utc)
+
+    assert months_to_archive(archived_until, None, NOW) == [
+        (archived_until, datetime(2026, 10, 1, tzinfo=timezone.utc))
+    ]
+    assert months_to_archive(archived_until, None, datetime(2026, 9, 30, tzinfo=timezone.utc)) == []
+    assert months_to_archive(None, None, NOW) == []
+
+
+def test_rewrites_history_once_any_limit_is_set():
+    assert not EventRetention().rewrites_history
+    assert EventRetention(max_bytes=1024).rewrites_history
+    assert EventRetention(payload_for=timedelta(days=30)).rewrites_history
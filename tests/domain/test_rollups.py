@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+
+from floorcast.domain.models import CompactEvent
+from floorcast.domain.rollups import (
+    DAY,
+    HOUR,
+    MINUTE,
+    bucket_start,
+    choose_resolution,
+    parse_numeric,
+    rollup_events,
+)
+
+
+def make_event(id: int, timestamp: int, state: str | None, entity_id: str = "sensor.temp"):
+    return CompactEvent(id=id, entity_id=entity_id, timestamp=timestamp, state=state, unit="C")
+
+
+def test_parse_numeric():
+    assert parse_numeric("21.5") == 21.5
+    assert parse_numeric("on") is None
+    assert parse_numeric("nan") is None
+    assert parse_numeric(None) is None
+
+
+def test_bucket_start_aligns_to_resolution():
+    assert bucket_start(61_500, MINUTE) == 60_000
+    assert bucket_start(3_600_000 * 5 + 10, HOUR) == 3_600_000 * 5
+
+
+def test_rollup_events_aggregates_numeric_states():
+    events = [
+        make_event(1, 1_000, "20"),
+        make_event(2, 2_000, "unavailable"),
+        make_event(3, 3_000, "24"),
+    ]
+
+    buckets = {b.resolution: b for b in rollup_events(events)}
+
+    assert set(buckets) == {MINUTE, HOUR, DAY}
+    minute = buckets[MINUTE]
+    assert minute.count == 3
+    assert minute.numeric_count == 2
+    assert minute.min_value == 20
+    assert minute.max_value == 24
+    assert minute.mean == 22
+    assert minute.last_state == "24"
+    assert minute.last_event_id == 3
+
+
+def test_rollup_events_last_state_breaks_timestamp_ties_by_its_own_event_id():
+    events = [
+        make_event(5, 10, "a"),
+        make_event(9, 5, "late"),
+        make_event(7, 10, "b"),
+    ]
+
+    minute = next(b for b in rollup_events(events) if b.resolution == MINUTE)
+
+    assert minute.last_state == "b"
+    assert minute.last_event_id == 9
+
+
+def test_rollup_events_splits_buckets_per_entity_and_window():
+    events = [
+        make_event(1, 0, "on", entity_id="light.a"),
+        make_event(2, 0, "off", entity_id="light.b"),
+        make_event(3, 61_000, "off", entity_id="light.a"),
+    ]
+
+    minute_buckets = [b for b in rollup_events(events) if b.resolution == MINUTE]
+
+    assert {(b.entity_id, b.bucket_start) for b in minute_buckets} == {
+        ("light.a", 0),
+        ("light.b", 0),
+        ("light.a", 60_000),
+    }
+    assert all(b.mean is None for b in minute_buckets)
+
+
+def test_choose_resolution():
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    assert choose_resolution(start, start + timedelta(minutes=30), 1000) is None
+    assert choose_resolution(start, start + timedelta(days=7), 1000) == MINUTE
+    assert choose_resolution(start, start + timedelta(days=60), 1000) == HOUR
+    assert choose_resolution(start, start + timedelta(days=3650), 1000) == DAY
+    assert choose_resolution(start, start + timedelta(days=7), 0) is None
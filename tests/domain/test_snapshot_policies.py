@@ -1,9 +1,13 @@
 from datetime import datetime, timedelta, timezone
 
+import pytest
+
 from floorcast.domain.snapshot_policies import (
     ElapsedTimePolicy,
     EventCountPolicy,
     HybridSnapshotPolicy,
+    ReplayCostModel,
+    ReplayCostPolicy,
 )
 
 
@@ -49,3 +53,55 @@ class TestEventCountPolicy:
     def test_does_not_snapshot_if_under_max_events(self):
         policy = EventCountPolicy(max_events=10)
         assert not policy.should_snapshot(9, datetime.now(tz=timezone.utc))
+
+
+class TestReplayCostModel:
+    def test_first_observation_replaces_defaults(self):
+        model = ReplayCostModel(per_event_seconds=1e-3)
+        model.observe_replay(1000, load_seconds=0.05, replay_seconds=0.01)
+
+        assert model.per_event_seconds == pytest.approx(1e-5)
+        assert model.snapshot_load_seconds == pytest.approx(0.05)
+        assert model.predict(1000) == pytest.approx(0.06)
+
+    def test_later_observations_are_smoothed(self):
+        model = ReplayCostModel(smoothing=0.5)
+        model.observe_replay(1000, load_seconds=0.0, replay_seconds=0.01)
+        model.observe_replay(1000, load_seconds=0.0, replay_seconds=0.03)
+
+        assert model.per_event_seconds == pytest.approx(2e-5)
+
+    def test_small_replays_dont_move_per_event_cost(self):
+        model = ReplayCostModel(per_event_seconds=1e-5)
+        model.observe_replay(3, load_seconds=0.01, replay_seconds=0.01)
+
+        assert model.per_event_seconds == 1e-5
+
+
+class TestReplayCostPolicy:
+    def test_snapshots_once_replay_exceeds_budget(self):
+        policy = ReplayCostPolicy(0.1, ReplayCostModel(per_event_seconds=1e-4))
+        now = datetime.now(tz=timezone.utc)
+
+        assert not policy.should_snapshot(999, now)
+        assert policy.should_snapshot(1000, now)
+
+    def test_snapshot_load_time_counts_against_budget(self):
+        model = ReplayCostModel(per_event_seconds=1e-4)
+        model.observe_replay(0, load_seconds=0.06, replay_seconds=0.0)
+        policy = ReplayCostPolicy(0.1, model)
+        now = datetime.now(tz=timezone.utc)
+
+        assert not policy.should_snapshot(390, now)
+        assert policy.should_snapshot(410, now)
+
+    def test_never_snapshots_for_less_replay_than_a_write_costs(self):
+        model = ReplayCostModel(per_event_seconds=1e-4)
+        model.observe_replay(0, load_seconds=0.2, replay_seconds=0.0)
+        policy = ReplayCostPolicy(0.1, model)
+        policy.snapshot_taken(0.05)
+        now = datetime.now(tz=timezone.utc)
+
+        assert not policy.should_snapshot(490, now)
+        assert policy.should_snapshot(510, now)
+        assert policy.describe(500)["replay_allowance_seconds"] == pytest.approx(0.05)
@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from floorcast.domain.rollups import HOUR
+from floorcast.domain.tiles import progressive_slices, tile_bounds
+
+
+def test_tile_bounds_are_epoch_aligned_and_contiguous():
+    index = int(datetime(2026, 1, 1, 12, tzinfo=timezone.utc).timestamp()) // HOUR
+
+    start, end = tile_bounds(HOUR, index)
+    next_start, _ = tile_bounds(HOUR, index + 1)
+
+    assert start == datetime(2026, 1, 1, 12, tzinfo=timezone.utc)
+    assert end == datetime(2026, 1, 1, 13, tzinfo=timezone.utc)
+    assert next_start == end
+
+
+def test_progressive_slices_start_at_focus_and_cover_window():
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2026, 1, 1, 4, tzinfo=timezone.utc)
+    focus = datetime(2026, 1, 1, 2, 30, tzinfo=timezone.utc)
+
+    slices = progressive_slices(start, end, focus, 4)
+
+    assert [s.hour for s, _ in slices] == [2, 1, 3, 0]
+    assert sorted(slices) == [
+        (
+            datetime(2026, 1, 1, h, tzinfo=timezone.utc),
+            datetime(2026, 1, 1, h + 1, tzinfo=timezone.utc),
+        )
+        for h in range(4)
+    ]
+
+
+def test_progressive_slices_empty_window():
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    assert progressive_slices(start, start, start, 4) == []
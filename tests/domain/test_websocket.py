@@ -0,0 +1,196 @@
+import json
+
+import pytest
+
+from floorcast.domain.websocket import (
+    DISCONNECT,
+    RESYNC,
+    BatchOptions,
+    FrameBatcher,
+    OutboundQueue,
+    RecentFrames,
+    SlowConsumerPolicy,
+    WSFrame,
+    WSMessage,
+)
+
+
+def _frame(entity_id: str, state: str) -> WSFrame:
+    return WSFrame(text=f"{entity_id}={state}", key=entity_id)
+
+
+def _drain(queue: OutboundQueue) -> list:
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+def test_frame_encode_matches_serialized_message():
+    frame = WSFrame.encode(WSMessage(type="pong"), key="a.b")
+
+    assert frame.text == '{"type":"pong"}'
+    assert frame.key == "a.b"
+
+
+def test_coalesce_replaces_pending_update_for_same_entity():
+    queue = OutboundQueue(max_size=2, policy=SlowConsumerPolicy.COALESCE)
+    queue.put_nowait(_frame("a.a", "1"))
+    queue.put_nowait(_frame("b.b", "1"))
+
+    queue.put_nowait(_frame("a.a", "2"))
+
+    assert _drain(queue) == [_frame("a.a", "2"), _frame("b.b", "1")]
+    assert queue.stats()["dropped"] == 1
+
+
+def test_coalesce_falls_back_to_resync_for_new_entity():
+    queue = OutboundQueue(max_size=1, policy=SlowConsumerPolicy.COALESCE)
+    queue.put_nowait(_frame("a.a", "1"))
+
+    queue.put_nowait(_frame("b.b", "1"))
+
+    assert _drain(queue) == [RESYNC]
+
+
+def test_drained_is_set_when_items_leave_the_queue():
+    queue = OutboundQueue(max_size=2, policy=SlowConsumerPolicy.RESYNC)
+    queue.put_nowait(_frame("a.a", "1"))
+    queue.put_nowait(_frame("b.b", "1"))
+    assert not queue.drained.is_set()
+
+    queue.get_nowait()
+    assert queue.drained.is_set()
+
+    queue.drained.clear()
+    queue.put_nowait(_frame("c.c", "1"))
+    queue.put_nowait(_frame("d.d", "1"))
+    # Overflowing throws the pending live updates away
+    assert queue.drained.is_set()
+
+
+def test_resync_drops_live_updates_and_keeps_replies():
+    queue = OutboundQueue(max_size=2, policy=SlowConsumerPolicy.RESYNC)
+    reply = WSMessage(type="pong")
+    queue.put_nowait(_frame("a.a", "1"))
+    queue.put_nowait(reply)
+
+    queue.put_nowait(_frame("a.a", "2"))
+    # Suspended until the marker is sent
+    queue.put_nowait(_frame("a.a", "3"))
+
+    assert _drain(queue) == [reply, RESYNC]
+    queue.put_nowait(_frame("a.a", "4"))
+    assert _drain(queue) == [_frame("a.a", "4")]
+    assert queue.stats() == {
+        "depth": 0,
+        "high_water": 2,
+        "dropped": 3,
+        "resyncs": 1,
+        "policy": "resync",
+    }
+
+
+def test_disconnect_policy_queues_disconnect_and_stops_accepting_updates():
+    queue = OutboundQueue(max_size=1, policy=SlowConsumerPolicy.DISCONNECT)
+    queue.put_nowait(_frame("a.a", "1"))
+
+    queue.put_nowait(_frame("a.a", "2"))
+    queue.put_nowait(_frame("a.a", "3"))
+
+    assert queue.closing
+    assert _drain(queue) == [DISCONNECT]
+    queue.put_nowait(_frame("a.a", "4"))
+    assert queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_get_waits_for_items():
+    queue = OutboundQueue(max_size=1)
+    queue.put_nowait(_frame("a.a", "1"))
+
+    assert await queue.get() == _frame("a.a", "1")
+
+
+def test_pack_joins_encoded_frames():
+    frame = WSFrame.pack([WSFrame(text='{"a":1}'), WSFrame(text='{"b":2}')])
+
+    assert json.loads(frame.text) == {"type": "events", "events": [{"a": 1}, {"b": 2}]}
+
+
+def test_batch_options_validate_window():
+    assert BatchOptions.from_dict({"window_ms": 50}) == BatchOptions(window_ms=50)
+    with pytest.raises(ValueError):
+        BatchOptions.from_dict({"window_ms": 0})
+    with pytest.raises(ValueError):
+        BatchOptions.from_dict({"window_ms": 50, "max_rate": -1})
+
+
+def test_batcher_keeps_every_update_in_order():
+    batcher = FrameBatcher(BatchOptions(window_ms=50))
+    batcher.add(_frame("a.a", "1"))
+    batcher.add(_frame("b.b", "1"))
+    batcher.add(_frame("a.a", "2"))
+
+    frame = batcher.flush(now=0)
+
+    assert frame == WSFrame.pack([_frame("a.a", "1"), _frame("b.b", "1"), _frame("a.a", "2")])
+    assert len(batcher) == 0
+    assert batcher.flush(now=1) is None
+
+
+def test_batcher_latest_only_keeps_newest_per_entity():
+    batcher = FrameBatcher(BatchOptions(window_ms=50, latest_only=True))
+    batcher.add(_frame("a.a", "1"))
+    batcher.add(_frame("b.b", "1"))
+    batcher.add(_frame("a.a", "2"))
+
+    assert batcher.flush(now=0) == WSFrame.pack([_frame("b.b", "1"), _frame("a.a", "2")])
+    assert batcher.coalesced == 1
+
+
+def test_batcher_coalesces_once_over_limit():
+    batcher = FrameBatcher(BatchOptions(window_ms=50), limit=2)
+    for state in "123":
+        batcher.add(_frame("a.a", state))
+
+    assert len(batcher) == 1
+    assert batcher.flush(now=0) == WSFrame.pack([_frame("a.a", "3")])
+
+
+def test_batcher_rate_limit_holds_newest_update_for_later():
+    batcher = FrameBatcher(BatchOptions(window_ms=50, max_rate=1))
+    batcher.add(_frame("a.a", "1"))
+    assert batcher.flush(now=10.0) == WSFrame.pack([_frame("a.a", "1")])
+
+    batcher.add(_frame("a.a", "2"))
+    batcher.add(_frame("b.b", "1"))
+    batcher.add(_frame("a.a", "3"))
+
+    assert batcher.flush(now=10.5) == WSFrame.pack([_frame("b.b", "1")])
+    assert len(batcher) == 1
+    assert batcher.flush(now=11.0) == WSFrame.pack([_frame("a.a", "3")])
+
+
+def test_recent_frames_replays_events_after_last_seen_id():
+    recent = RecentFrames(max_size=3)
+    for event_id in (5, 6, 7):
+        recent.append(event_id, _frame("a.a", str(event_id)))
+
+    assert recent.since(5) == [(6, _frame("a.a", "6")), (7, _frame("a.a", "7"))]
+    assert recent.since(7) == []
+    # Replayable from just before the first buffered event; nothing earlier or later is known
+    assert [event_id for event_id, _ in recent.since(4)] == [5, 6, 7]
+    assert recent.since(3) is None
+    assert recent.since(8) is None
+
+
+def test_recent_frames_gap_falls_out_of_the_buffer():
+    recent = RecentFrames(max_size=2)
+    for event_id in (1, 2, 3):
+        recent.append(event_id, _frame("a.a", str(event_id)))
+    recent.append(3, _frame("a.a", "duplicate"))
+
+    assert recent.since(0) is None
+    assert recent.since(1) == [(2, _frame("a.a", "2")), (3, _frame("a.a", "3"))]
+    assert len(recent) == 2
@@ -12,11 +12,26 @@ def test_defaults():
         config = Config(_env_file=None)
 
     assert config.snapshot_interval_seconds == 300
+    assert config.snapshot_policy == "elapsed"
+    assert config.snapshot_latency_budget_ms == 250
+    assert config.snapshot_retention_max_replay_events == 20_000
+    assert config.retention_interval_seconds == 3600
+    assert config.event_payload_retention_days is None
+    assert config.event_retention_days is None
+    assert config.db_max_bytes is None
     assert config.ha_websocket_url == "ws://homeassistant.local:8123/api/websocket"
     assert config.db_uri == "floorcast.db"
+    assert config.event_partitions is False
     assert config.entity_blocklist == ["update.*"]
     assert config.log_level == "INFO"
     assert config.log_to_console is False
+    assert config.response_cache_max_bytes == 64 * 1024 * 1024
+    assert config.backup_interval_seconds is None
+    assert config.admin_token is None
+    assert config.ws_queue_max_size == 1000
+    assert config.ws_slow_consumer_policy == "coalesce"
+    assert config.api_workers == 0
+    assert config.ipc_socket_path == "floorcast.sock"
 
 
 def test_ha_websocket_token_required():
@@ -1,7 +1,12 @@
 import aiosqlite
 import pytest
 
-from floorcast.infrastructure.db import connect_db
+from floorcast.infrastructure.db import (
+    DB_COMMIT_ROWS,
+    DB_STATEMENT_SECONDS,
+    connect_db,
+    statement_label,
+)
 
 
 @pytest.mark.asyncio
@@ -9,3 +14,49 @@ async def test_connect_db():
     async with connect_db(":memory:") as db_conn:
         assert isinstance(db_conn, aiosqlite.Connection)
         assert db_conn.row_factory == aiosqlite.Row
+
+
+@pytest.mark.asyncio
+async def test_connect_db_uses_wal(tmp_path):
+    async with connect_db(str(tmp_path / "floorcast.db")) as db_conn:
+        cursor = await db_conn.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0] == "wal"
+
+
+@pytest.mark.parametrize(
+    "sql, label",
+    [
+        ("SELECT * FROM events WHERE id = ?", "SELECT events"),
+        ("\n  INSERT OR REPLACE INTO rollups (bucket) VALUES (?)", "INSERT rollups"),
+        ("UPDATE events SET data = NULL", "UPDATE events"),
+        ("CREATE TABLE IF NOT EXISTS segments (x)", "CREATE segments"),
+        ("PRAGMA journal_mode=WAL", "PRAGMA journal_mode"),
+        ("BEGIN", "BEGIN"),
+    ],
+)
+def test_statement_label(sql, label):
+    assert statement_label(sql) == label
+
+
+@pytest.mark.asyncio
+async def test_connect_db_records_statements_and_commits():
+    inserts = DB_STATEMENT_SECONDS.labels("INSERT t")
+    commits = DB_COMMIT_ROWS.labels()
+    inserted_before, committed_before = sum(inserts.counts), commits.sum
+
+    async with connect_db(":memory:") as db_conn:
+        await db_conn.execute("CREATE TABLE t (x)")
+        await db_conn.executemany("INSERT INTO t VALUES (?)", [(i,) for i in range(5)])
+        await db_conn.commit()
+
+    assert sum(inserts.counts) == inserted_before + 1
+    assert commits.sum == committed_before + 5
+
+
+@pytest.mark.asyncio
+async def test_instrumented_execute_still_works_as_a_context_manager():
+    async with connect_db(":memory:") as db_conn:
+        await db_conn.execute("CREATE TABLE t (x)")
+        async with db_conn.execute("INSERT INTO t VALUES (1)") as cursor:
+            assert cursor.rowcount == 1
+        assert list(await db_conn.execute_fetchall("SELECT x FROM t"))[0][0] == 1
@@ -1,3 +1,4 @@
+import asyncio
 from dataclasses import dataclass
 from typing import Protocol
 from unittest import mock
@@ -79,3 +80,105 @@ async def test_typed_bus_unsubscribe_is_idempotent(event_bus: TypedEventBus[Mock
     event_bus.publish(event)
     await event_bus.wait_all()
     mocked_callback.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_ordered_subscriber_sees_events_one_at_a_time_in_order(
+    event_bus: TypedEventBus[MockEvent],
+):
+    received = []
+    running = 0
+
+    async def callback(event: MockEventSub) -> None:
+        nonlocal running
+        running += 1
+        assert running == 1
+        await asyncio.sleep(0)
+        received.append(event.name)
+        running -= 1
+
+    event_bus.subscribe(MockEventSub, callback, ordered=True)
+    for i in range(5):
+        event_bus.publish(MockEventSub(name=str(i)))
+    await event_bus.wait_all()
+
+    assert received == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.asyncio
+async def test_batched_subscriber_takes_everything_pending(event_bus: TypedEventBus[MockEvent]):
+    batches = []
+
+    async def callback(events: list[MockEventSub]) -> None:
+        batches.append([event.name for event in events])
+
+    event_bus.subscribe_batches(MockEventSub, callback, max_batch=2)
+    for i in range(5):
+        event_bus.publish(MockEventSub(name=str(i)))
+    await event_bus.wait_all()
+
+    assert batches == [["0", "1"], ["2", "3"], ["4"]]
+
+
+@pytest.mark.asyncio
+async def test_ordered_subscriber_survives_a_failing_event(event_bus: TypedEventBus[MockEvent]):
+    callback = mock.AsyncMock(side_effect=[ValueError("boom"), None])
+    event_bus.subscribe(MockEventSub, callback, ordered=True)
+
+    event_bus.publish(MockEventSub(name="bad"))
+    event_bus.publish(MockEventSub(name="good"))
+    await event_bus.wait_all()
+
+    assert callback.await_args_list[-1].args == (MockEventSub(name="good"),)
+
+
+@pytest.mark.asyncio
+async def test_ordered_subscriber_drops_events_past_max_pending(
+    event_bus: TypedEventBus[MockEvent],
+):
+    callback = mock.AsyncMock()
+    event_bus.subscribe(MockEventSub, callback, ordered=True, max_pending=2)
+
+    for i in range(3):
+        event_bus.publish(MockEventSub(name=str(i)))
+    await event_bus.wait_all()
+
+    assert [c.args[0].name for c in callback.await_args_list] == ["0", "1"]
+
+
+@pytest.mark.asyncio
+async def test_ordered_subscriber_keeps_every_event_by_default(
+    event_bus: TypedEventBus[MockEvent],
+):
+    release = asyncio.Event()
+    received = []
+
+    async def callback(event):
+        await release.wait()
+        received.append(event.name)
+
+    event_bus.subscribe(MockEventSub, callback, ordered=True)
+    batches = mock.AsyncMock()
+    event_bus.subscribe_batches(MockEventSub, batches)
+
+    # Far more than used to fit, all published while the subscriber is stuck on the first
+    for i in range(20_000):
+        event_bus.publish(MockEventSub(name=str(i)))
+    await asyncio.sleep(0)
+    release.set()
+    await event_bus.wait_all()
+
+    assert received == [str(i) for i in range(20_000)]
+    assert sum(len(c.args[0]) for c in batches.await_args_list) == 20_000
+
+
+@pytest.mark.asyncio
+async def test_ordered_unsubscribe(event_bus: TypedEventBus[MockEvent]):
+    callback = mock.AsyncMock()
+    unsubscribe = event_bus.subscribe(MockEventSub, callback, ordered=True)
+
+    unsubscribe()
+    event_bus.publish(MockEventSub(name="test"))
+    await event_bus.wait_all()
+
+    callback.assert_not_called()
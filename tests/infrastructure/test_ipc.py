@@ -0,0 +1,194 @@
+import asyncio
+import os
+import stat
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import pytest
+
+from floorcast.domain.events import EntityStateChanged, RegistryUpdated
+from floorcast.domain.models import Area, Entity, Event, Registry
+from floorcast.infrastructure.event_bus import TypedEventBus
+from floorcast.infrastructure.ipc import EventBroadcaster, EventRelay, _decode, _encode
+
+
+@dataclass(kw_only=True, frozen=True)
+class Changed:
+    value: int
+
+
+@dataclass(kw_only=True, frozen=True)
+class Configured:
+    name: str
+
+
+@dataclass(kw_only=True, frozen=True)
+class Private:
+    secret: str
+
+
+async def _receive(queue: asyncio.Queue, count: int) -> list:
+    return [await asyncio.wait_for(queue.get(), timeout=2) for _ in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_relay_republishes_events_on_local_bus(tmp_path):
+    path = str(tmp_path / "events.sock")
+    source, local = TypedEventBus(), TypedEventBus()
+    received: asyncio.Queue = asyncio.Queue()
+
+    async def collect(event):
+        received.put_nowait(event)
+
+    local.subscribe(Changed, collect)
+    local.subscribe(Configured, collect)
+    local.subscribe(Private, collect)
+
+    async with EventBroadcaster(
+        source, path, event_types=(Changed, Configured), latest=(Configured,)
+    ) as broadcaster:
+        source.publish(Configured(name="old"))
+        source.publish(Configured(name="new"))
+        await source.wait_all()
+        relay = asyncio.create_task(
+            EventRelay(local, path, event_types=(Changed, Configured, Private)).run()
+        )
+        try:
+            # A late joiner gets the latest of each `latest` type first
+            assert await _receive(received, 1) == [Configured(name="new")]
+            while broadcaster.peers == 0:
+                await asyncio.sleep(0.01)
+
+            for value in range(3):
+                source.publish(Changed(value=value))
+            source.publish(Private(secret="stays here"))
+            await source.wait_all()
+
+            assert await _receive(received, 3) == [Changed(value=v) for v in range(3)]
+            await asyncio.sleep(0.05)
+            assert received.empty()
+        finally:
+            relay.cancel()
+
+
+@pytest.mark.asyncio
+async def test_lagging_peer_is_disconnected(tmp_path):
+    path = str(tmp_path / "events.sock")
+    source = TypedEventBus()
+
+    async with EventBroadcaster(source, path, event_types=(Changed,), max_pending=2) as broadcaster:
+        reader, writer = await asyncio.open_unix_connection(path)
+        while broadcaster.peers == 0:
+            await asyncio.sleep(0.01)
+
+        # Nothing runs the broadcaster's writer in between, so the peer falls behind
+        for value in range(3):
+            await broadcaster._forward(Changed(value=value))
+
+        assert broadcaster.peers == 0
+        assert await asyncio.wait_for(reader.read(), timeout=2) == b""
+        writer.close()
+
+
+@pytest.mark.asyncio
+async def test_socket_is_only_reachable_by_its_owner(tmp_path):
+    path = str(tmp_path / "events.sock")
+
+    async with EventBroadcaster(TypedEventBus(), path, event_types=(Changed,)):
+        mode = os.stat(path).st_mode
+
+    assert stat.S_ISSOCK(mode)
+    assert stat.S_IMODE(mode) & 0o077 == 0
+
+
+def test_domain_events_survive_the_trip():
+    event = Event(
+        id=7,
+        domain="light",
+        entity_id="light.kitchen",
+        event_id=uuid.uuid4(),
+        event_type="state_changed",
+        external_id="abc",
+        state="on",
+        timestamp=datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+        data={"brightness": 255, "rgb": [1, 2, 3]},
+        metadata={"source": "ha"},
+    )
+    registry = Registry(
+        entities={
+            "light.kitchen": Entity(
+                id="light.kitchen",
+                device_id="d1",
+                domain="light",
+                display_name="Kitchen",
+                area_id=None,
+                entity_category=None,
+            )
+        },
+        devices={},
+        areas={"kitchen": Area(id="kitchen", display_name="Kitchen", floor_id=None)},
+        floors={},
+    )
+    event_types = {"EntityStateChanged": EntityStateChanged, "RegistryUpdated": RegistryUpdated}
+
+    for sent in (
+        EntityStateChanged(entity_id="light.kitchen", state="on", event=event),
+        RegistryUpdated(registry=registry),
+    ):
+        assert _decode(_encode(sent), event_types) == sent
+
+
+@pytest.mark.asyncio
+async def test_relay_drops_events_it_was_not_given(tmp_path):
+    path = str(tmp_path / "events.sock")
+    source, local = TypedEventBus(), TypedEventBus()
+    received: asyncio.Queue = asyncio.Queue()
+
+    async def collect(event):
+        received.put_nowait(event)
+
+    local.subscribe(Changed, collect)
+
+    async with EventBroadcaster(source, path, event_types=(Private, Changed)) as broadcaster:
+        relay = asyncio.create_task(EventRelay(local, path, event_types=(Changed,)).run())
+        try:
+            while broadcaster.peers == 0:
+                await asyncio.sleep(0.01)
+            source.publish(Private(secret="not for this relay"))
+            source.publish(Changed(value=1))
+            await source.wait_all()
+
+            # The unknown frame is skipped without dropping the connection
+            assert await _receive(received, 1) == [Changed(value=1)]
+            assert broadcaster.peers == 1
+        finally:
+            relay.cancel()
+
+
+@pytest.mark.asyncio
+async def test_relay_sends_its_events_back(tmp_path):
+    path = str(tmp_path / "events.sock")
+    source, local = TypedEventBus(), TypedEventBus()
+    received: asyncio.Queue = asyncio.Queue()
+
+    async def collect(event):
+        received.put_nowait(event)
+
+    source.subscribe(Changed, collect)
+    source.subscribe(Private, collect)
+
+    async with EventBroadcaster(
+        source, path, event_types=(Configured,), receive=(Changed,)
+    ) as broadcaster:
+        relay = EventRelay(local, path, event_types=(Configured,), send=(Changed, Private))
+        running = asyncio.create_task(relay.run())
+        try:
+            while broadcaster.peers == 0 or relay._writer is None:
+                await asyncio.sleep(0.01)
+            local.publish(Private(secret="the broadcaster doesn't take these"))
+            local.publish(Changed(value=1))
+
+            assert await _receive(received, 1) == [Changed(value=1)]
+        finally:
+            running.cancel()
@@ -0,0 +1,38 @@
+import json
+import os
+
+from floorcast.common.metrics import Counter, Registry
+from floorcast.infrastructure.metrics import ProcessMetrics
+
+
+def test_serves_the_totals_of_every_process(tmp_path):
+    registry = Registry()
+    Counter("events_total", "Events", registry=registry).inc(2)
+    other = Registry()
+    Counter("events_total", "Events", registry=other).inc(5)
+    (tmp_path / "1.json").write_text(json.dumps(other.export()))
+    metrics = ProcessMetrics(str(tmp_path), registry=registry)
+
+    metrics.write()
+
+    # This process's own file is left out, in favour of its live registry
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+    assert "events_total 7" in metrics.render().splitlines()
+
+
+def test_clear_removes_earlier_runs(tmp_path):
+    (tmp_path / "1.json").write_text("{}")
+
+    ProcessMetrics(str(tmp_path), registry=Registry()).clear()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_without_a_directory_serves_only_this_process(tmp_path):
+    registry = Registry()
+    Counter("events_total", "Events", registry=registry).inc()
+    metrics = ProcessMetrics(registry=registry)
+
+    metrics.write()
+
+    assert "events_total 1" in metrics.render().splitlines()
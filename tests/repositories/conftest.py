@@ -22,10 +22,11 @@ async def conn():
             unit TEXT,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP
         );
-        CREATE INDEX ix_events_domain ON events(domain);
-        CREATE INDEX ix_events_entity_id ON events(entity_id);
         CREATE INDEX ix_events_timestamp ON events(timestamp);
         CREATE INDEX ix_events_type ON events(event_type);
+        CREATE INDEX ix_events_timestamp_id ON events(timestamp, id);
+        CREATE INDEX ix_events_entity_id_timestamp ON events(entity_id, timestamp, id);
+        CREATE INDEX ix_events_domain_timestamp ON events(domain, timestamp, id);
 
         CREATE TABLE snapshots (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -35,6 +36,23 @@ async def conn():
         );
         CREATE INDEX ix_snapshots_created_at ON snapshots(created_at);
         CREATE INDEX ix_snapshots_last_event_id ON snapshots(last_event_id);
+
+        CREATE TABLE rollups (
+            resolution INTEGER NOT NULL,
+            bucket_start INTEGER NOT NULL,
+            entity_id TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            numeric_count INTEGER NOT NULL DEFAULT 0,
+            min_value REAL,
+            max_value REAL,
+            sum_value REAL NOT NULL DEFAULT 0,
+            last_state TEXT,
+            last_unit TEXT,
+            last_timestamp INTEGER NOT NULL,
+            last_event_id INTEGER NOT NULL,
+            PRIMARY KEY (resolution, bucket_start, entity_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX ix_rollups_last_event_id ON rollups(last_event_id);
     """)
 
     yield conn
@@ -0,0 +1,183 @@
+import uuid
+from dataclasses import replace
+from datetime import datetime, timezone
+
+import pytest
+
+from floorcast.domain.models import Event
+from floorcast.infrastructure.db import connect_db
+from floorcast.repositories import segments
+from floorcast.repositories.archive import ArchivedEventRepository
+from floorcast.repositories.event import EventRepository
+from floorcast.repositories.partitioned_event import PARTITION_SCHEMA
+
+AUGUST = datetime(2026, 8, 1, tzinfo=timezone.utc)
+SEPTEMBER = datetime(2026, 9, 1, tzinfo=timezone.utc)
+OCTOBER = datetime(2026, 10, 1, tzinfo=timezone.utc)
+NOVEMBER = datetime(2026, 11, 1, tzinfo=timezone.utc)
+
+
+def at(month: int, day: int, hour: int = 0) -> datetime:
+    return datetime(2026, month, day, hour, tzinfo=timezone.utc)
+
+
+def make_event(timestamp: datetime, **overrides) -> Event:
+    defaults = {
+        "domain": "sensor",
+        "entity_id": "sensor.temp",
+        "event_id": uuid.uuid4(),
+        "event_type": "state_changed",
+        "external_id": str(uuid.uuid4()),
+        "state": "21",
+        "timestamp": timestamp,
+        "data": {"raw": True},
+    }
+    return Event(**{**defaults, **overrides})
+
+
+@pytest.fixture
+async def conn(tmp_path):
+    async with connect_db(str(tmp_path / "floorcast.db")) as conn:
+        await conn.executescript(PARTITION_SCHEMA)
+        yield conn
+
+
+@pytest.fixture
+async def repo(tmp_path, conn):
+    async with ArchivedEventRepository(
+        EventRepository(conn), str(tmp_path / "floorcast.db"), batch_size=2, rescan_seconds=0
+    ) as repo:
+        yield repo
+
+
+@pytest.fixture
+async def events(repo):
+    timestamps = [at(8, 5), at(8, 20), at(8, 20), at(9, 1), at(9, 2, 12), at(10, 1), at(10, 3)]
+    return [await repo.create(make_event(timestamp)) for timestamp in timestamps]
+
+
+async def archive_month(repo, start: datetime, end: datetime) -> int:
+    archived = await repo.archive(start, end)
+    while await repo.purge_archived(2):
+        pass
+    return archived
+
+
+async def database_ids(conn) -> list[int]:
+    rows = await conn.execute_fetchall("SELECT id FROM events ORDER BY id")
+    return [row[0] for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_archives_a_month_into_a_segment(tmp_path, conn, repo, events):
+    before = await repo.get_timeline_between(AUGUST, NOVEMBER, include_start=True)
+
+    assert await archive_month(repo, AUGUST, SEPTEMBER) == 3
+    assert await archive_month(repo, SEPTEMBER, OCTOBER) == 2
+
+    assert sorted(path.name for path in (tmp_path / "floorcast.archive").iterdir()) == [
+        "events-20260801-20260901.seg",
+        "events-20260901-20261001.seg",
+    ]
+    assert await database_ids(conn) == [6, 7]
+    assert await repo.archived_until() == OCTOBER
+    assert await repo.get_timeline_between(AUGUST, NOVEMBER, include_start=True) == before
+    assert await repo.get_earliest_timestamp() == at(8, 5)
+    assert await repo.get_latest_timestamp() == at(10, 3)
+
+
+@pytest.mark.asyncio
+async def test_reads_span_segments_and_database(repo, events):
+    await archive_month(repo, AUGUST, SEPTEMBER)
+
+    chunks = [
+        [event.id for event in chunk]
+        async for chunk, _ in repo.iter_timeline_between(at(8, 5), NOVEMBER, chunk_size=2)
+    ]
+    assert chunks == [[2, 3], [4, 5], [6, 7]]
+    replayed = await repo.get_between_id_and_timestamp(at(8, 19), at(10, 2))
+    assert [e.id for e in replayed] == [2, 3, 4, 5, 6]
+    assert [e.id for e in await repo.get_timeline_after_id(1, 4)] == [2, 3, 4, 5]
+    # Archived events keep everything but their payload
+    assert await repo.get_by_id(2) == replace(events[1], data={})
+    assert (await repo.get_by_id(4)).data == {"raw": True}
+
+
+@pytest.mark.asyncio
+async def test_archiving_resumes_after_a_crash_before_purging(tmp_path, conn, repo, events):
+    await repo.archive(AUGUST, SEPTEMBER)
+
+    # The rows are still in the database, but only read once, from the segment
+    assert await database_ids(conn) == [1, 2, 3, 4, 5, 6, 7]
+    assert [e.id for e in await repo.get_timeline_between(AUGUST, OCTOBER)] == [1, 2, 3, 4, 5]
+    assert [e.id for e in await repo.get_timeline_after_id(0, 10)] == [1, 2, 3, 4, 5, 6, 7]
+
+    assert await archive_month(repo, AUGUST, SEPTEMBER) == 3
+    assert await database_ids(conn) == [4, 5, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_late_events_for_archived_months_are_hidden_then_purged(conn, repo, events):
+    await archive_month(repo, AUGUST, SEPTEMBER)
+    await repo.create(make_event(at(8, 25)))
+
+    assert [e.id for e in await repo.get_timeline_between(AUGUST, SEPTEMBER)] == [1, 2, 3]
+    assert await repo.purge_archived(10) == 1
+    assert await database_ids(conn) == [4, 5, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_late_events_are_hidden_from_every_read_across_the_archive(repo, events):
+    await archive_month(repo, AUGUST, SEPTEMBER)
+    await archive_month(repo, SEPTEMBER, OCTOBER)
+    late = [await repo.create(make_event(at(month, 25))) for month in (8, 9)]
+    ids = [e.id for e in events]
+
+    assert [e.id for e in await repo.get_timeline_between(AUGUST, NOVEMBER)] == ids
+    assert [e.id for e in await repo.get_timeline_after_id(0, 100)] == ids
+    page = await repo.get_timeline_page(AUGUST, NOVEMBER, None, 100)
+    assert [e.id for _, e in page] == ids
+    assert [await repo.get_by_id(event.id) for event in late] == [None, None]
+    # Outside the archive the database's rows are returned as they are
+    assert [e.id for e in await repo.get_timeline_between(OCTOBER, NOVEMBER)] == ids[6:]
+
+
+@pytest.mark.asyncio
+async def test_range_starting_on_a_block_boundary_keeps_rows_of_the_block_before(monkeypatch, repo):
+    monkeypatch.setattr(segments, "BLOCK_SIZE", 4)
+    # Blocks of ids [1-4], [5-8], [9, 10]: the second starts at the time event 4 has
+    timestamps = [at(8, 5)] * 3 + [at(8, 6)] * 4 + [at(8, 7)] * 3
+    created = [await repo.create(make_event(timestamp)) for timestamp in timestamps]
+    await archive_month(repo, AUGUST, SEPTEMBER)
+
+    timeline = await repo.get_timeline_between(at(8, 6), SEPTEMBER, include_start=True)
+    assert [e.id for e in timeline] == [e.id for e in created[3:]]
+    timeline = await repo.get_timeline_between(at(8, 6), SEPTEMBER)
+    assert [e.id for e in timeline] == [e.id for e in created[7:]]
+
+
+@pytest.mark.asyncio
+async def test_deleting_old_events_retires_whole_segments(tmp_path, conn, repo, events):
+    await archive_month(repo, AUGUST, SEPTEMBER)
+    await archive_month(repo, SEPTEMBER, OCTOBER)
+
+    assert await repo.delete_before_id(5, limit=100) == 3
+    # Still holds event 5, so it stays; the database has nothing before it left either
+    assert await repo.delete_before_id(5, limit=100) == 0
+    assert [path.name for path in (tmp_path / "floorcast.archive").iterdir()] == [
+        "events-20260901-20261001.seg"
+    ]
+    assert [e.id for e in await repo.get_timeline_between(AUGUST, NOVEMBER)] == [4, 5, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_readers_pick_up_segments_written_elsewhere(tmp_path, conn, repo, events):
+    async with ArchivedEventRepository(
+        EventRepository(conn), str(tmp_path / "floorcast.db"), rescan_seconds=0
+    ) as reader:
+        assert await reader.archived_until() is None
+
+        await archive_month(repo, AUGUST, SEPTEMBER)
+
+        assert await reader.archived_until() == SEPTEMBER
+        assert [e.id for e in await reader.get_timeline_between(AUGUST, SEPTEMBER)] == [1, 2, 3]
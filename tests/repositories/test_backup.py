@@ -0,0 +1,118 @@
+import asyncio
+import fcntl
+import gzip
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from floorcast.domain.models import BackupProgress
+from floorcast.infrastructure.db import connect_db
+from floorcast.repositories.backup import BackupRepository
+
+
+def make_progress(name: str) -> BackupProgress:
+    return BackupProgress(name=name, started_at=datetime.now(timezone.utc))
+
+
+@pytest.fixture
+async def conn(tmp_path):
+    async with connect_db(str(tmp_path / "floorcast.db")) as conn:
+        await conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, data TEXT)")
+        await conn.executemany(
+            "INSERT INTO events (data) VALUES (?)", [("x" * 500,) for _ in range(2000)]
+        )
+        await conn.commit()
+        yield conn
+
+
+def count_rows(path) -> int:
+    with sqlite3.connect(path) as copy:
+        return copy.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+
+@pytest.mark.asyncio
+async def test_backs_up_a_consistent_snapshot_while_writes_go_on(tmp_path, conn):
+    repo = BackupRepository(
+        str(tmp_path / "floorcast.db"), str(tmp_path / "backups"), compress=False, pages_per_step=8
+    )
+    progress = make_progress("1")
+
+    async def write() -> None:
+        while progress.pages_copied < progress.pages_total or not progress.pages_total:
+            await conn.execute("INSERT INTO events (data) VALUES ('late')")
+            await conn.commit()
+            await asyncio.sleep(0)
+
+    writer = asyncio.create_task(write())
+    assert await repo.create("1", progress)
+    await writer
+
+    copy = tmp_path / "backups" / "1" / "floorcast.db"
+    # The snapshot from when the backup started, with none of the later writes
+    assert count_rows(copy) == 2000
+    assert progress.pages_copied == progress.pages_total > 100
+    assert progress.bytes == copy.stat().st_size
+
+
+@pytest.mark.asyncio
+async def test_sleeps_between_steps(tmp_path, conn):
+    repo = BackupRepository(
+        str(tmp_path / "floorcast.db"),
+        str(tmp_path / "backups"),
+        compress=False,
+        pages_per_step=64,
+        step_sleep=0.02,
+    )
+    progress = make_progress("1")
+
+    started = time.monotonic()
+    assert await repo.create("1", progress)
+
+    steps = -(-progress.pages_total // 64)
+    assert steps > 3
+    # No sleep after the last step
+    assert time.monotonic() - started >= 0.02 * (steps - 1)
+
+
+@pytest.mark.asyncio
+async def test_includes_partitions_and_archive_compressed(tmp_path, conn):
+    with sqlite3.connect(tmp_path / "floorcast.events-2026-10.db") as partition:
+        partition.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, data TEXT)")
+        partition.execute("INSERT INTO events (data) VALUES ('october')")
+    (tmp_path / "floorcast.archive").mkdir()
+    (tmp_path / "floorcast.archive" / "events-20260801-20260901.seg").write_bytes(b"segment")
+    repo = BackupRepository(str(tmp_path / "floorcast.db"), str(tmp_path / "backups"))
+
+    assert await repo.create("1", make_progress("1"))
+
+    backup = tmp_path / "backups" / "1"
+    assert sorted(str(path.relative_to(backup)) for path in backup.rglob("*")) == [
+        "floorcast.archive",
+        "floorcast.archive/events-20260801-20260901.seg",
+        "floorcast.db.gz",
+        "floorcast.events-2026-10.db.gz",
+    ]
+    restored = tmp_path / "restored.db"
+    restored.write_bytes(gzip.decompress((backup / "floorcast.db.gz").read_bytes()))
+    assert count_rows(restored) == 2000
+
+
+@pytest.mark.asyncio
+async def test_one_backup_at_a_time_across_processes(tmp_path, conn):
+    repo = BackupRepository(str(tmp_path / "floorcast.db"), str(tmp_path / "backups"))
+    (tmp_path / "backups").mkdir()
+    (tmp_path / "backups" / "0.partial").mkdir()
+
+    with open(tmp_path / "backups" / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert not await repo.create("1", make_progress("1"))
+
+    assert await repo.create("2", make_progress("2"))
+    assert await repo.create("3", make_progress("3"))
+    # What an interrupted backup left behind is cleared away
+    assert await repo.names() == ["2", "3"]
+
+    await repo.delete("2")
+    assert await repo.names() == ["3"]
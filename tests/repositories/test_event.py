@@ -1,10 +1,13 @@
+import sqlite3
 import uuid
 from datetime import datetime, timezone
 
 import pytest
 
+from floorcast.domain.event_filtering import TimelineFilter
 from floorcast.domain.models import Event
 from floorcast.repositories.event import EventRepository
+from floorcast.repositories.maintenance import MaintenanceRepository
 
 
 @pytest.fixture
@@ -84,3 +87,162 @@ async def test_create_duplicate_external_id_returns_original_event(repo):
     assert res0.id == 1
     assert res1.id == 2
     assert res2.id == 1
+
+
+@pytest.mark.asyncio
+async def test_get_timeline_after_id(repo):
+    created = [await repo.create(make_event(state=str(i))) for i in range(5)]
+
+    results = await repo.get_timeline_after_id(created[1].id, limit=2)
+
+    assert [e.id for e in results] == [created[2].id, created[3].id]
+    assert results[0].state == "2"
+    assert results[0].timestamp == int(created[2].timestamp.timestamp() * 1000)
+
+
+@pytest.mark.asyncio
+async def test_iter_timeline_between_chunks_and_resumes(repo):
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    created = [
+        await repo.create(make_event(timestamp=base.replace(microsecond=i % 2), state=str(i)))
+        for i in range(5)
+    ]
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2027, 1, 1, tzinfo=timezone.utc)
+
+    chunks = [chunk async for chunk in repo.iter_timeline_between(start, end, chunk_size=2)]
+    assert [len(events) for events, _ in chunks] == [2, 2, 1]
+    ordered = [e.id for events, _ in chunks for e in events]
+    assert ordered == [created[i].id for i in (0, 2, 4, 1, 3)]
+
+    _, cursor = chunks[0]
+    resumed = [
+        e.id
+        async for events, _ in repo.iter_timeline_between(start, end, after=cursor, limit=2)
+        for e in events
+    ]
+    assert resumed == ordered[2:4]
+
+
+@pytest.mark.asyncio
+async def test_get_latest_timestamp(repo):
+    assert await repo.get_latest_timestamp() is None
+
+    latest = datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+    await repo.create(make_event(timestamp=latest))
+    await repo.create(make_event(timestamp=datetime(2025, 1, 1, tzinfo=timezone.utc)))
+
+    assert await repo.get_latest_timestamp() == latest
+
+
+@pytest.mark.asyncio
+async def test_get_timeline_between_include_start(repo):
+    boundary = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    created = await repo.create(make_event(timestamp=boundary))
+    end = datetime(2026, 1, 2, tzinfo=timezone.utc)
+
+    assert await repo.get_timeline_between(boundary, end) == []
+    [event] = await repo.get_timeline_between(boundary, end, include_start=True)
+    assert event.id == created.id
+
+
+@pytest.mark.asyncio
+async def test_get_timeline_between_with_filter(repo):
+    await repo.create(make_event(entity_id="light.kitchen", domain="light"))
+    await repo.create(make_event(entity_id="light.porch", domain="light"))
+    await repo.create(make_event(entity_id="sensor.temp", domain="sensor"))
+    start = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2099, 1, 1, tzinfo=timezone.utc)
+
+    by_entity = await repo.get_timeline_between(
+        start, end, timeline_filter=TimelineFilter(entity_ids=frozenset({"light.porch"}))
+    )
+    by_domain = await repo.get_timeline_between(
+        start, end, timeline_filter=TimelineFilter(domains=frozenset({"light"}))
+    )
+
+    assert [e.entity_id for e in by_entity] == ["light.porch"]
+    assert {e.entity_id for e in by_domain} == {"light.kitchen", "light.porch"}
+
+
+@pytest.mark.asyncio
+async def test_get_ids_before(repo):
+    assert await repo.get_ids_before(datetime(2025, 1, 1, tzinfo=timezone.utc)) == range(0)
+    created = [
+        await repo.create(make_event(timestamp=datetime(2025, 1, day, tzinfo=timezone.utc)))
+        for day in (1, 2, 3)
+    ]
+
+    ids = await repo.get_ids_before(datetime(2025, 1, 2, tzinfo=timezone.utc))
+    assert list(ids) == [created[0].id]
+    ids = await repo.get_ids_before(datetime(2025, 2, 1, tzinfo=timezone.utc))
+    assert list(ids) == [event.id for event in created]
+
+
+@pytest.mark.asyncio
+async def test_strip_payloads_keeps_state(repo):
+    created = [
+        await repo.create(make_event(data={"attributes": {"i": i}}, metadata={"m": i}))
+        for i in range(4)
+    ]
+
+    assert await repo.strip_payloads(created[0].id, created[2].id) == 2
+    # Already stripped rows are left alone
+    assert await repo.strip_payloads(created[0].id, created[2].id) == 0
+
+    events = [await repo.get_by_id(event.id) for event in created]
+    assert [(e.data, e.metadata) for e in events] == [
+        ({"attributes": {"i": 0}}, {"m": 0}),
+        ({}, {}),
+        ({}, {}),
+        ({"attributes": {"i": 3}}, {"m": 3}),
+    ]
+    assert [(e.id, e.external_id, e.state, e.timestamp) for e in events] == [
+        (c.id, c.external_id, c.state, c.timestamp) for c in created
+    ]
+
+
+async def page_count(conn):
+    cursor = await conn.execute("PRAGMA page_count")
+    return (await cursor.fetchone())[0]
+
+
+@pytest.mark.asyncio
+async def test_strip_payloads_frees_pages(conn, repo):
+    await conn.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+    created = [await repo.create(make_event(data={"raw": "x" * 1000})) for _ in range(500)]
+    before = await page_count(conn)
+
+    assert await repo.strip_payloads(0, created[-1].id) == 500
+    await MaintenanceRepository(conn).reclaim_space(before)
+
+    assert await page_count(conn) < before / 2
+
+
+@pytest.mark.asyncio
+async def test_strip_payloads_rolls_back_if_rewrite_fails(conn, repo):
+    created = [await repo.create(make_event(data={"i": i})) for i in range(3)]
+    await conn.execute(
+        "CREATE TEMP TRIGGER full BEFORE INSERT ON events BEGIN SELECT RAISE(ABORT, 'full'); END"
+    )
+
+    with pytest.raises(sqlite3.Error):
+        await repo.strip_payloads(0, created[-1].id)
+    await conn.execute("DROP TRIGGER temp.full")
+    await conn.commit()
+
+    assert not conn.in_transaction
+    events = [await repo.get_by_id(event.id) for event in created]
+    assert [e.data for e in events] == [{"i": 0}, {"i": 1}, {"i": 2}]
+    assert await repo.strip_payloads(0, created[-1].id) == 3
+
+
+@pytest.mark.asyncio
+async def test_delete_before_id(repo):
+    created = [await repo.create(make_event()) for _ in range(5)]
+
+    assert await repo.delete_before_id(created[3].id, limit=2) == 2
+    assert await repo.delete_before_id(created[3].id, limit=2) == 1
+    assert await repo.delete_before_id(created[3].id, limit=2) == 0
+    assert await repo.get_by_id(created[2].id) is None
+    assert await repo.get_by_id(created[3].id) is not None
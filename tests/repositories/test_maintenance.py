@@ -0,0 +1,83 @@
+from unittest import mock
+
+import aiosqlite
+import pytest
+
+from floorcast.repositories.maintenance import MaintenanceRepository
+
+
+async def free_pages(conn):
+    cursor = await conn.execute("PRAGMA freelist_count")
+    return (await cursor.fetchone())[0]
+
+
+@pytest.mark.asyncio
+async def test_reclaim_space_frees_pages_incrementally(tmp_path):
+    async with aiosqlite.connect(tmp_path / "floorcast.db") as conn:
+        await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        await conn.execute("CREATE TABLE blobs (data BLOB)")
+        await conn.executemany("INSERT INTO blobs VALUES (?)", [(b"x" * 4000,)] * 200)
+        await conn.commit()
+        await conn.execute("DELETE FROM blobs")
+        await conn.commit()
+        freed = await free_pages(conn)
+        repo = MaintenanceRepository(conn)
+
+        assert await repo.reclaim_space(50) == 50
+        assert await free_pages(conn) == freed - 50
+        assert await repo.reclaim_space(freed) == freed - 50
+        assert await repo.reclaim_space(50) == 0
+
+
+@pytest.mark.asyncio
+async def test_reclaim_space_is_noop_without_incremental_auto_vacuum(tmp_path):
+    async with aiosqlite.connect(tmp_path / "floorcast.db") as conn:
+        await conn.execute("CREATE TABLE blobs (data BLOB)")
+        await conn.executemany("INSERT INTO blobs VALUES (?)", [(b"x" * 4000,)] * 20)
+        await conn.commit()
+        await conn.execute("DELETE FROM blobs")
+        await conn.commit()
+
+        assert await MaintenanceRepository(conn).reclaim_space(50) == 0
+        assert await free_pages(conn) > 0
+
+
+@pytest.mark.asyncio
+async def test_used_bytes_excludes_free_pages(tmp_path):
+    async with aiosqlite.connect(tmp_path / "floorcast.db") as conn:
+        await conn.execute("CREATE TABLE blobs (data BLOB)")
+        await conn.executemany("INSERT INTO blobs VALUES (?)", [(b"x" * 4000,)] * 20)
+        await conn.commit()
+        repo = MaintenanceRepository(conn)
+        used = await repo.used_bytes()
+
+        await conn.execute("DELETE FROM blobs")
+        await conn.commit()
+
+        assert (tmp_path / "floorcast.db").stat().st_size >= used
+        assert await repo.used_bytes() < used - 20 * 4000
+
+
+@pytest.mark.asyncio
+async def test_covers_every_event_partition(tmp_path):
+    async with (
+        aiosqlite.connect(tmp_path / "floorcast.db") as conn,
+        aiosqlite.connect(tmp_path / "floorcast.events-2026-10.db") as partition_conn,
+    ):
+        for db in (conn, partition_conn):
+            await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await db.execute("CREATE TABLE blobs (data BLOB)")
+            await db.executemany("INSERT INTO blobs VALUES (?)", [(b"x" * 4000,)] * 20)
+            await db.commit()
+        partitions = mock.Mock(connections=[conn, partition_conn])
+        repo = MaintenanceRepository(conn, partitions)
+
+        assert await repo.used_bytes() > 2 * 20 * 4000
+
+        for db in (conn, partition_conn):
+            await db.execute("DELETE FROM blobs")
+            await db.commit()
+        freed = await free_pages(conn) + await free_pages(partition_conn)
+
+        assert await repo.reclaim_space(1000) == freed
+        assert await free_pages(conn) == await free_pages(partition_conn) == 0
@@ -0,0 +1,167 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from floorcast.domain.models import Event, TimelineCursor
+from floorcast.infrastructure.db import connect_db
+from floorcast.repositories.event import EventRepository
+from floorcast.repositories.partitioned_event import PARTITION_SCHEMA, PartitionedEventRepository
+
+
+def at(month: int, day: int, hour: int = 0) -> datetime:
+    return datetime(2026, month, day, hour, tzinfo=timezone.utc)
+
+
+def make_event(timestamp: datetime, **overrides) -> Event:
+    defaults = {
+        "domain": "sensor",
+        "entity_id": "sensor.temp",
+        "event_id": uuid.uuid4(),
+        "event_type": "state_changed",
+        "external_id": str(uuid.uuid4()),
+        "state": "21",
+        "timestamp": timestamp,
+        "data": {"raw": True},
+    }
+    return Event(**{**defaults, **overrides})
+
+
+@pytest.fixture
+async def main_conn(tmp_path):
+    async with connect_db(str(tmp_path / "floorcast.db")) as conn:
+        await conn.executescript(PARTITION_SCHEMA)
+        yield conn
+
+
+@pytest.fixture
+async def repo(tmp_path, main_conn):
+    async with PartitionedEventRepository(
+        main_conn, str(tmp_path / "floorcast.db"), connect_db, rescan_seconds=0
+    ) as repo:
+        yield repo
+
+
+@pytest.fixture
+async def events(main_conn, repo):
+    # Two from before partitioning, then two months of partitions
+    legacy = EventRepository(main_conn)
+    created = [
+        await legacy.create(make_event(at(8, 30))),
+        await legacy.create(make_event(at(8, 31))),
+    ]
+    for timestamp in (at(9, 1), at(9, 15), at(10, 1), at(10, 2)):
+        created.append(await repo.create(make_event(timestamp)))
+    return created
+
+
+@pytest.mark.asyncio
+async def test_writes_go_to_monthly_files_with_continuing_ids(tmp_path, repo, events):
+    assert sorted(path.name for path in tmp_path.glob("*.events-*.db")) == [
+        "floorcast.events-2026-09.db",
+        "floorcast.events-2026-10.db",
+    ]
+    assert [event.id for event in events] == list(range(1, 7))
+    for event in events:
+        found = await repo.get_by_id(event.id)
+        assert found is not None
+        assert found.external_id == event.external_id
+    assert await repo.get_by_id(99) is None
+
+
+@pytest.mark.asyncio
+async def test_late_event_goes_to_newest_partition_unless_already_stored(repo, events):
+    duplicate = await repo.create(
+        make_event(events[2].timestamp, external_id=events[2].external_id)
+    )
+    late = await repo.create(make_event(at(9, 20)))
+
+    assert duplicate.id == events[2].id
+    assert late.id == events[-1].id + 1
+    assert [e.id for e in await repo.get_timeline_between(at(9, 10), at(9, 30))] == [
+        events[3].id,
+        late.id,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_range_queries_merge_partitions_in_timestamp_order(repo, events):
+    late = await repo.create(make_event(at(9, 20)))
+    expected = [events[1].id, events[2].id, events[3].id, late.id, events[4].id]
+
+    timeline = await repo.get_timeline_between(at(8, 30), at(10, 2), include_start=False)
+    assert [event.id for event in timeline] == expected
+    replay = await repo.get_between_id_and_timestamp(at(8, 30), at(10, 2))
+    assert [event.id for event in replay] == expected
+
+    chunks = [
+        [event.id for event in chunk]
+        async for chunk, _ in repo.iter_timeline_between(at(8, 1), at(11, 1), chunk_size=2)
+    ]
+    assert chunks == [
+        [events[0].id, events[1].id],
+        [events[2].id, events[3].id],
+        [late.id, events[4].id],
+        [events[5].id],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_queries_by_id_cross_partitions(repo, events):
+    after = await repo.get_timeline_after_id(events[1].id, limit=3)
+    assert [event.id for event in after] == [e.id for e in events[2:5]]
+
+    assert await repo.get_latest_timestamp() == at(10, 2)
+    assert list(await repo.get_ids_before(at(9, 15))) == [e.id for e in events[:3]]
+    assert list(await repo.get_ids_before(at(12, 1))) == [e.id for e in events]
+
+
+@pytest.mark.asyncio
+async def test_strip_payloads_across_partitions(repo, events):
+    assert await repo.strip_payloads(events[0].id, events[3].id) == 3
+
+    stripped = [(await repo.get_by_id(event.id)).data for event in events]
+    assert stripped == [{"raw": True}, {}, {}, {}, {"raw": True}, {"raw": True}]
+
+
+@pytest.mark.asyncio
+async def test_delete_before_id_retires_whole_partition_files(tmp_path, repo, events):
+    # Rows before partitioning are deleted from the main database a batch at a time
+    assert await repo.delete_before_id(events[4].id, limit=1) == 1
+    assert await repo.delete_before_id(events[4].id, limit=1) == 1
+    # A month of nothing but older events goes at once
+    assert await repo.delete_before_id(events[4].id, limit=1) == 2
+    assert await repo.delete_before_id(events[4].id, limit=1) == 0
+
+    assert [path.name for path in tmp_path.glob("*.events-*.db")] == ["floorcast.events-2026-10.db"]
+    timeline = await repo.get_timeline_between(at(1, 1), at(12, 1))
+    assert [event.id for event in timeline] == [events[4].id, events[5].id]
+
+
+@pytest.mark.asyncio
+async def test_archiving_pages_and_deletes_a_month_across_partitions(tmp_path, repo, events):
+    first = await repo.get_events_page(at(8, 1), at(10, 1), None, 3)
+    after = TimelineCursor(timestamp=first[-1].timestamp, id=first[-1].id)
+    rest = await repo.get_events_page(at(8, 1), at(10, 1), after, 3)
+
+    assert [event.id for event in first + rest] == [event.id for event in events[:4]]
+    assert first[0].data == {"raw": True}
+    assert await repo.get_earliest_timestamp() == at(8, 30)
+    # A sealed partition wholly in the range goes as a file
+    assert await repo.delete_between(at(9, 1), at(10, 1), limit=1) == 2
+    assert await repo.delete_between(at(8, 1), at(10, 1), limit=1) == 1
+    assert [path.name for path in tmp_path.glob("*.events-*.db")] == ["floorcast.events-2026-10.db"]
+
+
+@pytest.mark.asyncio
+async def test_reader_picks_up_partitions_created_elsewhere(tmp_path, main_conn, repo):
+    async with PartitionedEventRepository(
+        main_conn, str(tmp_path / "floorcast.db"), connect_db, rescan_seconds=0
+    ) as reader:
+        assert await reader.get_latest_timestamp() is None
+
+        first = await repo.create(make_event(at(9, 1)))
+        second = await repo.create(make_event(at(10, 1)))
+
+        timeline = await reader.get_timeline_between(at(1, 1), at(12, 1))
+        assert [event.id for event in timeline] == [first.id, second.id]
@@ -0,0 +1,88 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from floorcast.domain.event_filtering import TimelineFilter
+from floorcast.domain.models import CompactEvent
+from floorcast.domain.rollups import HOUR, MINUTE, rollup_events
+from floorcast.repositories.rollup import RollupRepository
+
+
+@pytest.fixture
+def repo(conn):
+    return RollupRepository(conn)
+
+
+def make_event(id: int, timestamp: int, state: str | None):
+    return CompactEvent(id=id, entity_id="sensor.temp", timestamp=timestamp, state=state, unit="C")
+
+
+@pytest.mark.asyncio
+async def test_merge_combines_with_existing_buckets(repo):
+    await repo.merge(rollup_events([make_event(1, 1_000, "20"), make_event(2, 2_000, "off")]))
+    await repo.merge(rollup_events([make_event(3, 3_000, "10"), make_event(4, 4_000, "30")]))
+
+    start = datetime.fromtimestamp(0, tz=timezone.utc)
+    end = datetime.fromtimestamp(60, tz=timezone.utc)
+    [bucket] = await repo.get_between(MINUTE, start, end)
+
+    assert bucket.count == 4
+    assert bucket.numeric_count == 3
+    assert bucket.min_value == 10
+    assert bucket.max_value == 30
+    assert bucket.mean == 20
+    assert bucket.last_state == "30"
+    assert bucket.last_event_id == 4
+
+
+@pytest.mark.asyncio
+async def test_merge_keeps_latest_state_for_late_events(repo):
+    await repo.merge(rollup_events([make_event(2, 5_000, "new")]))
+    await repo.merge(rollup_events([make_event(1, 1_000, "old")]))
+
+    start = datetime.fromtimestamp(0, tz=timezone.utc)
+    end = datetime.fromtimestamp(3600, tz=timezone.utc)
+    [bucket] = await repo.get_between(HOUR, start, end)
+
+    assert bucket.last_state == "new"
+    assert bucket.count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_between_filters_by_window(repo):
+    await repo.merge(rollup_events([make_event(1, 0, "1"), make_event(2, 120_000, "2")]))
+
+    start = datetime.fromtimestamp(30, tz=timezone.utc)
+    end = datetime.fromtimestamp(90, tz=timezone.utc)
+    buckets = await repo.get_between(MINUTE, start, end)
+
+    assert [b.bucket_start for b in buckets] == [0]
+
+
+@pytest.mark.asyncio
+async def test_get_last_event_id(repo):
+    assert await repo.get_last_event_id() == 0
+
+    await repo.merge(rollup_events([make_event(7, 0, "1"), make_event(9, 1_000, "2")]))
+
+    assert await repo.get_last_event_id() == 9
+
+
+@pytest.mark.asyncio
+async def test_get_between_with_domain_filter(repo):
+    await repo.merge(
+        rollup_events(
+            [
+                CompactEvent(id=1, entity_id="light.a", timestamp=0, state="on", unit=None),
+                CompactEvent(id=2, entity_id="sensor.b", timestamp=0, state="1", unit=None),
+            ]
+        )
+    )
+
+    start = datetime.fromtimestamp(0, tz=timezone.utc)
+    end = datetime.fromtimestamp(60, tz=timezone.utc)
+    buckets = await repo.get_between(
+        MINUTE, start, end, TimelineFilter(domains=frozenset({"sensor"}))
+    )
+
+    assert [b.entity_id for b in buckets] == ["sensor.b"]
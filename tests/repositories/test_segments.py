@@ -0,0 +1,114 @@
+import uuid
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from floorcast.domain.event_filtering import TimelineFilter
+from floorcast.domain.models import CompactEvent, Event, TimelineCursor
+from floorcast.repositories import segments
+from floorcast.repositories.segments import Segment, SegmentWriter
+
+START = datetime(2026, 9, 1, tzinfo=timezone.utc)
+END = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+def make_events(count: int) -> list[Event]:
+    return [
+        Event(
+            id=i + 1,
+            domain="light" if i % 3 else "sensor",
+            entity_id=f"{'light' if i % 3 else 'sensor'}.e{i % 5}",
+            event_id=uuid.uuid4(),
+            event_type="state_changed",
+            external_id=f"ext-{i}",
+            state=str(i % 7),
+            # Pairs share a timestamp, which ids order
+            timestamp=START + timedelta(seconds=i // 2, microseconds=7),
+            data={"raw": True},
+            unit="W" if i % 2 else None,
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(segments, "BLOCK_SIZE", 10)
+
+
+@pytest.fixture
+def events() -> list[Event]:
+    return make_events(95)
+
+
+@pytest.fixture
+def segment(tmp_path, events):
+    writer = SegmentWriter(tmp_path / "events.seg", START, END)
+    writer.add(events[:42])
+    writer.add(events[42:])
+    segment = Segment(writer.finish())
+    yield segment
+    segment.close()
+
+
+def test_round_trips_events_without_payloads(segment, events):
+    assert len(segment.blocks) == 10
+    assert segment.count == 95
+    assert (segment.min_id, segment.max_id) == (1, 95)
+    assert segment.first_timestamp == events[0].timestamp
+    assert segment.last_timestamp == events[-1].timestamp
+    assert segment.events_between(START - timedelta(seconds=1), END) == [
+        replace(event, data={}) for event in events
+    ]
+
+
+def test_timeline_between_reads_only_the_range(segment, events):
+    start, end = events[20].timestamp, events[31].timestamp
+
+    assert [e.id for e in segment.timeline_between(start, end)] == list(range(23, 31))
+    assert [e.id for e in segment.timeline_between(start, end, include_start=True)] == list(
+        range(21, 31)
+    )
+    assert segment.timeline_between(start, end)[0] == CompactEvent.from_event(events[22])
+
+
+def test_timeline_between_filters(segment):
+    timeline = segment.timeline_between(
+        START - timedelta(seconds=1),
+        END,
+        timeline_filter=TimelineFilter(domains=frozenset({"sensor"})),
+    )
+
+    assert [e.id for e in timeline] == list(range(1, 96, 3))
+
+
+def test_timeline_page_resumes_between_events_sharing_a_timestamp(segment, events):
+    first = segment.timeline_page(START - timedelta(seconds=1), END, None, 5)
+    after = first[-1][0]
+
+    assert after == TimelineCursor(timestamp=events[4].timestamp, id=5)
+    second = segment.timeline_page(START - timedelta(seconds=1), END, after, 5)
+    assert [event.id for _, event in first + second] == list(range(1, 11))
+
+
+def test_lookups_by_id(segment, events):
+    assert segment.get_by_id(57) == replace(events[56], data={})
+    assert segment.get_by_id(96) is None
+    assert [e.id for e in segment.timeline_after_id(88, 5)] == [89, 90, 91, 92, 93]
+
+
+def test_unfinished_segments_are_never_visible(tmp_path, events):
+    writer = SegmentWriter(tmp_path / "events.seg", START, END)
+    writer.add(events)
+    writer.abort()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "events.seg"
+    path.write_bytes(b"\0" * 64)
+
+    with pytest.raises(ValueError):
+        Segment(path)
@@ -120,3 +120,48 @@ async def test_get_before_timestamp_returns_none_if_not_exists(conn, repo, event
     # timestamp is before the first available snapshot
     result = await repo.get_before_timestamp(datetime(2021, 1, 2))
     assert result is None
+
+
+@pytest.mark.asyncio
+async def test_create_stores_compressed_state_and_returns_created_at(repo, event_repo, conn):
+    event = await create_event(event_repo)
+    state = {f"sensor.s{i}": {"value": str(i), "unit": "W"} for i in range(100)}
+
+    created = await repo.create(Snapshot(last_event_id=event.id, state=state))
+
+    cursor = await conn.execute("SELECT typeof(state) FROM snapshots WHERE id = ?", (created.id,))
+    assert (await cursor.fetchone())[0] == "blob"
+    stored = await repo.get_by_id(created.id)
+    assert stored.state == state
+    assert stored.created_at == created.created_at
+
+
+@pytest.mark.asyncio
+async def test_reads_snapshots_stored_as_json_text(repo, event_repo, conn):
+    event = await create_event(event_repo)
+    await conn.execute(
+        "INSERT INTO snapshots (last_event_id, state) VALUES (?, ?)",
+        (event.id, '{"light.living_room": {"value": "on", "unit": null}}'),
+    )
+
+    result = await repo.get_latest()
+
+    assert result.state == {"light.living_room": {"value": "on", "unit": None}}
+
+
+@pytest.mark.asyncio
+async def test_get_infos_and_delete_many(repo, event_repo):
+    event = await create_event(event_repo)
+    created = [
+        await repo.create(Snapshot(last_event_id=event.id, state={"light.living_room": str(i)}))
+        for i in range(3)
+    ]
+
+    infos = await repo.get_infos()
+    assert [info.id for info in infos] == [snapshot.id for snapshot in created]
+    assert infos[0].last_event_id == event.id
+    assert infos[0].created_at == created[0].created_at
+
+    await repo.delete_many([created[0].id, created[2].id])
+
+    assert [info.id for info in await repo.get_infos()] == [created[1].id]
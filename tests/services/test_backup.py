@@ -0,0 +1,78 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from floorcast.services.backup import BackupService
+
+
+@pytest.fixture
+def store():
+    store = mock.AsyncMock()
+    store.create.return_value = True
+    store.names.return_value = ["a", "b", "c", "d"]
+    return store
+
+
+@pytest.mark.asyncio
+async def test_backup_rotates_out_all_but_newest(store):
+    service = BackupService(store, keep=2)
+
+    progress = await service.backup()
+
+    assert store.create.await_args == mock.call(progress.name, progress)
+    assert store.delete.await_args_list == [mock.call("a"), mock.call("b")]
+    assert not progress.running
+    assert progress.error is None
+    assert service.latest is progress
+
+
+@pytest.mark.asyncio
+async def test_failed_backup_is_reported_and_nothing_rotated(store):
+    store.create.side_effect = OSError("disk full")
+    service = BackupService(store, keep=2)
+
+    progress = await service.backup()
+
+    assert progress.error == "OSError('disk full')"
+    assert not progress.running
+    store.delete.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_skipped_when_another_process_is_backing_up(store):
+    store.create.return_value = False
+    service = BackupService(store, keep=2)
+
+    progress = await service.backup()
+
+    assert progress.error == "another process is taking a backup"
+    store.delete.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_start_runs_in_background_and_never_twice(store):
+    release = asyncio.Event()
+
+    async def create(name, progress):
+        await release.wait()
+        return True
+
+    store.create.side_effect = create
+    service = BackupService(store, keep=10)
+
+    progress = service.start()
+    await asyncio.sleep(0)
+
+    assert service.running
+    assert service.start() is progress
+    release.set()
+    while service.running:
+        await asyncio.sleep(0)
+    assert store.create.await_count == 1
+    assert progress.finished_at is not None
+
+
+def test_keep_must_leave_a_backup(store):
+    with pytest.raises(ValueError):
+        BackupService(store, keep=0)
@@ -7,7 +7,7 @@ import pytest
 from floorcast.domain.event_filtering import EntityBlockList
 from floorcast.domain.events import EntityStateChanged
 from floorcast.domain.models import Event
-from floorcast.services.ingestion import IngestionService
+from floorcast.services.ingestion import INGEST_EVENTS, INGEST_STAGE_SECONDS, IngestionService
 
 
 def make_event(
@@ -127,3 +127,14 @@ async def test_published_event_contains_domain_event(service, event_bus):
     published_event = event_bus.publish.call_args[0][0]
     assert published_event.event.entity_id == "light.kitchen"
     assert published_event.event.state == "off"
+
+
+@pytest.mark.asyncio
+async def test_records_ingest_metrics(service):
+    persisted = INGEST_STAGE_SECONDS.labels("persist")
+    ingested_before, persisted_before = INGEST_EVENTS.labels().value, sum(persisted.counts)
+
+    await service.run(event_source=events_from_list([make_event(), make_event()]))
+
+    assert INGEST_EVENTS.labels().value == ingested_before + 2
+    assert sum(persisted.counts) == persisted_before + 2
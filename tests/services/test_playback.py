@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+
+from floorcast.domain.models import CompactEvent, ConstructedState, TimelineCursor
+from floorcast.domain.websocket import WSConnection
+from floorcast.services.playback import PlaybackSession
+from floorcast.services.state import StateService
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+START_MS = int(START.timestamp() * 1000)
+
+
+def _event(event_id: int, offset_ms: int) -> CompactEvent:
+    return CompactEvent(
+        id=event_id, entity_id="a.b", timestamp=START_MS + offset_ms, state=str(event_id), unit=None
+    )
+
+
+class FakeEventRepo:
+    def __init__(self, *events: CompactEvent) -> None:
+        self.events = list(events)
+
+    async def iter_timeline_between(self, start_time, end_time, after=None, chunk_size=1000):
+        for i in range(0, len(self.events), chunk_size):
+            chunk = self.events[i : i + chunk_size]
+            yield chunk, TimelineCursor(timestamp=START, id=chunk[-1].id)
+
+
+@pytest.fixture
+def state_service():
+    service = mock.Mock(spec=StateService)
+    service.get_state_at = mock.AsyncMock(
+        return_value=ConstructedState(
+            state={"a.b": {"value": "0", "unit": None}},
+            last_event_id=0,
+            snapshot_id=None,
+            snapshot_time=None,
+        )
+    )
+    return service
+
+
+@pytest.mark.asyncio
+async def test_play_sends_state_then_paced_events(state_service):
+    conn = WSConnection()
+    repo = FakeEventRepo(_event(1, 10), _event(2, 20))
+    playback = PlaybackSession(conn, state_service, repo)
+
+    with mock.patch("floorcast.services.playback.asyncio.sleep") as sleep:
+        playback.play(START, speed=10)
+        messages = [await conn.queue.get() for _ in range(4)]
+
+    assert [m.type for m in messages] == [
+        "playback.state",
+        "playback.event",
+        "playback.event",
+        "playback.end",
+    ]
+    assert messages[0].data == {
+        "timestamp": START_MS,
+        "state": {"a.b": {"value": "0", "unit": None}},
+    }
+    assert [m.data["id"] for m in messages[1:3]] == [1, 2]
+    state_service.get_state_at.assert_awaited_once_with(START)
+    # 10ms and 20ms of history at 10x speed
+    assert sleep.await_args_list[0].args[0] == pytest.approx(0.001, abs=1e-3)
+    assert playback.position == START_MS + 20
+
+
+@pytest.mark.asyncio
+async def test_pause_mid_page_resumes_without_repeating(state_service):
+    conn = WSConnection()
+    repo = FakeEventRepo(_event(1, 0), _event(2, 60_000))
+    playback = PlaybackSession(conn, state_service, repo)
+
+    playback.play(START)
+    await conn.queue.get()  # state
+    first = await conn.queue.get()
+    await asyncio.sleep(0)
+    playback.pause()
+    paused = await conn.queue.get()
+
+    with mock.patch("floorcast.services.playback.asyncio.sleep"):
+        playback.play(speed=1000)
+        resumed = await conn.queue.get()
+        end = await conn.queue.get()
+
+    assert first.data["id"] == 1
+    assert paused.type == "playback.paused"
+    assert paused.data == {"timestamp": START_MS}
+    assert resumed.type == "playback.event"
+    assert resumed.data["id"] == 2
+    assert end.type == "playback.end"
+    state_service.get_state_at.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_seek_while_paused_sends_state_only(state_service):
+    conn = WSConnection()
+    playback = PlaybackSession(conn, state_service, FakeEventRepo(_event(1, 0)))
+
+    playback.seek(START)
+    message = await conn.queue.get()
+    await asyncio.sleep(0)
+
+    assert message.type == "playback.state"
+    assert conn.queue.empty()
+    assert not playback.playing
+
+
+def test_play_rejects_non_positive_speed(state_service):
+    playback = PlaybackSession(WSConnection(), state_service, FakeEventRepo())
+
+    with pytest.raises(ValueError):
+        playback.play(START, speed=0)
@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+
+from floorcast.domain.models import SnapshotInfo
+from floorcast.domain.retention import EventRetention, RetentionTier
+from floorcast.services.retention import RetentionService
+
+
+@pytest.fixture
+def snapshot_repo():
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    repo = mock.AsyncMock()
+    repo.get_infos.return_value = [
+        SnapshotInfo(id=i, last_event_id=i, created_at=start + timedelta(minutes=i))
+        for i in range(1, 11)
+    ]
+    return repo
+
+
+@pytest.fixture
+def event_repo():
+    return mock.AsyncMock()
+
+
+@pytest.fixture
+def maintenance():
+    maintenance = mock.AsyncMock()
+    maintenance.reclaim_space.side_effect = [100, 20, 0] * 10
+    return maintenance
+
+
+@pytest.mark.asyncio
+async def test_thin_snapshots_deletes_and_reclaims_in_batches(
+    snapshot_repo, event_repo, maintenance
+):
+    service = RetentionService(
+        snapshot_repo,
+        event_repo,
+        maintenance,
+        [RetentionTier(after=timedelta(days=1), every=timedelta(days=365))],
+        max_replay_events=1000,
+        batch_size=4,
+    )
+
+    # The first and the newest are kept
+    assert await service.thin_snapshots() == 8
+    assert snapshot_repo.delete_many.await_args_list == [
+        mock.call([2, 3, 4, 5]),
+        mock.call([6, 7, 8, 9]),
+    ]
+    # Space is reclaimed after each batch until nothing is left to reclaim
+    assert maintenance.reclaim_space.await_count == 6
+
+
+@pytest.mark.asyncio
+async def test_thin_snapshots_without_anything_to_delete(snapshot_repo, event_repo, maintenance):
+    service = RetentionService(
+        snapshot_repo,
+        event_repo,
+        maintenance,
+        [RetentionTier(after=timedelta(days=60), every=timedelta(days=1))],
+        max_replay_events=1000,
+    )
+
+    assert await service.thin_snapshots() == 0
+    snapshot_repo.delete_many.assert_not_awaited()
+    maintenance.reclaim_space.assert_not_awaited()
+
+
+def make_service(
+    snapshot_repo, event_repo, maintenance, archive=None, **retention
+) -> RetentionService:
+    return RetentionService(
+        snapshot_repo,
+        event_repo,
+        maintenance,
+        [],
+        max_replay_events=1000,
+        event_retention=EventRetention(**retention),
+        archive=archive,
+        batch_size=4,
+        event_batch_size=100,
+    )
+
+
+@pytest.mark.asyncio
+async def test_drops_events_covered_by_newest_snapshot_past_horizon(
+    snapshot_repo, event_repo, maintenance
+):
+    event_repo.delete_before_id.side_effect = [100, 30, 0]
+    service = make_service(snapshot_repo, event_repo, maintenance, keep_for=timedelta(days=29))
+
+    await service.apply_event_retention()
+
+    # Snapshots are a minute apart from 30 days ago; all ten are past the horizon
+    assert event_repo.delete_before_id.await_args_list == [mock.call(10, 100)] * 3
+    assert snapshot_repo.delete_many.await_args_list == [
+        mock.call([1, 2, 3, 4]),
+        mock.call([5, 6, 7, 8]),
+        mock.call([9]),
+    ]
+    event_repo.strip_payloads.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_keeps_events_without_covering_snapshot(snapshot_repo, event_repo, maintenance):
+    service = make_service(snapshot_repo, event_repo, maintenance, keep_for=timedelta(days=31))
+
+    await service.apply_event_retention()
+
+    event_repo.delete_before_id.assert_not_awaited()
+    snapshot_repo.delete_many.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_drops_oldest_events_until_under_quota(snapshot_repo, event_repo, maintenance):
+    maintenance.used_bytes.side_effect = [5000, 4000, 3000, 2000]
+    event_repo.delete_before_id.return_value = 0
+    service = make_service(snapshot_repo, event_repo, maintenance, max_bytes=2500)
+
+    await service.apply_event_retention()
+
+    assert event_repo.delete_before_id.await_args_list == [
+        mock.call(1, 100),
+        mock.call(2, 100),
+        mock.call(3, 100),
+    ]
+    assert snapshot_repo.delete_many.await_args_list == [mock.call([1]), mock.call([2])]
+
+
+@pytest.mark.asyncio
+async def test_strips_payloads_in_batches_and_resumes(snapshot_repo, event_repo, maintenance):
+    event_repo.get_ids_before.return_value = range(51, 301)
+    event_repo.strip_payloads.return_value = 100
+    service = make_service(snapshot_repo, event_repo, maintenance, payload_for=timedelta(days=7))
+
+    await service.apply_event_retention()
+
+    assert event_repo.strip_payloads.await_args_list == [
+        mock.call(50, 150),
+        mock.call(150, 250),
+        mock.call(250, 300),
+    ]
+
+    # Only events that have aged since are stripped next time
+    event_repo.strip_payloads.reset_mock()
+    event_repo.get_ids_before.return_value = range(51, 321)
+    await service.apply_event_retention()
+
+    assert event_repo.strip_payloads.await_args_list == [mock.call(300, 320)]
+
+
+@pytest.mark.asyncio
+async def test_archives_whole_months_then_purges_them(snapshot_repo, event_repo, maintenance):
+    now = datetime.now(timezone.utc)
+    archive = mock.AsyncMock()
+    archive.archived_until.return_value = None
+    archive.archive.return_value = 10
+    archive.purge_archived.side_effect = [100, 100, 0]
+    event_repo.get_earliest_timestamp.return_value = now - timedelta(days=75)
+    service = make_service(
+        snapshot_repo, event_repo, maintenance, archive, archive_after=timedelta(days=30)
+    )
+
+    await service.apply_event_retention()
+
+    # One or two whole months end before the cutoff, depending on the day of the month
+    months = archive.archive.await_args_list
+    assert len(months) in (1, 2)
+    assert months[0].args[0] <= now - timedelta(days=75)
+    assert months[-1].args[1] <= now - timedelta(days=30)
+    assert all(a.args[1] == b.args[0] for a, b in zip(months, months[1:]))
+    assert archive.purge_archived.await_args_list == [mock.call(100)] * 3
+    assert maintenance.reclaim_space.await_count == 6
@@ -0,0 +1,98 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+
+from floorcast.domain.events import EntityStateChanged
+from floorcast.domain.models import CompactEvent, Event
+from floorcast.domain.rollups import MINUTE
+from floorcast.services.rollup import RollupService
+
+
+@pytest.fixture
+def rollup_repo():
+    repo = mock.AsyncMock()
+    repo.get_last_event_id.return_value = 0
+    return repo
+
+
+@pytest.fixture
+def event_repo():
+    return mock.AsyncMock()
+
+
+def make_state_changed(id: int) -> EntityStateChanged:
+    event = Event(
+        id=id,
+        domain="sensor",
+        entity_id="sensor.temp",
+        event_id=uuid.uuid4(),
+        event_type="state_changed",
+        external_id=str(uuid.uuid4()),
+        state="21",
+        timestamp=datetime.now(timezone.utc),
+        data={},
+    )
+    return EntityStateChanged(entity_id=event.entity_id, state=event.state, event=event)
+
+
+@pytest.mark.asyncio
+async def test_initialize_backfills_in_batches(rollup_repo, event_repo):
+    rollup_repo.get_last_event_id.return_value = 10
+    event_repo.get_timeline_after_id.side_effect = [
+        [CompactEvent(id=11, entity_id="a.b", timestamp=0, state="1", unit=None)],
+        [CompactEvent(id=12, entity_id="a.b", timestamp=1, state="2", unit=None)],
+        [],
+    ]
+    service = RollupService(rollup_repo, event_repo, backfill_batch_size=1)
+
+    await service.initialize()
+
+    assert [c.args for c in event_repo.get_timeline_after_id.call_args_list] == [
+        (10, 1),
+        (11, 1),
+        (12, 1),
+    ]
+    assert rollup_repo.merge.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_on_entity_state_changed_skips_already_rolled_up_events(rollup_repo, event_repo):
+    rollup_repo.get_last_event_id.return_value = 5
+    event_repo.get_timeline_after_id.return_value = []
+    service = RollupService(rollup_repo, event_repo)
+    await service.initialize()
+
+    await service.on_entity_state_changed(make_state_changed(5))
+    rollup_repo.merge.assert_not_called()
+
+    await service.on_entity_state_changed(make_state_changed(6))
+    rollup_repo.merge.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_on_entity_states_changed_merges_a_batch_at_once(rollup_repo, event_repo):
+    rollup_repo.get_last_event_id.return_value = 5
+    event_repo.get_timeline_after_id.return_value = []
+    service = RollupService(rollup_repo, event_repo)
+    await service.initialize()
+
+    await service.on_entity_states_changed([make_state_changed(i) for i in (5, 6, 7)])
+
+    rollup_repo.merge.assert_called_once()
+    (bucket,) = [b for b in rollup_repo.merge.call_args.args[0] if b.resolution == MINUTE]
+    assert bucket.count == 2
+    assert bucket.last_event_id == 7
+
+
+@pytest.mark.asyncio
+async def test_get_rollups_between(rollup_repo, event_repo):
+    service = RollupService(rollup_repo, event_repo)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    assert await service.get_rollups_between(start, start + timedelta(minutes=5), 1000) is None
+
+    resolution, _ = await service.get_rollups_between(start, start + timedelta(days=7), 1000)
+    assert resolution == MINUTE
+    rollup_repo.get_between.assert_called_once_with(MINUTE, start, start + timedelta(days=7), None)
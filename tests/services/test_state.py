@@ -1,10 +1,13 @@
+import asyncio
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from unittest import mock
 
 import pytest
 
+from floorcast.domain.events import ReplayObserved
 from floorcast.domain.models import Event, Snapshot
+from floorcast.domain.snapshot_policies import ReplayCostModel
 from floorcast.services.state import StateService
 
 
@@ -47,3 +50,106 @@ async def test_get_state_at(snapshot_repo, event_repo):
     assert state.state["a.id"] == {"value": "2", "unit": "m"}
     assert state.state["b.id"] == {"value": "3", "unit": "m"}
     assert list(state.state.keys()) == ["a.id", "b.id"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_reconstruction(snapshot_repo, event_repo):
+    released = asyncio.Event()
+
+    async def get_before_timestamp(_):
+        await released.wait()
+        return Snapshot(last_event_id=1, state={"a.id": {"value": 1, "unit": "m"}})
+
+    snapshot_repo.get_before_timestamp.side_effect = get_before_timestamp
+    event_repo.get_between_id_and_timestamp.return_value = []
+    service = StateService(snapshot_repo, event_repo)
+    at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    requests = [asyncio.create_task(service.get_state_at(at)) for _ in range(10)]
+    await asyncio.sleep(0)
+    released.set()
+    states = await asyncio.gather(*requests)
+
+    snapshot_repo.get_before_timestamp.assert_awaited_once()
+    assert all(state is states[0] for state in states)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_reconstruction(snapshot_repo, event_repo):
+    released = asyncio.Event()
+
+    async def get_before_timestamp(_):
+        await released.wait()
+        return None
+
+    snapshot_repo.get_before_timestamp.side_effect = get_before_timestamp
+    event_repo.get_between_id_and_timestamp.return_value = []
+    service = StateService(snapshot_repo, event_repo)
+    at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    first = asyncio.create_task(service.get_state_at(at))
+    second = asyncio.create_task(service.get_state_at(at))
+    await asyncio.sleep(0)
+    first.cancel()
+    released.set()
+
+    assert (await second).state == {}
+    snapshot_repo.get_before_timestamp.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_current_state_requests_within_tolerance_share_now(snapshot_repo, event_repo):
+    released = asyncio.Event()
+
+    async def get_before_timestamp(_):
+        await released.wait()
+        return None
+
+    snapshot_repo.get_before_timestamp.side_effect = get_before_timestamp
+    event_repo.get_between_id_and_timestamp.return_value = []
+    service = StateService(snapshot_repo, event_repo, current_state_tolerance=timedelta(seconds=5))
+
+    first = asyncio.create_task(service.get_current_state())
+    await asyncio.sleep(0)
+    second = asyncio.create_task(service.get_current_state())
+    await asyncio.sleep(0)
+    released.set()
+
+    assert await first is await second
+    snapshot_repo.get_before_timestamp.assert_awaited_once()
+
+    # Once finished, the next request reconstructs afresh
+    await service.get_current_state()
+    assert snapshot_repo.get_before_timestamp.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_reconstruction_timings_feed_cost_model(snapshot_repo, event_repo):
+    snapshot_repo.get_before_timestamp.return_value = None
+    event_repo.get_between_id_and_timestamp.return_value = [
+        make_event(id=i, entity_id="a.id", state=str(i)) for i in range(1, 201)
+    ]
+    cost_model = ReplayCostModel(per_event_seconds=1.0)
+    service = StateService(snapshot_repo, event_repo, cost_model=cost_model)
+
+    await service.get_state_at(datetime(2020, 1, 1, tzinfo=timezone.utc))
+
+    # One real measurement pulls the deliberately absurd prior down
+    assert cost_model.per_event_seconds < 1.0
+    assert cost_model.snapshot_load_seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_reconstruction_timings_are_published(snapshot_repo, event_repo):
+    snapshot_repo.get_before_timestamp.return_value = None
+    event_repo.get_between_id_and_timestamp.return_value = [
+        make_event(id=i, entity_id="a.id", state=str(i)) for i in range(1, 4)
+    ]
+    bus = mock.Mock()
+    service = StateService(snapshot_repo, event_repo, bus=bus)
+
+    await service.get_state_at(datetime(2020, 1, 1, tzinfo=timezone.utc))
+
+    (observed,) = bus.publish.call_args.args
+    assert isinstance(observed, ReplayObserved)
+    assert observed.events == 3
@@ -1,12 +1,15 @@
+import asyncio
+import json
 import uuid
+from dataclasses import replace
 from datetime import datetime, timezone
 from unittest import mock
 
 import pytest
 
-from floorcast.domain.events import EntityStateChanged, FCEvent
-from floorcast.domain.models import Event
-from floorcast.domain.websocket import WSConnection, WSMessage
+from floorcast.domain.events import EntityStateChanged, FCEvent, RegistryUpdated
+from floorcast.domain.models import CompactEvent, ConstructedState, Entity, Event, Registry
+from floorcast.domain.websocket import SlowConsumerPolicy, WSConnection, WSFrame, WSMessage
 from floorcast.infrastructure.event_bus import TypedEventBus
 from floorcast.services.registry import RegistryService
 from floorcast.services.state import StateService
@@ -28,10 +31,18 @@ def registry_service():
     return mock.Mock(spec=RegistryService)
 
 
+@pytest.fixture
+def event_repo():
+    return mock.AsyncMock()
+
+
 @pytest.mark.asyncio
-async def test_websocket_connect(event_bus, state_service, registry_service):
+async def test_websocket_connect(event_bus, state_service, registry_service, event_repo):
     service = WebsocketService(
-        bus=event_bus, state_service=state_service, registry_service=registry_service
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
     )
 
     conn = service.connect()
@@ -42,9 +53,12 @@ async def test_websocket_connect(event_bus, state_service, registry_service):
 
 
 @pytest.mark.asyncio
-async def test_websocket_disconnect(event_bus, state_service, registry_service):
+async def test_websocket_disconnect(event_bus, state_service, registry_service, event_repo):
     service = WebsocketService(
-        bus=event_bus, state_service=state_service, registry_service=registry_service
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
     )
 
     conn = service.connect()
@@ -55,19 +69,21 @@ async def test_websocket_disconnect(event_bus, state_service, registry_service):
 
 
 @pytest.mark.asyncio
-async def test_websocket_send_message(event_bus, state_service, registry_service):
+async def test_websocket_send_message(event_bus, state_service, registry_service, event_repo):
     service = WebsocketService(
-        bus=event_bus, state_service=state_service, registry_service=registry_service
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
     )
     conn = service.connect()
 
     service.send_message(conn, WSMessage("subscribe", "entity_states"))
 
-    assert "entity_states" in service._subscriptions
-    assert conn in service._subscriptions["entity_states"]
+    assert conn in service._entity_subscriptions
 
     service.send_message(conn, WSMessage("unsubscribe", "entity_states"))
-    assert conn not in service._subscriptions["entity_states"]
+    assert conn not in service._entity_subscriptions
 
     service.send_message(conn, WSMessage("ping", None))
     assert conn.queue.get_nowait() == WSMessage("pong", None)
@@ -77,11 +93,15 @@ async def test_websocket_send_message(event_bus, state_service, registry_service
 
 
 @pytest.mark.asyncio
-async def test_request_registry(event_bus, state_service, registry_service):
+async def test_request_registry(event_bus, state_service, registry_service, event_repo):
     service = WebsocketService(
-        bus=event_bus, state_service=state_service, registry_service=registry_service
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
     )
     conn = service.connect()
+    registry_service.get_registry.reset_mock()
 
     await service.request_registry(conn)
     registry_service.get_registry.assert_called_once()
@@ -89,21 +109,38 @@ async def test_request_registry(event_bus, state_service, registry_service):
 
 
 @pytest.mark.asyncio
-async def test_request_snapshot(event_bus, state_service, registry_service):
+async def test_request_snapshot(event_bus, state_service, registry_service, event_repo):
     service = WebsocketService(
-        bus=event_bus, state_service=state_service, registry_service=registry_service
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
     )
-    conn = service.connect()
+    state = ConstructedState(
+        state={"a.b": {"value": "1", "unit": None}},
+        last_event_id=1,
+        snapshot_id=None,
+        snapshot_time=None,
+    )
+    state_service.get_current_state = mock.AsyncMock(return_value=state)
+    first, second = service.connect(), service.connect()
 
-    await service.request_snapshot(conn)
-    state_service.get_state_at.assert_called_once()
-    assert conn.queue.get_nowait().type == "snapshot"
+    await service.request_snapshot(first)
+    await service.request_snapshot(second)
+
+    state_service.get_current_state.assert_awaited()
+    frame = first.queue.get_nowait()
+    assert json.loads(frame.text) == {"type": "snapshot", "state": state.state}
+    # Same reconstruction, same encoded frame
+    assert second.queue.get_nowait() is frame
 
 
 @pytest.mark.asyncio
 async def test_init_subscribes_to_events():
     bus = TypedEventBus()
-    service = WebsocketService(bus=bus, state_service=mock.Mock(), registry_service=mock.Mock())
+    service = WebsocketService(
+        bus=bus, state_service=mock.Mock(), registry_service=mock.Mock(), event_repo=mock.Mock()
+    )
 
     conn = service.connect()
     service.send_message(conn, WSMessage("subscribe", "entity_states"))
@@ -127,16 +164,468 @@ async def test_init_subscribes_to_events():
     )
 
     message = await conn.queue.get()
-    assert isinstance(message, WSMessage)
-    assert message.type == "entity.state_change"
+    assert isinstance(message, WSFrame)
+    assert json.loads(message.text)["type"] == "event"
+
+
+@pytest.mark.asyncio
+async def test_state_change_is_encoded_once_for_all_subscribers():
+    bus = TypedEventBus()
+    service = WebsocketService(
+        bus=bus, state_service=mock.Mock(), registry_service=mock.Mock(), event_repo=mock.Mock()
+    )
+    subscribers = [service.connect() for _ in range(3)]
+    for conn in subscribers:
+        service.send_message(conn, WSMessage("subscribe", "entity_states"))
+    unsubscribed = service.connect()
+    service.disconnect(subscribers.pop())
+    event = Event(
+        id=7,
+        event_type="entity.state_change",
+        entity_id="light.kitchen",
+        event_id=uuid.uuid4(),
+        state="on",
+        timestamp=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        data={},
+        domain="light",
+        external_id="ext",
+    )
+
+    await service._handle_entity_state_change_event(
+        EntityStateChanged(entity_id="light.kitchen", state="on", event=event)
+    )
+
+    first, second = (conn.queue.get_nowait() for conn in subscribers)
+    assert first is second
+    assert json.loads(first.text) == {
+        "type": "event",
+        "entity_id": "light.kitchen",
+        "state": "on",
+        "unit": None,
+        "timestamp": 1767225600000,
+        "id": 7,
+    }
+    assert unsubscribed.queue.empty()
 
 
 def test_subscribing_to_unknown_topic_raises_error():
     bus = TypedEventBus()
-    service = WebsocketService(bus=bus, state_service=mock.Mock(), registry_service=mock.Mock())
+    service = WebsocketService(
+        bus=bus, state_service=mock.Mock(), registry_service=mock.Mock(), event_repo=mock.Mock()
+    )
     conn = service.connect()
     with pytest.raises(ValueError):
         service.send_message(conn, WSMessage("subscribe", "unknown"))
 
     with pytest.raises(ValueError):
         service.send_message(conn, WSMessage("unsubscribe", "unknown"))
+
+
+@pytest.mark.asyncio
+async def test_timeline_request_replies_with_columnar_events(
+    event_bus, state_service, registry_service, event_repo
+):
+    service = WebsocketService(
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
+    )
+    state_service.get_state_at = mock.AsyncMock(
+        return_value=ConstructedState(
+            state={"a.b": {"value": "1", "unit": None}},
+            last_event_id=1,
+            snapshot_id=None,
+            snapshot_time=None,
+        )
+    )
+    event_repo.get_timeline_between.return_value = [
+        CompactEvent(id=2, entity_id="a.b", timestamp=1000, state="2", unit=None)
+    ]
+    conn = service.connect()
+
+    service.send_message(
+        conn, WSMessage("timeline", {"start_time": "2026-01-01T00:00:00+00:00", "end_time": None})
+    )
+    message = await conn.queue.get()
+
+    assert message.type == "timeline"
+    assert message.data["snapshot"] == {"a.b": {"value": "1", "unit": None}}
+    assert message.data["events"]["entities"] == ["a.b"]
+    assert message.data["events"]["timestamp"] == [1000]
+
+
+def _timeline_events(*events):
+    async def iterate(start_time, end_time, after=None, chunk_size=1000, limit=None):
+        selected = [
+            e
+            for e in events
+            if (after is None or e.timestamp >= int(after.timestamp.timestamp() * 1000))
+            and e.timestamp < int(end_time.timestamp() * 1000)
+        ]
+        if selected:
+            yield selected, None
+
+    return iterate
+
+
+@pytest.mark.asyncio
+async def test_timeline_request_streams_playhead_slice_first(
+    event_bus, state_service, registry_service, event_repo
+):
+    service = WebsocketService(
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
+    )
+    service.TIMELINE_SLICES = 2
+    state_service.get_state_at = mock.AsyncMock(
+        return_value=ConstructedState(
+            state={}, last_event_id=0, snapshot_id=None, snapshot_time=None
+        )
+    )
+    early = CompactEvent(id=1, entity_id="a.b", timestamp=1_767_225_660_000, state="1", unit=None)
+    late = CompactEvent(id=2, entity_id="a.b", timestamp=1_767_229_260_000, state="2", unit=None)
+    event_repo.iter_timeline_between = _timeline_events(early, late)
+    conn = service.connect()
+
+    service.send_message(
+        conn,
+        WSMessage(
+            "timeline.request",
+            {
+                "request_id": "r1",
+                "start_time": "2026-01-01T00:00:00+00:00",
+                "end_time": "2026-01-01T02:00:00+00:00",
+                "playhead": "2026-01-01T01:30:00+00:00",
+            },
+        ),
+    )
+    messages = [await conn.queue.get() for _ in range(4)]
+
+    assert [m.type for m in messages] == [
+        "timeline.snapshot",
+        "timeline.chunk",
+        "timeline.chunk",
+        "timeline.done",
+    ]
+    assert all(m.data["request_id"] == "r1" for m in messages)
+    assert messages[1].data["events"]["id"] == [2]
+    assert messages[2].data["events"]["id"] == [1]
+
+
+@pytest.mark.asyncio
+async def test_timeline_cancel_stops_request(
+    event_bus, state_service, registry_service, event_repo
+):
+    service = WebsocketService(
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
+    )
+    started = asyncio.Event()
+
+    async def get_state_at(_):
+        started.set()
+        await asyncio.Event().wait()
+
+    state_service.get_state_at = get_state_at
+    conn = service.connect()
+    service.send_message(
+        conn,
+        WSMessage(
+            "timeline.request", {"request_id": "r1", "start_time": "2026-01-01T00:00:00+00:00"}
+        ),
+    )
+    await started.wait()
+    (task,) = service._tasks[conn]
+
+    service.send_message(conn, WSMessage("timeline.cancel", {"request_id": "r1"}))
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert not service._tasks[conn]
+    assert conn.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_playback_messages_share_a_session_per_connection(
+    event_bus, state_service, registry_service, event_repo
+):
+    service = WebsocketService(
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
+    )
+    conn = service.connect()
+
+    with mock.patch("floorcast.services.websocket.PlaybackSession") as session_cls:
+        service.send_message(
+            conn, WSMessage("play", {"from": "2026-01-01T00:00:00+00:00", "speed": 5})
+        )
+        service.send_message(conn, WSMessage("pause"))
+        service.disconnect(conn)
+
+    session = session_cls.return_value
+    session_cls.assert_called_once()
+    session.play.assert_called_once_with(datetime(2026, 1, 1, tzinfo=timezone.utc), 5.0)
+    session.pause.assert_called_once_with()
+    session.close.assert_called_once_with()
+
+
+def test_connection_stats_reports_queue_depth(
+    event_bus, state_service, registry_service, event_repo
+):
+    service = WebsocketService(
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
+        queue_max_size=10,
+        slow_consumer_policy=SlowConsumerPolicy.RESYNC,
+    )
+    conn = service.connect()
+    service.send_message(conn, WSMessage("ping"))
+
+    assert service.connection_stats() == [
+        {
+            "id": str(conn.id),
+            "encoding": "json",
+            "compressed": False,
+            "depth": 1,
+            "high_water": 1,
+            "dropped": 0,
+            "resyncs": 0,
+            "policy": "resync",
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_scoped_subscription_receives_only_matching_entities():
+    bus = TypedEventBus()
+    registry_service = mock.Mock(spec=RegistryService)
+    registry_service.get_registry.return_value = Registry.empty()
+    service = WebsocketService(
+        bus=bus,
+        state_service=mock.Mock(),
+        registry_service=registry_service,
+        event_repo=mock.Mock(),
+    )
+    kitchen = service.connect()
+    everything = service.connect()
+    service.send_message(
+        kitchen, WSMessage("subscribe", {"topic": "entity_states", "area_ids": ["kitchen"]})
+    )
+    service.send_message(everything, WSMessage("subscribe", "entity_states"))
+    bus.publish(
+        RegistryUpdated(
+            registry=Registry(
+                entities={
+                    "light.kitchen": Entity(
+                        id="light.kitchen",
+                        device_id="",
+                        domain="light",
+                        display_name="Kitchen",
+                        area_id="kitchen",
+                        entity_category=None,
+                    )
+                },
+                devices={},
+                areas={},
+                floors={},
+            )
+        )
+    )
+    await bus.wait_all()
+
+    for entity_id in ("light.kitchen", "light.hall"):
+        await service._handle_entity_state_change_event(
+            EntityStateChanged(
+                entity_id=entity_id,
+                state="on",
+                event=Event(
+                    id=1,
+                    event_type="state_changed",
+                    entity_id=entity_id,
+                    event_id=uuid.uuid4(),
+                    state="on",
+                    timestamp=datetime(2026, 1, 1, tzinfo=timezone.utc),
+                    data={},
+                    domain="light",
+                    external_id=entity_id,
+                ),
+            )
+        )
+
+    assert [json.loads(f.text)["entity_id"] for f in _drain(kitchen)] == ["light.kitchen"]
+    assert len(_drain(everything)) == 2
+
+
+def _drain(conn):
+    items = []
+    while not conn.queue.empty():
+        items.append(conn.queue.get_nowait())
+    return items
+
+
+@pytest.mark.asyncio
+async def test_batched_subscription_packs_updates_into_one_frame(
+    event_bus, state_service, registry_service, event_repo
+):
+    service = WebsocketService(
+        bus=event_bus,
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
+    )
+    conn = service.connect()
+    service.send_message(
+        conn,
+        WSMessage(
+            "subscribe",
+            {"topic": "entity_states", "batch": {"window_ms": 10, "latest_only": True}},
+        ),
+    )
+
+    for state in ("1", "2"):
+        await service._handle_entity_state_change_event(
+            EntityStateChanged(
+                entity_id="light.kitchen",
+                state=state,
+                event=Event(
+                    id=int(state),
+                    event_type="state_changed",
+                    entity_id="light.kitchen",
+                    event_id=uuid.uuid4(),
+                    state=state,
+                    timestamp=datetime(2026, 1, 1, tzinfo=timezone.utc),
+                    data={},
+                    domain="light",
+                    external_id=state,
+                ),
+            )
+        )
+    assert conn.queue.empty()
+
+    frame = await asyncio.wait_for(conn.queue.get(), timeout=1)
+
+    message = json.loads(frame.text)
+    assert message["type"] == "events"
+    assert [event["state"] for event in message["events"]] == ["2"]
+    assert service.connection_stats()[0]["coalesced"] == 1
+
+
+def _state_change(event_id: int, entity_id: str) -> EntityStateChanged:
+    return EntityStateChanged(
+        entity_id=entity_id,
+        state=str(event_id),
+        event=Event(
+            id=event_id,
+            event_type="state_changed",
+            entity_id=entity_id,
+            event_id=uuid.uuid4(),
+            state=str(event_id),
+            timestamp=datetime(2026, 1, 1, tzinfo=timezone.utc),
+            data={},
+            domain=entity_id.split(".")[0],
+            external_id=str(event_id),
+        ),
+    )
+
+
+def _drain(conn: WSConnection) -> list:
+    items = []
+    while not conn.queue.empty():
+        items.append(conn.queue.get_nowait())
+    return items
+
+
+@pytest.mark.asyncio
+async def test_resume_replays_missed_events_once_subscribed(state_service, event_repo):
+    registry_service = RegistryService(TypedEventBus())
+    service = WebsocketService(
+        bus=TypedEventBus(),
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
+    )
+    for event_id, entity_id in ((1, "light.kitchen"), (2, "sensor.power"), (3, "light.kitchen")):
+        await service._handle_entity_state_change_event(_state_change(event_id, entity_id))
+    conn = service.connect()
+
+    await service.resume(conn, last_event_id=1, registry_version=registry_service.version)
+
+    resumed = conn.queue.get_nowait()
+    assert resumed == WSMessage(type="resumed", data={"last_event_id": 1})
+    assert conn.queue.empty()
+    state_service.get_current_state.assert_not_called()
+
+    service.send_message(
+        conn, WSMessage("subscribe", {"topic": "entity_states", "domains": ["light"]})
+    )
+    await service._handle_entity_state_change_event(_state_change(4, "light.kitchen"))
+
+    assert [json.loads(frame.text)["id"] for frame in _drain(conn)] == [3, 4]
+
+
+@pytest.mark.asyncio
+async def test_resume_falls_back_to_registry_and_snapshot(state_service, event_repo):
+    registry_service = RegistryService(TypedEventBus())
+    service = WebsocketService(
+        bus=TypedEventBus(),
+        state_service=state_service,
+        registry_service=registry_service,
+        event_repo=event_repo,
+        resume_buffer_size=1,
+    )
+    state_service.get_current_state = mock.AsyncMock(
+        return_value=ConstructedState(
+            state={}, last_event_id=2, snapshot_id=None, snapshot_time=None
+        )
+    )
+    for event_id in (1, 2):
+        await service._handle_entity_state_change_event(_state_change(event_id, "light.kitchen"))
+    conn = service.connect()
+
+    await service.resume(conn, last_event_id=0, registry_version="stale")
+
+    registry, snapshot = _drain(conn)
+    assert registry.type == "registry"
+    assert registry.data["version"] == registry_service.version
+    assert json.loads(snapshot.text)["type"] == "snapshot"
+
+
+@pytest.mark.asyncio
+async def test_registry_version_follows_contents():
+    bus = TypedEventBus()
+    registry_service = RegistryService(bus)
+    empty = registry_service.version
+    registry = Registry(
+        entities={
+            "light.kitchen": Entity(
+                id="light.kitchen",
+                device_id="",
+                domain="light",
+                display_name="Kitchen",
+                area_id=None,
+                entity_category=None,
+            )
+        },
+        devices={},
+        areas={},
+        floors={},
+    )
+
+    bus.publish(RegistryUpdated(registry=registry))
+    await bus.wait_all()
+    updated = registry_service.version
+
+    assert updated != empty
+    # Same contents, same version, even from a fresh copy
+    bus.publish(RegistryUpdated(registry=replace(registry)))
+    await bus.wait_all()
+    assert registry_service.version == updated